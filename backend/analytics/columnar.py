@@ -0,0 +1,222 @@
+"""
+Incremental columnar export of learning activity.
+
+Each dataset is written under `<root>/<dataset>/date=YYYY-MM-DD/` as
+Parquet or Arrow IPC part files, one set per batch, and an ExportWatermark
+records the last row written so the next run only exports newer rows.
+Facts carry the curriculum ids (lesson_id, unit_id, course_id, grade_id)
+that key the `curriculum` dimension table written alongside them.
+
+A batch is written before its watermark is saved, so a crash in between
+re-exports that batch on the next run (at-least-once); deduplicate on `id`.
+Runs are expected to be serialized (one cron job).
+"""
+import os
+from datetime import timedelta
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from learning.models import Lesson
+from progress.models import LessonProgress
+from quizzes.models import QuizAttempt, UserAnswer
+from .models import ExportWatermark
+
+FILE_FORMATS = {"parquet": "parquet", "arrow": "arrow"}
+
+
+class ColumnarDataset:
+    """
+    `columns` maps output column names to (ORM path, column type).
+    `watermark` is "id" for append-only tables, or the name of a timestamp
+    field that moves when a row changes (rows are then exported again as
+    new snapshots). `partition_by` is the timestamp column used for the
+    day partitions. `written_at` is the ORM path of the server time an
+    append-only row was written at.
+    """
+
+    def __init__(self, model, columns, watermark, partition_by, written_at=None):
+        self.model = model
+        self.columns = columns
+        self.watermark = watermark
+        self.partition_by = partition_by
+        self.written_at = written_at
+
+    def _pending(self, mark):
+        queryset = self.model.objects.all()
+        # leave rows that may still be written behind for the next run
+        horizon = timezone.now() - timedelta(seconds=settings.ANALYTICS_EXPORT_LAG_SECONDS)
+        if self.watermark == "id":
+            queryset = queryset.filter(id__gt=mark.last_id).order_by("id")
+            # stop before the first recently written row: a row with a lower
+            # id may still be uncommitted, and the watermark must not pass it
+            recent = queryset.filter(**{f"{self.written_at}__gte": horizon}) \
+                .values_list("id", flat=True).first()
+            return queryset if recent is None else queryset.filter(id__lt=recent)
+
+        queryset = queryset.filter(**{f"{self.watermark}__lt": horizon})
+        if mark.last_timestamp is not None:
+            queryset = queryset.filter(
+                Q(**{f"{self.watermark}__gt": mark.last_timestamp})
+                | Q(**{self.watermark: mark.last_timestamp, "id__gt": mark.last_id})
+            )
+        return queryset.order_by(self.watermark, "id")
+
+    def batches(self, mark, batch_size):
+        """
+        Yield ({column: [values]}, (last_timestamp, last_id)) for the rows
+        past `mark`, `batch_size` rows at a time (keyset pagination).
+        """
+        names = list(self.columns)
+        paths = [path for path, _ in self.columns.values()]
+        extra = [] if self.watermark == "id" else [self.watermark]
+        last_timestamp, last_id = mark.last_timestamp, mark.last_id
+        while True:
+            cursor = ExportWatermark(last_id=last_id, last_timestamp=last_timestamp)
+            rows = list(self._pending(cursor).values_list(*paths, "id", *extra)[:batch_size])
+            if not rows:
+                return
+            # transpose once per batch: one list per column
+            values = list(zip(*rows))
+            last_id = rows[-1][len(paths)]
+            last_timestamp = rows[-1][-1] if extra else None
+            yield dict(zip(names, values[:len(paths)])), (last_timestamp, last_id)
+
+
+CURRICULUM_COLUMNS = {
+    "lesson_id": ("id", "int64"),
+    "lesson_title": ("title", "string"),
+    "lesson_order": ("order", "int64"),
+    "lesson_position": ("position", "int64"),
+    "unit_id": ("unit_id", "int64"),
+    "unit_title": ("unit__title", "string"),
+    "unit_order": ("unit__order", "int64"),
+    "course_id": ("unit__course_id", "int64"),
+    "course_name": ("unit__course__name", "string"),
+    "grade_id": ("unit__course__grade_id", "int64"),
+    "grade_name": ("unit__course__grade__name", "string"),
+}
+
+DATASETS = {
+    "lesson-progress": ColumnarDataset(
+        LessonProgress,
+        columns={
+            "id": ("id", "int64"),
+            "user_id": ("user_id", "int64"),
+            "lesson_id": ("lesson_id", "int64"),
+            "unit_id": ("lesson__unit_id", "int64"),
+            "course_id": ("lesson__unit__course_id", "int64"),
+            "grade_id": ("lesson__unit__course__grade_id", "int64"),
+            "is_completed": ("is_completed", "bool"),
+            "started_at": ("started_at", "timestamp"),
+            "last_accessed": ("last_accessed", "timestamp"),
+        },
+        watermark="last_accessed",
+        partition_by="last_accessed",
+    ),
+    "quiz-attempts": ColumnarDataset(
+        QuizAttempt,
+        columns={
+            "id": ("id", "int64"),
+            "user_id": ("user_id", "int64"),
+            "quiz_id": ("quiz_id", "int64"),
+            "lesson_id": ("quiz__lesson_id", "int64"),
+            "unit_id": ("quiz__lesson__unit_id", "int64"),
+            "course_id": ("quiz__lesson__unit__course_id", "int64"),
+            "grade_id": ("quiz__lesson__unit__course__grade_id", "int64"),
+            "score": ("score", "float64"),
+            "attempted_at": ("attempted_at", "timestamp"),
+        },
+        watermark="id",
+        partition_by="attempted_at",
+        written_at="created_at",
+    ),
+    "user-answers": ColumnarDataset(
+        UserAnswer,
+        columns={
+            "id": ("id", "int64"),
+            "attempt_id": ("attempt_id", "int64"),
+            "user_id": ("attempt__user_id", "int64"),
+            "quiz_id": ("attempt__quiz_id", "int64"),
+            "lesson_id": ("attempt__quiz__lesson_id", "int64"),
+            "question_id": ("question_id", "int64"),
+            "selected_answer_id": ("selected_answer_id", "int64"),
+            "is_correct": ("is_correct", "bool"),
+            "attempted_at": ("attempt__attempted_at", "timestamp"),
+        },
+        watermark="id",
+        partition_by="attempted_at",
+        written_at="attempt__created_at",
+    ),
+}
+
+
+def _arrow_type(kind):
+    return {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "bool": pa.bool_(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+    }[kind]
+
+
+def _table(columns, values):
+    return pa.table({
+        name: pa.array(values[name], type=_arrow_type(kind))
+        for name, (_, kind) in columns.items()
+    })
+
+
+def write_batch(root, name, dataset, values, part, file_format):
+    """Write one batch as day-partitioned part files under <root>/<name>/."""
+    table = _table(dataset.columns, values)
+    table = table.append_column("date", pc.cast(table[dataset.partition_by], pa.date32()))
+    ds.write_dataset(
+        table,
+        os.path.join(root, name),
+        format=FILE_FORMATS[file_format],
+        partitioning=["date"],
+        partitioning_flavor="hive",
+        basename_template=f"part-{part}-{{i}}.{file_format}",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+
+def write_curriculum(root, file_format):
+    """Overwrite the curriculum dimension table (one row per lesson)."""
+    paths = [path for path, _ in CURRICULUM_COLUMNS.values()]
+    rows = list(Lesson.objects.order_by("id").values_list(*paths))
+    values = dict(zip(CURRICULUM_COLUMNS, zip(*rows))) if rows else {
+        name: [] for name in CURRICULUM_COLUMNS}
+    ds.write_dataset(
+        _table(CURRICULUM_COLUMNS, values),
+        os.path.join(root, "curriculum"),
+        format=FILE_FORMATS[file_format],
+        basename_template=f"lessons-{{i}}.{file_format}",
+        existing_data_behavior="delete_matching",
+    )
+    return len(rows)
+
+
+def export_dataset(name, root, file_format="parquet", batch_size=None, writer=write_batch):
+    """
+    Export the rows of a dataset added (or changed) since the last run and
+    advance its watermark after every batch. Returns the number of rows.
+    """
+    dataset = DATASETS[name]
+    batch_size = batch_size or settings.ANALYTICS_EXPORT_BATCH_SIZE
+    mark, _ = ExportWatermark.objects.get_or_create(dataset=name)
+    run = timezone.now().strftime("%Y%m%dT%H%M%S")
+
+    exported = 0
+    for number, (values, (last_timestamp, last_id)) in enumerate(dataset.batches(mark, batch_size)):
+        writer(root, name, dataset, values, f"{run}-{number}", file_format)
+        mark.last_timestamp, mark.last_id = last_timestamp, last_id
+        mark.save(update_fields=["last_timestamp", "last_id", "updated_at"])
+        exported += len(values["id"])
+    return exported
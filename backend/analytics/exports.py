@@ -0,0 +1,175 @@
+import csv
+from datetime import datetime, time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from progress.models import LessonProgress
+from quizzes.models import QuizAttempt, UserAnswer
+
+# Rows fetched per round trip; on PostgreSQL this is the server-side
+# cursor's fetch size, so memory stays flat whatever the export size.
+CHUNK_SIZE = 2000
+
+
+class Dataset:
+    """
+    An exportable table: `columns` maps output column names to ORM paths,
+    and `filters` maps the supported filters (grade, course, date) to the
+    lookups they apply.
+    """
+
+    def __init__(self, model, columns, grade, course, date):
+        self.model = model
+        self.columns = columns
+        self.filters = {"grade": grade, "course": course, "date": date}
+
+    def queryset(self, grade=None, course=None, since=None, until=None):
+        queryset = self.model.objects.all()
+        if grade is not None:
+            queryset = queryset.filter(**{self.filters["grade"]: grade})
+        if course is not None:
+            queryset = queryset.filter(**{self.filters["course"]: course})
+        if since is not None:
+            queryset = queryset.filter(**{f"{self.filters['date']}__gte": since})
+        if until is not None:
+            queryset = queryset.filter(**{f"{self.filters['date']}__lt": until})
+        return queryset.order_by("id").values_list(*self.columns.values())
+
+    def rows(self, **filters):
+        """Matching rows as tuples, streamed from the database."""
+        return self.queryset(**filters).iterator(chunk_size=CHUNK_SIZE)
+
+
+DATASETS = {
+    "lesson-progress": Dataset(
+        LessonProgress,
+        columns={
+            "id": "id",
+            "user_id": "user_id",
+            "lesson_id": "lesson_id",
+            "course_id": "lesson__unit__course_id",
+            "grade_id": "lesson__unit__course__grade_id",
+            "is_completed": "is_completed",
+            "started_at": "started_at",
+            "last_accessed": "last_accessed",
+        },
+        grade="lesson__unit__course__grade_id",
+        course="lesson__unit__course_id",
+        date="last_accessed",
+    ),
+    "quiz-attempts": Dataset(
+        QuizAttempt,
+        columns={
+            "id": "id",
+            "user_id": "user_id",
+            "quiz_id": "quiz_id",
+            "lesson_id": "quiz__lesson_id",
+            "course_id": "quiz__lesson__unit__course_id",
+            "grade_id": "quiz__lesson__unit__course__grade_id",
+            "score": "score",
+            "attempted_at": "attempted_at",
+        },
+        grade="quiz__lesson__unit__course__grade_id",
+        course="quiz__lesson__unit__course_id",
+        date="attempted_at",
+    ),
+    "user-answers": Dataset(
+        UserAnswer,
+        columns={
+            "id": "id",
+            "attempt_id": "attempt_id",
+            "user_id": "attempt__user_id",
+            "quiz_id": "attempt__quiz_id",
+            "question_id": "question_id",
+            "selected_answer_id": "selected_answer_id",
+            "is_correct": "is_correct",
+            "attempted_at": "attempt__attempted_at",
+        },
+        grade="attempt__quiz__lesson__unit__course__grade_id",
+        course="attempt__quiz__lesson__unit__course_id",
+        date="attempt__attempted_at",
+    ),
+}
+
+
+def _parse_moment(value):
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{value}' is not a date or datetime.")
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_filters(grade=None, course=None, since=None, until=None):
+    """
+    Export filters from raw strings (query parameters or command options).
+    `since` is inclusive and `until` exclusive; both accept ISO dates or
+    datetimes. Raises ValueError on malformed values.
+    """
+    filters = {}
+    for name, value in (("grade", grade), ("course", course)):
+        if value not in (None, ""):
+            try:
+                filters[name] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be an integer id.")
+    for name, value in (("since", since), ("until", until)):
+        if value not in (None, ""):
+            filters[name] = _parse_moment(value)
+    return filters
+
+
+class _Echo:
+    """File-like object whose write() returns the line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(dataset, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(list(dataset.columns))
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_lines(dataset, rows):
+    columns = list(dataset.columns)
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+}
+
+
+def export_lines(name, file_format, **filters):
+    """
+    Lines of an export as a lazy generator: nothing is read from the
+    database until it is iterated, and at most CHUNK_SIZE rows are held.
+    """
+    dataset = DATASETS[name]
+    render, _ = FORMATS[file_format]
+    return render(dataset, dataset.rows(**filters))
+
+
+def in_blocks(lines, size=64 * 1024):
+    """Join lines into blocks of about `size` characters for streaming."""
+    block, length = [], 0
+    for line in lines:
+        block.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(block)
+            block, length = [], 0
+    if block:
+        yield "".join(block)
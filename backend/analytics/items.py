@@ -0,0 +1,138 @@
+"""
+Item analysis of quiz questions: difficulty and discrimination per question
+(QuestionStats) and pick counts per answer option (AnswerStats).
+
+update_item_stats() aggregates the UserAnswer rows past the "item-analysis"
+RollupWatermark with GROUP BY queries over id ranges of at most
+ANALYTICS_ITEM_BATCH_SIZE rows, so the database does the counting and memory
+stays bounded by the number of questions in a batch, not answers. A rebuild
+runs the same batches from the first answer.
+
+Archived attempts no longer have UserAnswer rows: their answers stay in the
+stats until a rebuild. Rebuild after re-scoring a quiz.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from quizzes.models import UserAnswer
+from .models import AnswerStats, QuestionStats, RollupWatermark
+
+SOURCE = "item-analysis"
+QUESTION_SUMS = ("responses", "correct", "score_sum", "score_square_sum", "correct_score_sum")
+
+
+def _question_sums(answers):
+    score = F("attempt__score")
+    return answers.values("question_id").annotate(
+        responses=Count("id"),
+        correct=Count("id", filter=Q(is_correct=True)),
+        score_sum=Sum(score, output_field=FloatField()),
+        score_square_sum=Sum(score * score, output_field=FloatField()),
+        correct_score_sum=Coalesce(
+            Sum(score, filter=Q(is_correct=True), output_field=FloatField()), Value(0.0)),
+    ).order_by()
+
+
+def _add(model, key, fields, rows):
+    """Add aggregated `rows` (dicts with `key` and `fields`) to the stats rows."""
+    existing = model.objects.select_for_update().in_bulk([row[key] for row in rows], field_name=key)
+    changed, created = [], []
+    for row in rows:
+        stats = existing.get(row[key])
+        if stats is None:
+            stats = model(**{key: row[key]})
+            created.append(stats)
+        else:
+            changed.append(stats)
+        for field in fields:
+            setattr(stats, field, getattr(stats, field) + row[field])
+    model.objects.bulk_update(changed, fields, batch_size=500)
+    model.objects.bulk_create(created, batch_size=500)
+
+
+def _next_range(mark, horizon, batch_size):
+    """Last UserAnswer id of the next batch, or None when there is none."""
+    rows = UserAnswer.objects.filter(id__gt=mark.last_id).order_by("id") \
+        .values_list("id", "attempt__created_at")[:batch_size]
+    upto = None
+    for answer_id, created_at in rows:
+        # answers of recent attempts may be committed out of id order;
+        # attempted_at can be backdated (exam mode), created_at cannot
+        if created_at >= horizon:
+            break
+        upto = answer_id
+    return upto
+
+
+def update_item_stats(batch_size=None):
+    """
+    Add the answers recorded since the last run to the item statistics.
+    Returns the number of answers processed.
+    """
+    batch_size = batch_size or settings.ANALYTICS_ITEM_BATCH_SIZE
+    horizon = timezone.now() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+    RollupWatermark.objects.get_or_create(source=SOURCE)
+    processed = 0
+    while True:
+        with transaction.atomic():
+            mark = RollupWatermark.objects.select_for_update().get(source=SOURCE)
+            upto = _next_range(mark, horizon, batch_size)
+            if upto is None:
+                break
+            answers = UserAnswer.objects.filter(id__gt=mark.last_id, id__lte=upto)
+            question_rows = list(_question_sums(answers))
+            _add(QuestionStats, "question_id", QUESTION_SUMS, question_rows)
+            _add(AnswerStats, "answer_id", ["picks"], [
+                {"answer_id": row["selected_answer_id"], "picks": row["picks"]}
+                for row in answers.values("selected_answer_id").annotate(picks=Count("id")).order_by()
+            ])
+            mark.last_id = upto
+            mark.save(update_fields=["last_id", "updated_at"])
+        processed += sum(row["responses"] for row in question_rows)
+    return processed
+
+
+def rebuild_item_stats(batch_size=None):
+    """Drop the item statistics and recompute them from every UserAnswer."""
+    with transaction.atomic():
+        QuestionStats.objects.all().delete()
+        AnswerStats.objects.all().delete()
+        RollupWatermark.objects.update_or_create(
+            source=SOURCE, defaults={"last_id": 0, "last_timestamp": None})
+    return update_item_stats(batch_size)
+
+
+def quiz_item_analysis(quiz):
+    """
+    Per-question difficulty, discrimination and answer pick rates of a quiz,
+    in three queries (questions with stats, answers with stats).
+    """
+    questions = quiz.questions.select_related("stats").prefetch_related("answers__stats") \
+        .order_by("id")
+    items = []
+    for question in questions:
+        stats = getattr(question, "stats", None) or QuestionStats(question=question)
+        answers = []
+        for answer in sorted(question.answers.all(), key=lambda answer: answer.id):
+            picks = answer.stats.picks if hasattr(answer, "stats") else 0
+            answers.append({
+                "id": answer.id,
+                "text": answer.text,
+                "is_correct": answer.is_correct,
+                "picks": picks,
+                "pick_rate": picks / stats.responses if stats.responses else None,
+            })
+        items.append({
+            "id": question.id,
+            "text": question.text,
+            "responses": stats.responses,
+            "difficulty": stats.difficulty,
+            "discrimination": stats.discrimination,
+            "answers": answers,
+        })
+    return items
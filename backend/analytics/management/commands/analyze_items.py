@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from analytics.items import rebuild_item_stats, update_item_stats
+
+
+class Command(BaseCommand):
+    help = "Add quiz answers since the last run to the question and answer statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild", action="store_true",
+            help="Recompute the statistics from every answer (e.g. after re-scoring)")
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Answers aggregated per query (default: ANALYTICS_ITEM_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        run = rebuild_item_stats if options["rebuild"] else update_item_stats
+        processed = run(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Analyzed {processed} answers."))
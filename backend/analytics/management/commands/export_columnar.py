@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from analytics.columnar import DATASETS, FILE_FORMATS, export_dataset, write_curriculum
+
+
+class Command(BaseCommand):
+    help = ("Append new learning activity to day-partitioned Parquet/Arrow files. "
+            "Meant to run from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("root", help="Directory of the columnar datasets")
+        parser.add_argument(
+            "--dataset", action="append", choices=sorted(DATASETS),
+            help="Dataset to export (repeatable; default: all)")
+        parser.add_argument("--format", dest="file_format", choices=sorted(FILE_FORMATS),
+                            default="parquet")
+        parser.add_argument("--batch-size", type=int, help="Rows per part file")
+
+    def handle(self, *args, **options):
+        lessons = write_curriculum(options["root"], options["file_format"])
+        self.stderr.write(f"curriculum: {lessons} lessons")
+        for name in options["dataset"] or sorted(DATASETS):
+            rows = export_dataset(name, options["root"], options["file_format"],
+                                  batch_size=options["batch_size"])
+            self.stderr.write(f"{name}: {rows} new rows")
+        self.stderr.write(self.style.SUCCESS(f"Exported to {options['root']}."))
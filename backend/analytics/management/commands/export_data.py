@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from analytics.exports import DATASETS, FORMATS, export_lines, parse_filters
+
+
+class Command(BaseCommand):
+    help = "Stream lesson progress, quiz attempts or user answers as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", dest="file_format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--grade", help="Only rows of this grade id")
+        parser.add_argument("--course", help="Only rows of this course id")
+        parser.add_argument("--since", help="Rows on or after this ISO date/datetime")
+        parser.add_argument("--until", help="Rows before this ISO date/datetime")
+        parser.add_argument(
+            "--output", "-o", default="-", help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(
+                grade=options["grade"], course=options["course"],
+                since=options["since"], until=options["until"])
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = export_lines(options["dataset"], options["file_format"], **filters)
+        if options["output"] == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+
+        written = 0
+        with open(options["output"], "w", newline="", encoding="utf-8") as out:
+            for line in lines:
+                out.write(line)
+                written += 1
+        self.stderr.write(self.style.SUCCESS(
+            f"Wrote {written} lines to {options['output']}."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import roll_up
+
+
+class Command(BaseCommand):
+    help = "Add lesson completions and quiz attempts since the last run to the daily rollups."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Events per transaction (default: ANALYTICS_ROLLUP_BATCH_SIZE)")
+
+    def handle(self, *args, **options):
+        processed = roll_up(batch_size=options["batch_size"])
+        for source, count in processed.items():
+            self.stdout.write(f"{source}: {count} new events")
+        self.stdout.write(self.style.SUCCESS("Activity rollups are up to date."))
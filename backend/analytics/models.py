@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.db import models
+
+from learning.models import Course, Grade
+from quizzes.models import Answer, Question
+
+
+class ExportWatermark(models.Model):
+    """
+    High-water mark of the columnar export of one dataset: the (timestamp,
+    id) or id of the last row written. Each run only exports rows past it.
+    """
+    dataset = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.dataset}: {self.last_timestamp or ''} #{self.last_id}"
+
+
+class RollupWatermark(models.Model):
+    """
+    Position of the activity rollup job in one event source: the
+    (timestamp, id) or id of the last event added to the rollups.
+    """
+    source = models.CharField(max_length=50, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.last_timestamp or ''} #{self.last_id}"
+
+
+class DailyCourseActivity(models.Model):
+    """
+    Learning activity in a course on one day, maintained by
+    analytics.rollups. `grade` is denormalized from the course.
+    """
+    day = models.DateField()
+    lessons_completed = models.PositiveIntegerField(default=0)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_score_total = models.FloatField(default=0)
+
+    # relations (FKs)
+    grade = models.ForeignKey(
+        Grade, on_delete=models.CASCADE, related_name='daily_activity')
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name='daily_activity')
+
+    class Meta:
+        unique_together = ('course', 'day')
+        indexes = [
+            models.Index(fields=["grade", "day"], name="daily_course_grade_idx"),
+            models.Index(fields=["day"], name="daily_course_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.course_id} on {self.day}: {self.lessons_completed} completed"
+
+
+class DailyUserActivity(models.Model):
+    """
+    A user's learning activity on one day, maintained by analytics.rollups.
+    """
+    day = models.DateField()
+    lessons_completed = models.PositiveIntegerField(default=0)
+    quiz_attempts = models.PositiveIntegerField(default=0)
+    quiz_score_total = models.FloatField(default=0)
+
+    # relations (FKs)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='daily_activity'
+    )
+
+    class Meta:
+        unique_together = ('user', 'day')
+
+    def __str__(self):
+        return f"{self.user_id} on {self.day}: {self.lessons_completed} completed"
+
+
+class QuestionStats(models.Model):
+    """
+    Item-analysis sums of a question over its recorded answers, maintained
+    by analytics.items. Each answer adds the score of its attempt, which is
+    enough to derive the difficulty and the point-biserial discrimination.
+    """
+    responses = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    score_square_sum = models.FloatField(default=0)
+    correct_score_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # relations (FKs)
+    question = models.OneToOneField(
+        Question, on_delete=models.CASCADE, related_name='stats')
+
+    @property
+    def difficulty(self):
+        """Share of responses that were correct (higher is easier)."""
+        return self.correct / self.responses if self.responses else None
+
+    @property
+    def discrimination(self):
+        """
+        Point-biserial correlation between answering this question correctly
+        and the attempt score; None until both groups have answers and the
+        scores vary.
+        """
+        n, n1 = self.responses, self.correct
+        if n1 == 0 or n1 == n:
+            return None
+        mean = self.score_sum / n
+        variance = self.score_square_sum / n - mean * mean
+        if variance <= 1e-12:
+            return None
+        mean_correct = self.correct_score_sum / n1
+        mean_wrong = (self.score_sum - self.correct_score_sum) / (n - n1)
+        p = n1 / n
+        return (mean_correct - mean_wrong) / variance ** 0.5 * (p * (1 - p)) ** 0.5
+
+    def __str__(self):
+        return f"{self.question}: {self.correct}/{self.responses} correct"
+
+
+class AnswerStats(models.Model):
+    """How often an answer option was picked, maintained by analytics.items."""
+    picks = models.PositiveIntegerField(default=0)
+
+    # relations (FKs)
+    answer = models.OneToOneField(
+        Answer, on_delete=models.CASCADE, related_name='stats')
+
+    def __str__(self):
+        return f"{self.answer}: picked {self.picks} times"
@@ -0,0 +1,199 @@
+"""
+Daily activity rollups: lessons completed and quiz attempts per day x course
+(DailyCourseActivity) and per day x user (DailyUserActivity).
+
+roll_up() reads only the events past each source's RollupWatermark and adds
+them to the rollup rows. A batch and its watermark commit in one transaction,
+so each event is counted exactly once, even if a run is interrupted.
+Events are counted as first seen: a lesson completed again later counts
+again, and re-scored quiz attempts keep their original score here.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from learning.curriculum import lesson_locations
+from progress.models import LessonProgress
+from quizzes.models import QuizAttempt
+from .models import DailyCourseActivity, DailyUserActivity, RollupWatermark
+
+MEASURES = ("lessons_completed", "quiz_attempts", "quiz_score_total")
+
+# longest range a time series may cover
+MAX_SERIES_DAYS = 366
+
+
+# ---------------------------
+# Event sources
+# ---------------------------
+def _events(rows):
+    """
+    (day, user_id, grade_id, course_id, values) events from (lesson_id, day,
+    user_id, values) rows. Course and grade come from one lesson_location
+    lookup, as for the progress counters, so they always agree.
+    """
+    locations = lesson_locations(row[0] for row in rows)
+    return [
+        (day, user_id, locations[lesson_id][1], locations[lesson_id][0], values)
+        for lesson_id, day, user_id, values in rows
+        if lesson_id in locations
+    ]
+
+
+def _completions(mark, horizon, batch_size):
+    """Lesson completions past the (completed_at, id) watermark."""
+    queryset = LessonProgress.objects.filter(completed_at__isnull=False, completed_at__lt=horizon)
+    if mark.last_timestamp is not None:
+        queryset = queryset.filter(
+            Q(completed_at__gt=mark.last_timestamp)
+            | Q(completed_at=mark.last_timestamp, id__gt=mark.last_id)
+        )
+    rows = list(
+        queryset.order_by("completed_at", "id").values_list(
+            "id", "completed_at", "user_id", "lesson_id")[:batch_size]
+    )
+    if not rows:
+        return [], None
+    events = _events([
+        (lesson_id, timezone.localdate(completed_at), user_id, (1, 0, 0.0))
+        for _, completed_at, user_id, lesson_id in rows
+    ])
+    return events, (rows[-1][1], rows[-1][0])
+
+
+def _attempts(mark, horizon, batch_size):
+    """Quiz attempts past the id watermark (attempts are append-only)."""
+    rows = list(
+        QuizAttempt.objects.filter(id__gt=mark.last_id).order_by("id").values_list(
+            "id", "created_at", "attempted_at", "user_id", "quiz__lesson_id",
+            "score")[:batch_size]
+    )
+    # stop before the first recently written attempt: an attempt with a lower
+    # id may still be uncommitted, and the watermark must not pass it.
+    # attempted_at can be backdated (exam mode), so the server time is used.
+    for index, row in enumerate(rows):
+        if row[1] >= horizon:
+            rows = rows[:index]
+            break
+    if not rows:
+        return [], None
+    events = _events([
+        (lesson_id, timezone.localdate(attempted_at), user_id, (0, 1, score))
+        for _, _, attempted_at, user_id, lesson_id, score in rows
+    ])
+    return events, (None, rows[-1][0])
+
+
+SOURCES = {
+    "lesson-completions": _completions,
+    "quiz-attempts": _attempts,
+}
+
+
+# ---------------------------
+# Rollup maintenance
+# ---------------------------
+def _increment(model, key_fields, totals):
+    """
+    Add `totals` ({key: (lessons, attempts, score)}, keys ordered like
+    `key_fields`, day first) to the rollup rows, creating missing ones.
+    """
+    if not totals:
+        return
+    scope = key_fields[-1]
+    rows = {
+        tuple(getattr(row, field) for field in key_fields): row
+        for row in model.objects.filter(**{
+            "day__in": {key[0] for key in totals},
+            f"{scope}__in": {key[-1] for key in totals},
+        })
+    }
+    changed, created = [], []
+    for key, values in totals.items():
+        row = rows.get(key)
+        if row is None:
+            row = model(**dict(zip(key_fields, key)))
+            created.append(row)
+        else:
+            changed.append(row)
+        for field, value in zip(MEASURES, values):
+            setattr(row, field, getattr(row, field) + value)
+    model.objects.bulk_update(changed, MEASURES, batch_size=500)
+    model.objects.bulk_create(created, batch_size=500)
+
+
+def _apply(events):
+    by_course = defaultdict(lambda: [0, 0, 0.0])
+    by_user = defaultdict(lambda: [0, 0, 0.0])
+    for day, user_id, grade_id, course_id, values in events:
+        for totals in (by_course[(day, grade_id, course_id)], by_user[(day, user_id)]):
+            for index, value in enumerate(values):
+                totals[index] += value
+    _increment(DailyCourseActivity, ("day", "grade_id", "course_id"), by_course)
+    _increment(DailyUserActivity, ("day", "user_id"), by_user)
+
+
+def roll_up(batch_size=None):
+    """
+    Add the events of every source since the last run to the rollups.
+    Returns the number of events processed per source.
+    """
+    batch_size = batch_size or settings.ANALYTICS_ROLLUP_BATCH_SIZE
+    horizon = timezone.now() - timedelta(seconds=settings.ANALYTICS_ROLLUP_LAG_SECONDS)
+    processed = {}
+    for name, read in SOURCES.items():
+        RollupWatermark.objects.get_or_create(source=name)
+        processed[name] = 0
+        while True:
+            with transaction.atomic():
+                # the row lock serializes concurrent runs
+                mark = RollupWatermark.objects.select_for_update().get(source=name)
+                events, last = read(mark, horizon, batch_size)
+                if last is None:
+                    break
+                _apply(events)
+                mark.last_timestamp, mark.last_id = last
+                mark.save(update_fields=["last_timestamp", "last_id", "updated_at"])
+            processed[name] += len(events)
+    return processed
+
+
+# ---------------------------
+# Time series
+# ---------------------------
+def activity_series(queryset, since, until, interval="day"):
+    """
+    Sum rollup rows per day, or per week starting on Monday, for the days in
+    [since, until). Periods without activity are included with zeros.
+    """
+    totals = {
+        row["day"]: row
+        for row in queryset.filter(day__gte=since, day__lt=until)
+        .values("day").annotate(**{field: Sum(field) for field in MEASURES}).order_by("day")
+    }
+
+    series = {}
+    day = since
+    while day < until:
+        start = day - timedelta(days=day.weekday()) if interval == "week" else day
+        point = series.setdefault(start, dict.fromkeys(MEASURES, 0))
+        row = totals.get(day)
+        if row:
+            for field in MEASURES:
+                point[field] += row[field]
+        day += timedelta(days=1)
+
+    return [
+        {
+            "date": start,
+            "lessons_completed": point["lessons_completed"],
+            "quiz_attempts": point["quiz_attempts"],
+            "average_score": (point["quiz_score_total"] / point["quiz_attempts"]
+                              if point["quiz_attempts"] else None),
+        }
+        for start, point in series.items()
+    ]
@@ -0,0 +1,34 @@
+from rest_framework import serializers
+
+
+class ActivityPointSerializer(serializers.Serializer):
+    """
+    One period of an activity time series; `date` is the day, or the Monday
+    of the week. `average_score` is null when no quiz was attempted.
+    """
+    date = serializers.DateField()
+    lessons_completed = serializers.IntegerField()
+    quiz_attempts = serializers.IntegerField()
+    average_score = serializers.FloatField(allow_null=True)
+
+
+class ItemAnswerSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    is_correct = serializers.BooleanField()
+    picks = serializers.IntegerField()
+    pick_rate = serializers.FloatField(allow_null=True)
+
+
+class ItemQuestionSerializer(serializers.Serializer):
+    """
+    Item analysis of a question: `difficulty` is the share of correct
+    responses and `discrimination` the point-biserial correlation between a
+    correct response and the attempt score (null until both are defined).
+    """
+    id = serializers.IntegerField()
+    text = serializers.CharField()
+    responses = serializers.IntegerField()
+    difficulty = serializers.FloatField(allow_null=True)
+    discrimination = serializers.FloatField(allow_null=True)
+    answers = ItemAnswerSerializer(many=True)
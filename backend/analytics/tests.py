@@ -0,0 +1,315 @@
+import csv
+import io
+import json
+import os
+import statistics
+import tempfile
+from datetime import date, timedelta
+
+import pyarrow.dataset as ds
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from analytics import columnar, items, rollups
+from analytics.models import (
+    AnswerStats, DailyCourseActivity, DailyUserActivity, ExportWatermark, QuestionStats)
+from core.testing import create_course, create_student
+from learning.curriculum import lesson_location
+from learning.models import Grade, Lesson
+from progress.models import LessonProgress
+from quizzes.models import Answer, Question, Quiz, QuizAttempt, UserAnswer
+
+User = get_user_model()
+
+
+class ActivityFixtures:
+    def setUp(self):
+        self.staff = User.objects.create_user(
+            email="staff@example.com", username="staff", password="password123", is_staff=True)
+        self.student = create_student()
+
+        self.math, (self.math_lesson,) = create_course()
+        self.grade1 = self.math.grade
+        _, (science_lesson,) = create_course("Science", Grade.objects.create(name="Grade 2"))
+
+        LessonProgress.objects.create(user=self.student, lesson=self.math_lesson, is_completed=True)
+        LessonProgress.objects.create(user=self.student, lesson=science_lesson)
+
+        quiz = Quiz.objects.create(title="Quiz", time_limit=10, max_score=10, min_score=5,
+                                   lesson=self.math_lesson)
+        question = Question.objects.create(quiz=quiz, text="Q", points=10)
+        answer = Answer.objects.create(question=question, text="A", is_correct=True)
+        now = timezone.now()
+        for days_ago in (1, 10):
+            attempt = QuizAttempt.objects.create(
+                user=self.student, quiz=quiz, score=10, attempted_at=now - timedelta(days=days_ago),
+                created_at=now - timedelta(days=days_ago))
+            UserAnswer.objects.create(attempt=attempt, question=question,
+                                      selected_answer=answer, is_correct=True)
+
+
+class ExportTests(ActivityFixtures, APITestCase):
+    def url(self, dataset, file_format):
+        return reverse("export", kwargs={"dataset": dataset, "file_format": file_format})
+
+    def test_staff_only(self):
+        self.client.force_authenticate(self.student)
+        response = self.client.get(self.url("lesson-progress", "csv"))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_csv_stream_filtered_by_grade(self):
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(self.url("lesson-progress", "csv"), {"grade": self.grade1.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+
+        rows = list(csv.DictReader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual([(int(row["lesson_id"]), row["is_completed"]) for row in rows],
+                         [(self.math_lesson.id, "True")])
+
+    def test_ndjson_stream_filtered_by_date(self):
+        self.client.force_authenticate(self.staff)
+        since = (timezone.now() - timedelta(days=5)).date().isoformat()
+        for dataset in ("quiz-attempts", "user-answers"):
+            response = self.client.get(self.url(dataset, "ndjson"),
+                                       {"course": self.math.id, "since": since})
+            lines = b"".join(response.streaming_content).decode().splitlines()
+            self.assertEqual(len(lines), 1, dataset)
+            self.assertEqual(json.loads(lines[0])["user_id"], self.student.id)
+
+    def test_bad_requests(self):
+        self.client.force_authenticate(self.staff)
+        self.assertEqual(self.client.get(self.url("lesson-progress", "xml")).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get(self.url("lesson-progress", "csv"), {"since": "soon"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "attempts.csv")
+            call_command("export_data", "quiz-attempts", "--output", path, stderr=io.StringIO())
+            with open(path, newline="") as f:
+                self.assertEqual(len(list(csv.DictReader(f))), 2)
+
+    def test_command_writes_stdout(self):
+        out = io.StringIO()
+        call_command("export_data", "quiz-attempts", "--format", "ndjson", stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), 2)
+
+
+class ColumnarExportTests(ActivityFixtures, APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.written = []
+
+    def record(self, root, name, dataset, values, part, file_format):
+        self.written.append((name, values))
+
+    def export(self, name, **kwargs):
+        return columnar.export_dataset(name, "unused", writer=self.record, **kwargs)
+
+    def test_incremental_by_id(self):
+        self.assertEqual(self.export("quiz-attempts", batch_size=1), 2)
+        self.assertEqual(len(self.written), 2)
+        self.assertEqual(self.written[0][1]["grade_id"], (self.grade1.id,))
+
+        self.assertEqual(self.export("quiz-attempts"), 0)
+        attempt = QuizAttempt.objects.create(user=self.student, quiz=Quiz.objects.get(), score=5)
+        # written within the lag: a lower id may still be uncommitted
+        self.assertEqual(self.export("quiz-attempts"), 0)
+        QuizAttempt.objects.filter(pk=attempt.pk).update(
+            created_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.export("quiz-attempts"), 1)
+        self.assertEqual(self.written[-1][1]["id"], (attempt.id,))
+        self.assertEqual(ExportWatermark.objects.get(dataset="quiz-attempts").last_id, attempt.id)
+
+    def test_changed_rows_exported_after_lag(self):
+        # rows accessed within the lag may still be written behind
+        self.assertEqual(self.export("lesson-progress"), 0)
+
+        old = timezone.now() - timedelta(hours=2)
+        LessonProgress.objects.update(last_accessed=old)
+        self.assertEqual(self.export("lesson-progress"), 2)
+        self.assertEqual(self.export("lesson-progress"), 0)
+
+        LessonProgress.objects.filter(lesson=self.math_lesson).update(
+            last_accessed=old + timedelta(hours=1))
+        self.assertEqual(self.export("lesson-progress"), 1)
+        self.assertEqual(self.written[-1][1]["lesson_id"], (self.math_lesson.id,))
+
+    def test_writes_day_partitions(self):
+        with tempfile.TemporaryDirectory() as root:
+            call_command("export_columnar", root, stderr=io.StringIO())
+            attempts = ds.dataset(os.path.join(root, "quiz-attempts"), partitioning="hive")
+            self.assertEqual(attempts.count_rows(), 2)
+            self.assertEqual(len(os.listdir(os.path.join(root, "quiz-attempts"))), 2)
+            curriculum = ds.dataset(os.path.join(root, "curriculum")).to_table()
+            self.assertEqual(curriculum.num_rows, Lesson.objects.count())
+
+
+@override_settings(ANALYTICS_ROLLUP_LAG_SECONDS=0)
+class ActivityRollupTests(ActivityFixtures, APITestCase):
+    def test_incremental_rollup(self):
+        processed = rollups.roll_up()
+        self.assertEqual(processed, {"lesson-completions": 1, "quiz-attempts": 2})
+        today = timezone.localdate()
+        row = DailyCourseActivity.objects.get(course=self.math, day=today)
+        self.assertEqual((row.grade_id, row.lessons_completed, row.quiz_attempts),
+                         (self.grade1.id, 1, 0))
+        self.assertEqual(DailyUserActivity.objects.filter(user=self.student).count(), 3)
+
+        # nothing new: nothing counted twice
+        self.assertEqual(rollups.roll_up(), {"lesson-completions": 0, "quiz-attempts": 0})
+        QuizAttempt.objects.create(user=self.student, quiz=Quiz.objects.get(), score=4)
+        self.assertEqual(rollups.roll_up(batch_size=1)["quiz-attempts"], 1)
+        row.refresh_from_db()
+        self.assertEqual((row.quiz_attempts, row.quiz_score_total), (1, 4))
+
+    def test_rows_keyed_by_lesson_location(self):
+        cache.clear()
+        rollups.roll_up()
+        self.assertEqual(
+            set(DailyCourseActivity.objects.values_list("course_id", "grade_id")),
+            {lesson_location(self.math_lesson.id)})
+        # the batch cached the locations it loaded
+        with self.assertNumQueries(0):
+            lesson_location(self.math_lesson.id)
+
+    @override_settings(ANALYTICS_ROLLUP_LAG_SECONDS=3600)
+    def test_recent_events_wait_for_the_lag(self):
+        # the completion just happened; both attempts are older than the lag
+        self.assertEqual(rollups.roll_up(), {"lesson-completions": 0, "quiz-attempts": 2})
+
+        quiz = Quiz.objects.get()
+        two_days_ago = timezone.now() - timedelta(days=2)
+        # an exam submission scored just now is backdated to when it was
+        # submitted: it still waits for the lag
+        QuizAttempt.objects.create(user=self.student, quiz=quiz, score=4,
+                                   attempted_at=two_days_ago)
+        QuizAttempt.objects.create(user=self.student, quiz=quiz, score=4,
+                                   attempted_at=two_days_ago, created_at=two_days_ago)
+        # the older attempt has the higher id: it waits behind the recent one
+        self.assertEqual(rollups.roll_up()["quiz-attempts"], 0)
+
+    def test_staff_series(self):
+        rollups.roll_up()
+        self.client.force_authenticate(self.staff)
+        today = timezone.localdate()
+        response = self.client.get(reverse("activity-series"), {
+            "course": self.math.id,
+            "since": (today - timedelta(days=2)).isoformat(),
+            "until": (today + timedelta(days=1)).isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [(point["lessons_completed"], point["quiz_attempts"], point["average_score"])
+             for point in response.data],
+            [(0, 0, None), (0, 1, 10.0), (1, 0, None)])
+
+        response = self.client.get(reverse("activity-series"), {"interval": "week"})
+        self.assertEqual(sum(point["quiz_attempts"] for point in response.data), 2)
+        # weeks are labelled by their Monday; the first one may be partial
+        self.assertTrue(all(date.fromisoformat(point["date"]).weekday() == 0
+                            for point in response.data))
+
+        self.assertEqual(self.client.get(reverse("activity-series"), {"interval": "hour"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get(reverse("activity-series"), {"since": "2020-01-01"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_student_series(self):
+        rollups.roll_up()
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.get(reverse("activity-series")).status_code,
+                         status.HTTP_403_FORBIDDEN)
+        response = self.client.get(reverse("my-activity-series"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 30)
+        self.assertEqual(sum(point["lessons_completed"] for point in response.data), 1)
+        self.assertEqual(sum(point["quiz_attempts"] for point in response.data), 2)
+
+
+@override_settings(ANALYTICS_ROLLUP_LAG_SECONDS=0)
+class ItemAnalysisTests(APITestCase):
+    def setUp(self):
+        self.staff = User.objects.create_superuser(
+            email="staff@example.com", username="staff", password="password123")
+        _, (lesson,) = create_course()
+        self.quiz = Quiz.objects.create(title="Quiz", time_limit=10, max_score=10, min_score=5,
+                                        lesson=lesson)
+        self.question = Question.objects.create(quiz=self.quiz, text="Q", points=5)
+        self.right = Answer.objects.create(question=self.question, text="Right", is_correct=True)
+        self.wrong = Answer.objects.create(question=self.question, text="Wrong")
+        self.unused = Answer.objects.create(question=self.question, text="Unused")
+        self.responses = []
+
+    def answer(self, score, is_correct):
+        student = create_student(f"s{len(self.responses)}")
+        attempt = QuizAttempt.objects.create(user=student, quiz=self.quiz, score=score,
+                                             attempted_at=timezone.now() - timedelta(minutes=5))
+        UserAnswer.objects.create(attempt=attempt, question=self.question, is_correct=is_correct,
+                                  selected_answer=self.right if is_correct else self.wrong)
+        self.responses.append((score, is_correct))
+
+    def expected_discrimination(self):
+        scores, correct = zip(*self.responses)
+        return statistics.correlation([float(c) for c in correct], scores)
+
+    def test_incremental_stats_match_rebuild(self):
+        for score, is_correct in [(10, True), (8, True), (3, False), (5, True)]:
+            self.answer(score, is_correct)
+        self.assertEqual(items.update_item_stats(batch_size=3), 4)
+        self.assertEqual(items.update_item_stats(), 0)
+        for score, is_correct in [(2, False), (9, True)]:
+            self.answer(score, is_correct)
+        self.assertEqual(items.update_item_stats(), 2)
+
+        stats = QuestionStats.objects.get(question=self.question)
+        self.assertEqual((stats.responses, stats.correct), (6, 4))
+        self.assertAlmostEqual(stats.difficulty, 4 / 6)
+        self.assertAlmostEqual(stats.discrimination, self.expected_discrimination())
+        self.assertEqual(AnswerStats.objects.get(answer=self.wrong).picks, 2)
+
+        self.assertEqual(items.rebuild_item_stats(), 6)
+        rebuilt = QuestionStats.objects.get(question=self.question)
+        self.assertEqual((rebuilt.responses, rebuilt.correct, rebuilt.score_sum),
+                         (6, 4, stats.score_sum))
+
+    @override_settings(ANALYTICS_ROLLUP_LAG_SECONDS=60)
+    def test_backdated_attempts_wait_for_the_lag(self):
+        # attempted five minutes ago, but written just now
+        self.answer(10, True)
+        self.assertEqual(items.update_item_stats(), 0)
+        QuizAttempt.objects.update(created_at=timezone.now() - timedelta(minutes=2))
+        self.assertEqual(items.update_item_stats(), 1)
+
+    def test_api_and_admin(self):
+        for score, is_correct in [(10, True), (0, False)]:
+            self.answer(score, is_correct)
+        call_command("analyze_items", stdout=io.StringIO())
+
+        url = reverse("item-analysis", kwargs={"quiz_id": self.quiz.id})
+        self.client.force_authenticate(User.objects.get(username="s0"))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        item = response.data[0]
+        self.assertEqual((item["responses"], item["difficulty"]), (2, 0.5))
+        self.assertAlmostEqual(item["discrimination"], 1.0)
+        self.assertEqual([(answer["picks"], answer["pick_rate"]) for answer in item["answers"]],
+                         [(1, 0.5), (1, 0.5), (0, 0.0)])
+
+        self.client.force_login(self.staff)
+        # ordered by the difficulty column
+        self.assertContains(self.client.get(reverse("admin:quizzes_question_changelist"), {"o": "5"}),
+                            "50%")
+        self.assertContains(self.client.get(reverse("admin:quizzes_answer_changelist")), "50%")
@@ -0,0 +1,10 @@
+from django.urls import path
+from .views import ActivitySeriesView, ExportView, ItemAnalysisView, MyActivitySeriesView
+
+urlpatterns = [
+    path('exports/<slug:dataset>.<slug:file_format>',
+         ExportView.as_view(), name='export'),
+    path('activity/', ActivitySeriesView.as_view(), name='activity-series'),
+    path('activity/me/', MyActivitySeriesView.as_view(), name='my-activity-series'),
+    path('quizzes/<int:quiz_id>/items/', ItemAnalysisView.as_view(), name='item-analysis'),
+]
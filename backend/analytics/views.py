@@ -0,0 +1,171 @@
+from datetime import timedelta
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from drf_yasg import openapi
+from drf_yasg.utils import swagger_auto_schema
+from rest_framework import status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from quizzes.models import Quiz
+from .exports import DATASETS, FORMATS, export_lines, in_blocks, parse_filters
+from .items import quiz_item_analysis
+from .models import DailyCourseActivity, DailyUserActivity
+from .rollups import MAX_SERIES_DAYS, activity_series
+from .serializers import ActivityPointSerializer, ItemQuestionSerializer
+
+SERIES_PARAMETERS = [
+    openapi.Parameter("since", openapi.IN_QUERY,
+                      description="First day (ISO 8601; default: 30 days before `until`)",
+                      type=openapi.TYPE_STRING),
+    openapi.Parameter("until", openapi.IN_QUERY,
+                      description="Day after the last one (ISO 8601; default: tomorrow)",
+                      type=openapi.TYPE_STRING),
+    openapi.Parameter("interval", openapi.IN_QUERY, description="`day` (default) or `week`",
+                      type=openapi.TYPE_STRING),
+]
+
+
+def series_filters(params):
+    """
+    Filters of a time-series request: grade, course, since and until (as
+    dates) and interval. Raises ValueError on malformed or too wide ranges.
+    """
+    filters = parse_filters(**{
+        name: params.get(name) for name in ("grade", "course", "since", "until")})
+    until = (timezone.localdate(filters["until"]) if "until" in filters
+             else timezone.localdate() + timedelta(days=1))
+    since = (timezone.localdate(filters["since"]) if "since" in filters
+             else until - timedelta(days=30))
+    if since >= until:
+        raise ValueError("since must be before until.")
+    if (until - since).days > MAX_SERIES_DAYS:
+        raise ValueError(f"A series covers at most {MAX_SERIES_DAYS} days.")
+    interval = params.get("interval") or "day"
+    if interval not in ("day", "week"):
+        raise ValueError("interval must be 'day' or 'week'.")
+    filters.update(since=since, until=until, interval=interval)
+    return filters
+
+
+# ---------------------------
+# Bulk data exports (staff only)
+# ---------------------------
+class ExportView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_id="export_dataset",
+        operation_description="Stream `lesson-progress`, `quiz-attempts` or `user-answers` rows \
+            as CSV or NDJSON. Staff only.",
+        manual_parameters=[
+            openapi.Parameter("grade", openapi.IN_QUERY, description="Only rows of this grade",
+                              type=openapi.TYPE_INTEGER),
+            openapi.Parameter("course", openapi.IN_QUERY, description="Only rows of this course",
+                              type=openapi.TYPE_INTEGER),
+            openapi.Parameter("since", openapi.IN_QUERY,
+                              description="Rows on or after this date/datetime (ISO 8601)",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter("until", openapi.IN_QUERY,
+                              description="Rows before this date/datetime (ISO 8601)",
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={200: "CSV or NDJSON stream"},
+    )
+    def get(self, request, dataset, file_format):
+        if dataset not in DATASETS or file_format not in FORMATS:
+            return Response(
+                {"detail": f"Unknown export '{dataset}.{file_format}'."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        try:
+            filters = parse_filters(**{
+                name: request.query_params.get(name)
+                for name in ("grade", "course", "since", "until")
+            })
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        _, content_type = FORMATS[file_format]
+        response = StreamingHttpResponse(
+            in_blocks(export_lines(dataset, file_format, **filters)), content_type=content_type)
+        filename = f"{dataset}-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+
+# ---------------------------
+# Activity time series (read from the daily rollups)
+# ---------------------------
+class ActivitySeriesView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_id="activity_series",
+        operation_description="Lessons completed, quiz attempts and average quiz score per day \
+            or week, optionally for one grade or course. Staff only; updated by \
+            `manage.py rollup_activity`.",
+        manual_parameters=[
+            openapi.Parameter("grade", openapi.IN_QUERY, description="Only this grade",
+                              type=openapi.TYPE_INTEGER),
+            openapi.Parameter("course", openapi.IN_QUERY, description="Only this course",
+                              type=openapi.TYPE_INTEGER),
+            *SERIES_PARAMETERS,
+        ],
+        responses={200: ActivityPointSerializer(many=True)},
+    )
+    def get(self, request):
+        try:
+            filters = series_filters(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = DailyCourseActivity.objects.all()
+        if "grade" in filters:
+            queryset = queryset.filter(grade_id=filters["grade"])
+        if "course" in filters:
+            queryset = queryset.filter(course_id=filters["course"])
+        series = activity_series(queryset, filters["since"], filters["until"], filters["interval"])
+        return Response(ActivityPointSerializer(series, many=True).data)
+
+
+class MyActivitySeriesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="my_activity_series",
+        operation_description="The authenticated user's lessons completed, quiz attempts and \
+            average quiz score per day or week.",
+        manual_parameters=SERIES_PARAMETERS,
+        responses={200: ActivityPointSerializer(many=True)},
+    )
+    def get(self, request):
+        try:
+            filters = series_filters(request.query_params)
+        except ValueError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = DailyUserActivity.objects.filter(user=request.user)
+        series = activity_series(queryset, filters["since"], filters["until"], filters["interval"])
+        return Response(ActivityPointSerializer(series, many=True).data)
+
+
+# ---------------------------
+# Quiz item analysis (staff only)
+# ---------------------------
+class ItemAnalysisView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_id="quiz_item_analysis",
+        operation_description="Difficulty, discrimination and answer pick rates of every question \
+            of a quiz. Staff only; updated by `manage.py analyze_items`.",
+        responses={200: ItemQuestionSerializer(many=True)},
+    )
+    def get(self, request, quiz_id):
+        quiz = get_object_or_404(Quiz, id=quiz_id)
+        serializer = ItemQuestionSerializer(quiz_item_analysis(quiz), many=True)
+        return Response(serializer.data)
@@ -0,0 +1,63 @@
+"""
+Ad-hoc performance benchmarks. Run from the backend directory, e.g.
+
+    python -m benchmarks.exam_burst
+
+Each benchmark creates a throwaway test database, seeds it and prints its
+measurements; nothing touches the development database.
+"""
+import os
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "core.settings")
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """
+    Create the test database for the default alias, drop it afterwards.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def report(title, latencies, elapsed):
+    """
+    Print throughput and latency percentiles (latencies in seconds).
+    """
+    count = len(latencies)
+    print(f"{title}")
+    print(f"  requests:   {count}")
+    print(f"  throughput: {count / elapsed if elapsed else 0:.1f} req/s")
+    for pct in (50, 95, 99):
+        print(f"  p{pct}:        {percentile(latencies, pct) * 1000:.2f} ms")
@@ -0,0 +1,122 @@
+"""
+Requests per second on the hot read/write endpoints with the configured
+database. Run it once per database mode and compare, e.g.
+
+    python -m benchmarks.db_throughput
+    DB_ENGINE=postgres DB_POOL_MAX_SIZE=8 python -m benchmarks.db_throughput
+    DB_ENGINE=postgres DB_CONN_MAX_AGE=0 python -m benchmarks.db_throughput
+
+Each thread plays a stream of students. Connections are released after
+every request as the request_finished handler of a real server does, so
+the reconnect cost of CONN_MAX_AGE=0 and the savings of persistent or
+pooled connections show up in the numbers.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import Timer, report, setup_django, test_database
+
+
+def seed(students, lessons):
+    from django.contrib.auth import get_user_model
+    from learning.models import Course, Grade, Lesson, Unit
+    from quizzes.models import Answer, Question, Quiz
+
+    User = get_user_model()
+    grade = Grade.objects.create(name="Bench grade")
+    course = Course.objects.create(name="Bench course", grade=grade)
+    unit = Unit.objects.create(title="Unit", order=1, course=course)
+    lesson_rows = [
+        Lesson.objects.create(title=f"Lesson {i}", order=i, unit=unit)
+        for i in range(1, lessons + 1)
+    ]
+    quiz = Quiz.objects.create(title="Quiz", time_limit=30, max_score=5, min_score=0,
+                               lesson=lesson_rows[0])
+    for i in range(5):
+        question = Question.objects.create(text=f"Q{i}", points=1, quiz=quiz)
+        Answer.objects.create(text="right", question=question, is_correct=True)
+        Answer.objects.create(text="wrong", question=question)
+
+    users = User.objects.bulk_create([
+        User(email=f"student{i}@bench.test", username=f"student{i}", grade=grade)
+        for i in range(students)
+    ])
+    return users, course, lesson_rows, quiz
+
+
+def requests_for(user, course, lessons, quiz):
+    """One student's session: open a lesson, check progress, load the quiz."""
+    from django.urls import reverse
+
+    # later lessons are locked until the first is completed
+    return [
+        ("post", reverse("lesson-progress", kwargs={"lesson_id": lessons[0].id})),
+        ("get", reverse("course-lessons-progress", kwargs={"course_id": course.id})),
+        ("get", reverse("overall-progress")),
+        ("get", reverse("next-lessons")),
+        ("get", reverse("quiz-details", kwargs={"quiz_id": quiz.id})),
+    ]
+
+
+def run(users, course, lessons, quiz, threads):
+    from django.db import close_old_connections
+    from rest_framework.test import APIClient
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = APIClient()
+        local = []
+        for user in chunk:
+            client.force_authenticate(user)
+            for method, url in requests_for(user, course, lessons, quiz):
+                start = time.perf_counter()
+                response = getattr(client, method)(url)
+                # the test client skips request_finished's connection handling
+                close_old_connections()
+                local.append(time.perf_counter() - start)
+                assert response.status_code < 400, (url, response.status_code)
+        with lock:
+            latencies.extend(local)
+
+    workers = [
+        threading.Thread(target=worker, args=(users[index::threads],))
+        for index in range(threads)
+    ]
+    with Timer() as total:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    return latencies, total.elapsed
+
+
+def describe(connection):
+    settings_dict = connection.settings_dict
+    pool = settings_dict["OPTIONS"].get("pool")
+    if connection.vendor != "postgresql":
+        return connection.vendor
+    if pool:
+        return f"postgresql, pool max_size={pool.get('max_size')}"
+    return f"postgresql, CONN_MAX_AGE={settings_dict['CONN_MAX_AGE']}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--lessons", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database() as connection:
+        seeded = seed(args.students, args.lessons)
+        latencies, elapsed = run(*seeded, threads=args.threads)
+        report(f"Hot endpoints ({describe(connection)}, {args.threads} threads)",
+               latencies, elapsed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Simulate a burst of quiz submissions at an exam deadline and compare the
+synchronous SubmitQuiz path with exam mode (enqueue + batch scoring).
+
+    python -m benchmarks.exam_burst --submissions 1000 --questions 20 --threads 16
+
+Submissions are posted from --threads concurrent clients. In exam mode a
+scorer thread drains the queue while the burst runs, and the report adds
+the time from posting a submission to its scored result next to the
+acknowledgement latencies.
+"""
+import argparse
+import threading
+import time
+
+from benchmarks import Timer, report, setup_django, test_database
+
+
+def seed(submissions, questions):
+    from django.contrib.auth import get_user_model
+    from learning.models import Course, Grade, Lesson, Unit
+    from quizzes.models import Answer, Question, Quiz
+
+    User = get_user_model()
+    grade = Grade.objects.create(name="Bench grade")
+    course = Course.objects.create(name="Bench course", grade=grade)
+    unit = Unit.objects.create(title="Unit", order=1, course=course)
+    lesson = Lesson.objects.create(title="Lesson", order=1, unit=unit)
+
+    quizzes = {}
+    for exam_mode in (False, True):
+        quiz = Quiz.objects.create(
+            title=f"Exam {exam_mode}", time_limit=30, max_score=questions,
+            min_score=0, lesson=lesson, exam_mode=exam_mode)
+        payload = []
+        for i in range(questions):
+            question = Question.objects.create(text=f"Q{i}", points=1, quiz=quiz)
+            right = Answer.objects.create(text="right", question=question, is_correct=True)
+            Answer.objects.create(text="wrong", question=question)
+            payload.append({"question_id": question.id, "selected_answer_id": right.id})
+        quizzes[exam_mode] = (quiz, {"answers": payload})
+
+    users = User.objects.bulk_create([
+        User(email=f"student{i}@bench.test", username=f"student{i}")
+        for i in range(submissions)
+    ])
+    return users, quizzes
+
+
+def burst(users, quiz, payload, threads):
+    """
+    Post one submission per user from `threads` clients. Returns the
+    request latencies, the elapsed time and {submission id: post start}
+    for the submissions that were queued.
+    """
+    from django.db import close_old_connections
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    url = reverse("submit-quiz", kwargs={"quiz_id": quiz.id})
+    latencies, queued = [], {}
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = APIClient()
+        local, started = [], {}
+        for user in chunk:
+            client.force_authenticate(user)
+            start = time.perf_counter()
+            try:
+                response = client.post(url, payload, format="json")
+            finally:
+                close_old_connections()
+            local.append(time.perf_counter() - start)
+            assert response.status_code in (200, 202), response.content
+            if response.status_code == 202:
+                started[response.data["id"]] = start
+        with lock:
+            latencies.extend(local)
+            queued.update(started)
+
+    workers = [
+        threading.Thread(target=worker, args=(users[index::threads],))
+        for index in range(threads)
+    ]
+    with Timer() as total:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    return latencies, total.elapsed, queued
+
+
+class Scorer(threading.Thread):
+    """
+    Drain the exam queue while the burst runs and note when each submission
+    was scored (the end of the batch that processed it).
+    """
+
+    def __init__(self, batch_size):
+        super().__init__(name="Scorer")
+        self.batch_size = batch_size
+        self.scored_at = {}
+        self.stopping = threading.Event()
+
+    def run(self):
+        from django.db import close_old_connections
+        from quizzes.models import QuizSubmission
+        from quizzes.submissions import process_submissions
+
+        try:
+            while True:
+                processed = process_submissions(batch_size=self.batch_size)
+                now = time.perf_counter()
+                done = QuizSubmission.objects.exclude(status=QuizSubmission.PENDING) \
+                    .exclude(id__in=self.scored_at).values_list("id", flat=True)
+                self.scored_at.update(dict.fromkeys(done, now))
+                if not processed:
+                    if self.stopping.is_set():
+                        return
+                    time.sleep(0.05)
+        finally:
+            close_old_connections()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--submissions", type=int, default=1000)
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    setup_django()
+    with test_database():
+        users, quizzes = seed(args.submissions, args.questions)
+
+        latencies, elapsed, _ = burst(users, *quizzes[False], threads=args.threads)
+        report("Synchronous SubmitQuiz (submit to result)", latencies, elapsed)
+
+        scorer = Scorer(args.batch_size)
+        with Timer() as total:
+            scorer.start()
+            latencies, elapsed, queued = burst(users, *quizzes[True], threads=args.threads)
+            scorer.stopping.set()
+            scorer.join()
+        report("Exam mode: enqueue (acknowledgement)", latencies, elapsed)
+        report("Exam mode: submit to scored result",
+               [scorer.scored_at[sub_id] - start for sub_id, start in queued.items()],
+               total.elapsed)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Measure peak Python memory while exporting lesson progress, streamed
+(analytics.exports) versus loaded into a list first.
+
+    python -m benchmarks.export_memory --users 2000 --lessons 100
+"""
+import argparse
+import tracemalloc
+
+from benchmarks import Timer, setup_django, test_database
+
+
+def seed(users, lessons):
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from learning.models import Course, Grade, Lesson, Unit
+    from progress.models import LessonProgress
+
+    User = get_user_model()
+    grade = Grade.objects.create(name="Bench grade")
+    course = Course.objects.create(name="Bench course", grade=grade)
+    unit = Unit.objects.create(title="Unit", order=1, course=course)
+    lesson_ids = [
+        lesson.id for lesson in Lesson.objects.bulk_create([
+            Lesson(title=f"Lesson {i}", order=i, unit=unit) for i in range(lessons)])
+    ]
+    user_ids = [
+        user.id for user in User.objects.bulk_create([
+            User(email=f"student{i}@bench.test", username=f"student{i}") for i in range(users)])
+    ]
+    now = timezone.now()
+    for user_id in user_ids:
+        LessonProgress.objects.bulk_create([
+            LessonProgress(user_id=user_id, lesson_id=lesson_id, is_completed=True,
+                           started_at=now, last_accessed=now)
+            for lesson_id in lesson_ids
+        ])
+    return len(user_ids) * len(lesson_ids)
+
+
+def measure(title, export):
+    tracemalloc.start()
+    with Timer() as timer:
+        lines = export()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(title)
+    print(f"  lines:      {lines}")
+    print(f"  elapsed:    {timer.elapsed:.2f} s")
+    print(f"  peak alloc: {peak / 2 ** 20:.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--lessons", type=int, default=100)
+    args = parser.parse_args()
+
+    setup_django()
+    from analytics.exports import DATASETS, csv_lines, export_lines, in_blocks
+
+    with test_database():
+        rows = seed(args.users, args.lessons)
+        print(f"Seeded {rows} lesson progress rows")
+
+        def streamed():
+            return sum(block.count("\n") for block in in_blocks(export_lines("lesson-progress", "csv")))
+
+        def loaded():
+            dataset = DATASETS["lesson-progress"]
+            return sum(1 for _ in csv_lines(dataset, list(dataset.queryset())))
+
+        measure("Streamed export (server-side cursor)", streamed)
+        measure("Naive export (rows loaded first)", loaded)
+
+
+if __name__ == "__main__":
+    main()
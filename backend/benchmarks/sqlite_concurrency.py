@@ -0,0 +1,139 @@
+"""
+Concurrent quiz submissions and lesson progress writes against SQLite, with
+two configurations:
+
+    baseline  the default settings: SQLite's DEFERRED transactions, 5 s
+              busy timeout, rollback journal
+    tuned     the single-node profile (DB_SQLITE_TUNED): IMMEDIATE
+              transactions, DB_SQLITE_BUSY_TIMEOUT, WAL and its PRAGMAs
+
+    python -m benchmarks.sqlite_concurrency --threads 16 --students 400
+
+Without --profile every profile runs, each in a fresh process and test
+database (journal_mode=WAL sticks to a database file). Requests failing
+with "database is locked" are counted rather than aborting the run.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks import Timer, report, setup_django, test_database
+
+# environment of each profile's process
+PROFILES = {
+    "baseline": {"DB_SQLITE_TUNED": "False"},
+    "tuned": {"DB_SQLITE_TUNED": "True"},
+}
+
+
+def seed(students, questions):
+    from django.contrib.auth import get_user_model
+    from learning.models import Course, Grade, Lesson, Unit
+    from quizzes.models import Answer, Question, Quiz
+
+    User = get_user_model()
+    grade = Grade.objects.create(name="Bench grade")
+    course = Course.objects.create(name="Bench course", grade=grade)
+    unit = Unit.objects.create(title="Unit", order=1, course=course)
+    lesson = Lesson.objects.create(title="Lesson", order=1, unit=unit)
+    quiz = Quiz.objects.create(title="Quiz", time_limit=30, max_score=questions,
+                               min_score=0, lesson=lesson)
+    payload = []
+    for i in range(questions):
+        question = Question.objects.create(text=f"Q{i}", points=1, quiz=quiz)
+        right = Answer.objects.create(text="right", question=question, is_correct=True)
+        Answer.objects.create(text="wrong", question=question)
+        payload.append({"question_id": question.id, "selected_answer_id": right.id})
+
+    users = User.objects.bulk_create([
+        User(email=f"student{i}@bench.test", username=f"student{i}", grade=grade)
+        for i in range(students)
+    ])
+    return users, lesson, quiz, {"answers": payload}
+
+
+def run(users, lesson, quiz, payload, threads):
+    from django.db import OperationalError, close_old_connections
+    from django.urls import reverse
+    from rest_framework.test import APIClient
+
+    progress_url = reverse("lesson-progress", kwargs={"lesson_id": lesson.id})
+    submit_url = reverse("submit-quiz", kwargs={"quiz_id": quiz.id})
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        client = APIClient()
+        local, failed = [], 0
+        for user in chunk:
+            client.force_authenticate(user)
+            for method, url, data in (
+                ("post", progress_url, None),
+                ("post", submit_url, payload),
+                ("patch", progress_url, {"is_completed": True}),
+                ("get", progress_url, None),
+            ):
+                start = time.perf_counter()
+                try:
+                    response = getattr(client, method)(url, data, format="json")
+                    assert response.status_code < 400, (url, response.status_code)
+                    local.append(time.perf_counter() - start)
+                except OperationalError:
+                    failed += 1
+                finally:
+                    close_old_connections()
+        with lock:
+            latencies.extend(local)
+            errors.append(failed)
+
+    workers = [
+        threading.Thread(target=worker, args=(users[index::threads],))
+        for index in range(threads)
+    ]
+    with Timer() as total:
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+    return latencies, sum(errors), total.elapsed
+
+
+def run_profile(args):
+    setup_django()
+    from django.db import connection
+
+    with test_database():
+        seeded = seed(args.students, args.questions)
+        latencies, errors, elapsed = run(*seeded, threads=args.threads)
+        journal = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+        report(f"SQLite {args.profile} profile (journal_mode={journal}, "
+               f"{args.threads} threads)", latencies, elapsed)
+        print(f"  locked:     {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--students", type=int, default=400)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--profile", choices=PROFILES)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+    # settings are read once per process: one child process per profile
+    for profile, profile_env in PROFILES.items():
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.sqlite_concurrency", *sys.argv[1:],
+             "--profile", profile],
+            env={**os.environ, "DB_ENGINE": "sqlite", **profile_env},
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .routers import RoutingState, activate, choose_replica, deactivate
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _pin_key(credential):
+    digest = hashlib.sha256(credential.encode()).hexdigest()[:32]
+    return f"db-pin:{digest}"
+
+
+def _credentials(request, response=None):
+    """What identifies the client across requests: its token or session."""
+    credentials = []
+    if request.headers.get("Authorization"):
+        credentials.append(request.headers["Authorization"])
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if response is not None and settings.SESSION_COOKIE_NAME in response.cookies:
+        # a login sets a new session cookie: the next request uses that one
+        session = response.cookies[settings.SESSION_COOKIE_NAME].value
+    if session:
+        credentials.append(session)
+    return credentials
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Send the reads of GET/HEAD/OPTIONS requests to a replica from
+    settings.DATABASE_REPLICAS, picked by weight once per request.
+
+    A request that writes pins its client to the primary for
+    DB_REPLICA_PIN_SECONDS, longer than the replication lag, so the client
+    reads its own writes on the next requests. Pins live in the cache; use a
+    shared cache (CACHE_URL) when several processes serve requests.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        credentials = _credentials(request)
+        pinned = cache.get_many([_pin_key(credential) for credential in credentials])
+        replica = None
+        if request.method in SAFE_METHODS and not pinned:
+            replica = choose_replica(settings.DATABASE_REPLICAS)
+
+        state = RoutingState(replica)
+        token = activate(state)
+        try:
+            with connections[DEFAULT_DB_ALIAS].execute_wrapper(state.watch):
+                response = self.get_response(request)
+        finally:
+            deactivate(token)
+
+        if state.wrote:
+            cache.set_many(
+                {_pin_key(credential): True for credential in _credentials(request, response)},
+                timeout=settings.DB_REPLICA_PIN_SECONDS,
+            )
+        return response
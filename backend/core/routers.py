@@ -0,0 +1,74 @@
+"""
+Read-replica routing. Reads go to a replica only inside a request that
+core.middleware.ReplicaRoutingMiddleware marked as replica-safe; management
+commands, background flushers, reads inside a transaction on the primary
+and every write use the primary ("default").
+"""
+import random
+from contextvars import ContextVar
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# statements that leave the primary unchanged
+_READ_ONLY_SQL = ("SELECT", "EXPLAIN", "PRAGMA", "SHOW")
+
+
+class RoutingState:
+    """
+    Routing of the current request: the replica its reads use, if any, and
+    whether it has written to the primary. After the first write every read
+    goes to the primary too, so the request sees its own writes.
+    """
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+    def watch(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook on the primary connection
+        if not sql.lstrip().upper().startswith(_READ_ONLY_SQL):
+            self.wrote = True
+        return execute(sql, params, many, context)
+
+
+_state = ContextVar("db_routing_state", default=None)
+
+
+def choose_replica(weights):
+    """Pick a replica alias from {alias: weight}, or None if all weigh 0."""
+    aliases = [alias for alias, weight in weights.items() if weight > 0]
+    if not aliases:
+        return None
+    return random.choices(aliases, weights=[weights[alias] for alias in aliases])[0]
+
+
+def activate(state):
+    """Route queries by `state` until deactivate(token)."""
+    return _state.set(state)
+
+
+def deactivate(token):
+    _state.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or state.wrote or state.replica is None:
+            return None
+        # a transaction on the primary (e.g. select_for_update before a
+        # write) must read the rows it is about to write, not a lagging copy
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # replicas get their schema by replication
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,98 @@
+import re
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from learning.models import Course, Grade, Lesson, Unit
+
+# "SCAN progress_lessonprogress" (SQLite) / "Seq Scan on progress_lessonprogress" (PostgreSQL)
+_SQLITE_FULL_SCAN = re.compile(r"^SCAN (\w+)(?: AS (\w+))?$")
+_POSTGRES_FULL_SCAN = re.compile(r"Seq Scan on (\w+)(?: (\w+))?")
+# rows sorted after the fact instead of read in index order
+_SQLITE_SORT = re.compile(r"^USE TEMP B-TREE FOR (?:RIGHT PART OF )?ORDER BY$")
+_POSTGRES_SORT = re.compile(r"Sort  \(")
+
+
+def explain(sql):
+    """Query plan of an SQL statement as a list of lines."""
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            # only report sequential scans the planner cannot avoid
+            with transaction.atomic():
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(plan):
+    """Tables (or aliases) a query plan reads without an index."""
+    pattern = _POSTGRES_FULL_SCAN if connection.vendor == "postgresql" else _SQLITE_FULL_SCAN
+    tables = []
+    for line in plan:
+        match = pattern.search(line.strip())
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def sorts(plan):
+    """Whether a query plan sorts rows instead of reading them in index order."""
+    pattern = _POSTGRES_SORT if connection.vendor == "postgresql" else _SQLITE_SORT
+    return any(pattern.search(line.strip()) for line in plan)
+
+
+class QueryPlanTestMixin:
+    """
+    assertNoFullScans() runs a block, EXPLAINs every SELECT it issued and
+    fails when one reads a table without an index. Tables in `allow` (small
+    reference tables, for instance) may be scanned. With `allow_sorts=False`
+    it also fails when a query sorts rows instead of using an index order.
+    """
+
+    @contextmanager
+    def assertNoFullScans(self, allow=(), allow_sorts=True):
+        with CaptureQueriesContext(connection) as captured:
+            yield captured
+
+        problems = []
+        for query in captured.captured_queries:
+            sql = query["sql"]
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            plan = explain(sql)
+            scanned = [table for table in full_scans(plan) if table not in allow]
+            if scanned:
+                problems.append(f"{', '.join(scanned)} scanned by:\n  {sql}\n  " + "\n  ".join(plan))
+            elif not allow_sorts and sorts(plan):
+                problems.append(f"sort in:\n  {sql}\n  " + "\n  ".join(plan))
+        if problems:
+            self.fail("Queries not served by an index:\n" + "\n".join(problems))
+
+
+def create_course(name="Math", grade=None, units=1, lessons=1, **lesson_fields):
+    """
+    A course in `grade` (a new "Grade 1" by default) with `lessons` lessons in
+    each of its `units` units. Returns the course and its lessons in order.
+    """
+    grade = grade or Grade.objects.create(name="Grade 1")
+    course = Course.objects.create(name=name, grade=grade)
+    created = []
+    for unit_order in range(1, units + 1):
+        unit = Unit.objects.create(course=course, title=f"Unit {unit_order}", order=unit_order)
+        created += [
+            Lesson.objects.create(
+                title=f"{name} {unit_order}.{order}", order=order, unit=unit, **lesson_fields)
+            for order in range(1, lessons + 1)
+        ]
+    return course, created
+
+
+def create_student(name="student", grade=None, **fields):
+    """A user signed up with Firebase, `<name>@example.com`."""
+    return get_user_model().objects.create_user(
+        email=f"{name}@example.com", username=name, firebase_uid=f"uid-{name}",
+        grade=grade, **fields)
@@ -0,0 +1,115 @@
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from learning.models import Course, Grade, Lesson, Unit
+from progress.models import LessonProgress
+from .routers import ReplicaRouter, RoutingState, activate, choose_replica, deactivate
+
+User = get_user_model()
+
+REPLICA_NAME = settings.BASE_DIR / "test_replica.sqlite3"
+
+
+# ---------- Tests for read-replica routing ----------
+@override_settings(DATABASE_REPLICAS={"replica": 1}, DB_REPLICA_PIN_SECONDS=60,
+                   PROGRESS_ACCESS_WRITE_BEHIND=False)
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Two SQLite files: the test database as the primary and a copy of it as
+    the replica. replicate() stands in for replication.
+
+    DATABASES cannot be overridden per test, so the "replica" alias exists
+    only while this class runs (the test runner never sees it); the router
+    never migrates it.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        connections.settings["replica"] = {**connections.settings["default"], "NAME": REPLICA_NAME}
+        cls.databases = {"default", "replica"}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections["replica"].close()
+        del connections["replica"]
+        del connections.settings["replica"]
+        if os.path.exists(REPLICA_NAME):
+            os.remove(REPLICA_NAME)
+
+    def setUp(self):
+        cache.clear()
+        grade = Grade.objects.create(name="Grade 1")
+        course = Course.objects.create(name="Math", grade=grade)
+        unit = Unit.objects.create(course=course, title="Unit 1", order=1)
+        self.lesson = Lesson.objects.create(title="Lesson 1", order=1, unit=unit)
+        self.student = User.objects.create_user(
+            email="student@example.com", username="student",
+            firebase_uid="test_uid", grade=grade)
+        self.replicate()
+        self.url = reverse("lesson-progress", kwargs={"lesson_id": self.lesson.id})
+
+    def replicate(self):
+        connections["default"].ensure_connection()
+        connections["replica"].ensure_connection()
+        connections["default"].connection.backup(connections["replica"].connection)
+
+    def client_for(self, token):
+        client = APIClient()
+        client.force_authenticate(self.student)
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        return client
+
+    def test_reads_use_the_replica(self):
+        LessonProgress.objects.using("replica").create(user=self.student, lesson=self.lesson)
+        response = self.client_for("device-1").get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_writer_reads_its_writes_from_the_primary(self):
+        writer = self.client_for("device-1")
+        self.assertEqual(writer.post(self.url).status_code, status.HTTP_201_CREATED)
+        # not replicated yet: only the client that wrote is pinned
+        self.assertEqual(writer.get(self.url).status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client_for("device-2").get(self.url).status_code,
+                         status.HTTP_404_NOT_FOUND)
+
+        self.replicate()
+        self.assertEqual(self.client_for("device-2").get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_failed_write_does_not_pin(self):
+        client = self.client_for("device-1")
+        self.assertEqual(client.patch(self.url, {"is_completed": True}, format="json").status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        LessonProgress.objects.using("replica").create(user=self.student, lesson=self.lesson)
+        self.assertEqual(client.get(self.url).status_code, status.HTTP_200_OK)
+
+    def test_reads_in_a_primary_transaction_use_the_primary(self):
+        # the replica lags behind a write it has not received yet
+        LessonProgress.objects.create(user=self.student, lesson=self.lesson)
+        token = activate(RoutingState("replica"))
+        try:
+            self.assertFalse(LessonProgress.objects.exists())
+            # select_for_update() already reads from the primary; plain reads
+            # in the same transaction must as well
+            with transaction.atomic():
+                self.assertTrue(LessonProgress.objects.exists())
+        finally:
+            deactivate(token)
+
+    def test_routing_outside_requests_and_weights(self):
+        router = ReplicaRouter()
+        self.assertIsNone(router.db_for_read(LessonProgress))
+        self.assertEqual(router.db_for_write(LessonProgress), "default")
+        self.assertFalse(router.allow_migrate("replica", "progress"))
+        self.assertEqual({choose_replica({"a": 0, "b": 3}) for _ in range(20)}, {"b"})
+        self.assertIsNone(choose_replica({"a": 0}))
@@ -52,6 +52,7 @@ urlpatterns = [
     path('api/learning/', include('learning.urls')),
     path('api/progress/', include('progress.urls')),
     path('api/quizzes/', include('quizzes.urls')),
+    path('api/analytics/', include('analytics.urls')),
     path(
         'health/',
         lambda request: JsonResponse({'status': 'ok'}), name='health_check',
@@ -0,0 +1,118 @@
+import hashlib
+
+from django.core.cache import cache
+
+from .models import Grade, Lesson
+
+LOCATION_TIMEOUT = 24 * 60 * 60
+LAYOUT_TIMEOUT = 24 * 60 * 60
+
+
+def _location_key(lesson_id):
+    return f"lesson-location:{lesson_id}"
+
+
+def lesson_location(lesson_id):
+    """
+    (course_id, grade_id) of a lesson, or None if it does not exist.
+    Cached; learning.signals drops entries when lessons or units move.
+    """
+    return lesson_locations([lesson_id]).get(lesson_id)
+
+
+def lesson_locations(lesson_ids):
+    """
+    {lesson_id: (course_id, grade_id)} for many lessons, from the
+    lesson_location() cache plus one query for the misses. Lessons that do
+    not exist are left out.
+    """
+    keys = {lesson_id: _location_key(lesson_id) for lesson_id in set(lesson_ids)}
+    cached = cache.get_many(keys.values())
+    locations = {
+        lesson_id: tuple(cached[key]) for lesson_id, key in keys.items() if key in cached
+    }
+    missing = [lesson_id for lesson_id in keys if lesson_id not in locations]
+    if missing:
+        loaded = {
+            lesson_id: (course_id, grade_id)
+            for lesson_id, course_id, grade_id in Lesson.objects.filter(pk__in=missing)
+            .values_list("pk", "unit__course_id", "unit__course__grade_id")
+        }
+        cache.set_many({keys[lesson_id]: location for lesson_id, location in loaded.items()},
+                       timeout=LOCATION_TIMEOUT)
+        locations.update(loaded)
+    return locations
+
+
+def forget_lesson_locations(lesson_ids):
+    cache.delete_many([_location_key(lesson_id) for lesson_id in lesson_ids])
+
+
+def _layout_key(grade_id):
+    return f"grade-layout:{grade_id}"
+
+
+def grade_layout(grade_id):
+    """
+    Bit layout of a grade's lessons in curriculum order (course, unit order,
+    lesson order):
+    {"version": str, "size": int, "positions": {lesson_id: bit},
+     "courses": {course_id: (start, stop)}}
+    The version is a hash of the ordered lesson ids, so it only changes when
+    the layout does. Cached; learning.signals drops it on curriculum edits.
+    """
+    key = _layout_key(grade_id)
+    layout = cache.get(key)
+    if layout is None:
+        rows = Lesson.objects.filter(unit__course__grade_id=grade_id) \
+            .order_by("unit__course_id", "unit__order", "order") \
+            .values_list("id", "unit__course_id")
+        positions, courses = {}, {}
+        for bit, (lesson_id, course_id) in enumerate(rows):
+            positions[lesson_id] = bit
+            start, _ = courses.get(course_id, (bit, bit))
+            courses[course_id] = (start, bit + 1)
+        digest = hashlib.sha1(",".join(map(str, positions)).encode()).hexdigest()
+        layout = {
+            "version": digest[:16],
+            "size": len(positions),
+            "positions": positions,
+            "courses": courses,
+        }
+        cache.set(key, layout, timeout=LAYOUT_TIMEOUT)
+    return layout
+
+
+def forget_grade_layouts():
+    cache.delete_many([_layout_key(grade_id)
+                       for grade_id in Grade.objects.values_list("id", flat=True)])
+
+
+def resequence_courses(course_ids):
+    """
+    Recompute Lesson.position and Lesson.predecessor for the given courses
+    from unit and lesson order, writing only rows that changed. Courses
+    that still point at one of these lessons as a predecessor (after a
+    lesson or unit moved between courses) are resequenced too.
+    """
+    course_ids = set(course_ids)
+    while course_ids:
+        rows = Lesson.objects.filter(unit__course_id__in=course_ids) \
+            .order_by("unit__course_id", "unit__order", "order") \
+            .values_list("id", "position", "predecessor_id", "unit__course_id")
+        changed = []
+        previous_id = previous_course_id = None
+        position = 0
+        for lesson_id, old_position, old_predecessor_id, course_id in rows:
+            if course_id != previous_course_id:
+                position, previous_id = 0, None
+            if (old_position, old_predecessor_id) != (position, previous_id):
+                changed.append(Lesson(id=lesson_id, position=position, predecessor_id=previous_id))
+            position, previous_id, previous_course_id = position + 1, lesson_id, course_id
+        Lesson.objects.bulk_update(changed, ["position", "predecessor"], batch_size=500)
+
+        course_ids = set(
+            Lesson.objects.filter(predecessor__unit__course_id__in=course_ids)
+            .exclude(unit__course_id__in=course_ids)
+            .values_list("unit__course_id", flat=True)
+        )
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_sequence(apps, schema_editor):
+    Lesson = apps.get_model('learning', 'Lesson')
+
+    changed = []
+    previous_id = previous_course_id = None
+    position = 0
+    rows = Lesson.objects.order_by('unit__course_id', 'unit__order', 'order') \
+        .values_list('id', 'unit__course_id')
+    for lesson_id, course_id in rows:
+        if course_id != previous_course_id:
+            position, previous_id = 0, None
+        changed.append(Lesson(id=lesson_id, position=position, predecessor_id=previous_id))
+        position, previous_id, previous_course_id = position + 1, lesson_id, course_id
+    Lesson.objects.bulk_update(changed, ['position', 'predecessor'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_alter_lesson_estimated_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='position',
+            field=models.PositiveIntegerField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='predecessor',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='learning.lesson'),
+        ),
+        migrations.RunPython(backfill_sequence, migrations.RunPython.noop),
+    ]
@@ -52,12 +52,23 @@ class Lesson(models.Model):
         blank=True,
     )
 
+    # position in the course-wide sequence and the lesson before it,
+    # maintained by learning.curriculum.resequence_courses()
+    position = models.PositiveIntegerField(null=True, editable=False)
+
     # relations (FKs)
     unit = models.ForeignKey(
         Unit,
         on_delete=models.CASCADE,
         related_name='lessons'
     )
+    predecessor = models.ForeignKey(
+        'self',
+        null=True,
+        editable=False,
+        on_delete=models.SET_NULL,
+        related_name='+'
+    )
 
     class Meta:
         ordering = ["unit__order", "order"]  # global ordering across units
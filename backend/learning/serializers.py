@@ -32,8 +32,23 @@ class LessonSerializer(serializers.ModelSerializer):
         ]
 
 
+class OutlineLessonSerializer(LessonSerializer):
+    """
+    Lesson in a course outline. `is_unlocked` is derived from the lesson's
+    precomputed predecessor and the `completed_lessons` id set in context.
+    """
+    is_unlocked = serializers.SerializerMethodField()
+
+    class Meta(LessonSerializer.Meta):
+        fields = LessonSerializer.Meta.fields + ['position', 'is_unlocked']
+
+    def get_is_unlocked(self, obj):
+        completed = self.context.get("completed_lessons", set())
+        return obj.predecessor_id is None or obj.predecessor_id in completed
+
+
 class UnitWithLessonsSerializer(serializers.ModelSerializer):
-    lessons = LessonSerializer(many=True, read_only=True)
+    lessons = OutlineLessonSerializer(many=True, read_only=True)
     course = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
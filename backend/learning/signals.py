@@ -0,0 +1,35 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .curriculum import forget_grade_layouts, forget_lesson_locations, resequence_courses
+from .models import Course, Lesson, Unit
+
+
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_changed(sender, instance, **kwargs):
+    forget_lesson_locations([instance.pk])
+    forget_grade_layouts()
+    resequence_courses(
+        Unit.objects.filter(pk=instance.unit_id).values_list("course_id", flat=True))
+
+
+@receiver(post_save, sender=Unit)
+@receiver(post_delete, sender=Unit)
+def unit_changed(sender, instance, **kwargs):
+    forget_lesson_locations(
+        Lesson.objects.filter(unit_id=instance.pk).values_list("id", flat=True))
+    forget_grade_layouts()
+    resequence_courses([instance.course_id])
+
+
+@receiver(post_save, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    forget_lesson_locations(
+        Lesson.objects.filter(unit__course_id=instance.pk).values_list("id", flat=True))
+    forget_grade_layouts()
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance, **kwargs):
+    forget_grade_layouts()
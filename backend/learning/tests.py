@@ -71,6 +71,38 @@ class LearningModelsTest(TestCase):
         self.assertEqual(lessons, [self.lesson1, self.lesson2])
         self.assertEqual(lessons[0].order, 1)
 
+    def test_lesson_sequence_follows_unit_and_lesson_order(self):
+        def sequence():
+            return list(Lesson.objects.filter(unit__course=self.course1)
+                        .order_by("position").values_list("id", "predecessor_id"))
+
+        self.assertEqual(sequence(), [
+            (self.lesson1.id, None),
+            (self.lesson2.id, self.lesson1.id),
+            (self.lesson3.id, self.lesson2.id),
+        ])
+
+        # swapping the units moves "Equations" to the front
+        self.unit1.order = 3
+        self.unit1.save()
+        self.unit2.order = 1
+        self.unit2.save()
+        self.assertEqual(sequence(), [
+            (self.lesson3.id, None),
+            (self.lesson1.id, self.lesson3.id),
+            (self.lesson2.id, self.lesson1.id),
+        ])
+
+        # moving a lesson to another course resequences both courses
+        other_unit = Unit.objects.create(title="Unit 1", order=1, course=self.course2)
+        self.lesson1.unit = other_unit
+        self.lesson1.save()
+        self.assertEqual(sequence(), [
+            (self.lesson3.id, None),
+            (self.lesson2.id, self.lesson3.id),
+        ])
+        self.assertEqual(Lesson.objects.get(pk=self.lesson1.pk).predecessor_id, None)
+
     def test_grade_name_unique(self):
         with self.assertRaises(IntegrityError):
             Grade.objects.create(
@@ -7,6 +7,7 @@ from django.contrib.auth import get_user_model
 from drf_yasg.utils import swagger_auto_schema
 
 from .models import Grade, Course, Unit
+from progress import vectors
 from .serializers import (
     GradeSerializer,
     CourseSerializer,
@@ -66,11 +67,18 @@ class LessonListView(APIView):
 
     @swagger_auto_schema(
         operation_id="get_lessons_list",
-        operation_description="Retrieve all lessons for a certain course, grouped by unit",
+        operation_description="Retrieve all lessons for a certain course, grouped by unit. \
+            Each lesson says whether it is unlocked for the authenticated user.",
         responses={200: UnitWithLessonsSerializer(many=True)},
     )
     def get(self, request, course_id):
         course = get_object_or_404(Course, id=course_id)
         units = Unit.objects.filter(course=course).prefetch_related("lessons")
-        serializer = UnitWithLessonsSerializer(units, many=True)
+
+        # completed lessons come from the user's progress vector (one row)
+        completed_lessons = set()
+        if request.user.is_authenticated:
+            completed_lessons = vectors.completed_lessons(request.user.id, course.grade_id)
+        serializer = UnitWithLessonsSerializer(
+            units, many=True, context={"completed_lessons": completed_lessons})
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+
+from quizzes.signals import quiz_attempted
+from .models import ActivityCalendar
+from .signals import lesson_progress_changed
+
+CALENDAR_DAYS = 365
+
+
+def _cache_key(user_id, day):
+    return f"active-day:{user_id}:{day.isoformat()}"
+
+
+def record_activity(user_id, day):
+    record_activity_days(user_id, [day])
+
+
+def record_activity_days(user_id, days):
+    """
+    Set the bits of `days` in the user's calendar with at most one write.
+    Once a day is recorded it is remembered in the cache, so later lesson
+    opens that day cost no write; an earlier day than first_day shifts the
+    bitmap.
+    """
+    keys = {_cache_key(user_id, day): day for day in days}
+    recorded = cache.get_many(keys)
+    days = [day for key, day in keys.items() if key not in recorded]
+    if not days:
+        return
+
+    with transaction.atomic():
+        first = min(days)
+        calendar, _ = ActivityCalendar.objects.select_for_update().get_or_create(
+            user_id=user_id, defaults={"first_day": first})
+        bits = int.from_bytes(bytes(calendar.days), "little")
+        if first < calendar.first_day:
+            bits <<= (calendar.first_day - first).days
+            calendar.first_day = first
+        updated = bits
+        for day in days:
+            updated |= 1 << (day - calendar.first_day).days
+        if updated != bits:
+            calendar.days = updated.to_bytes((updated.bit_length() + 7) // 8, "little")
+            calendar.save(update_fields=["first_day", "days"])
+        transaction.on_commit(lambda: cache.set_many(
+            {key: True for key in keys if key not in recorded}, timeout=2 * 24 * 60 * 60))
+
+
+def _run_ending_at(bits, position):
+    """Number of consecutive set bits ending at `position` (counting down)."""
+    if position < 0:
+        return 0
+    mask = (1 << (position + 1)) - 1
+    gaps = ~bits & mask
+    return position + 1 - gaps.bit_length() if gaps else position + 1
+
+
+def _longest_run(bits):
+    # each step shortens every run of ones by one
+    length = 0
+    while bits:
+        bits &= bits >> 1
+        length += 1
+    return length
+
+
+def activity_summary(user_id, today=None):
+    """
+    Current and longest streak plus the last CALENDAR_DAYS days (oldest
+    first, "1" for an active day) from a single row read. The current streak
+    still counts until the end of a day without activity yet.
+    """
+    today = today or timezone.localdate()
+    start = today - timedelta(days=CALENDAR_DAYS - 1)
+    calendar = ActivityCalendar.objects.filter(user_id=user_id) \
+        .values("first_day", "days").first()
+    if calendar is None:
+        return {"current_streak": 0, "longest_streak": 0, "active_days": 0,
+                "start": start, "end": today, "days": "0" * CALENDAR_DAYS}
+
+    bits = int.from_bytes(bytes(calendar["days"]), "little")
+    position = (today - calendar["first_day"]).days
+    current = _run_ending_at(bits, position) or _run_ending_at(bits, position - 1)
+
+    offset = position - (CALENDAR_DAYS - 1)
+    window = bits >> offset if offset >= 0 else bits << -offset
+    window &= (1 << CALENDAR_DAYS) - 1
+    days = format(window, f"0{CALENDAR_DAYS}b")[::-1]
+    return {
+        "current_streak": current,
+        "longest_streak": _longest_run(bits),
+        "active_days": window.bit_count(),
+        "start": start,
+        "end": today,
+        "days": days,
+    }
+
+
+@receiver(lesson_progress_changed)
+def lesson_activity(sender, user_id, deleted=False, accessed_at=None, **kwargs):
+    if not deleted and accessed_at is not None:
+        record_activity(user_id, timezone.localdate(accessed_at))
+
+
+@receiver(quiz_attempted)
+def quiz_activity(sender, user_id, attempted_at, **kwargs):
+    record_activity(user_id, timezone.localdate(attempted_at))
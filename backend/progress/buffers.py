@@ -0,0 +1,236 @@
+import abc
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from learning.models import Lesson
+from .models import LessonProgress, LessonTime
+from .signals import lesson_progress_changed
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer(abc.ABC):
+    """
+    Per-process buffer that coalesces writes by key and hands them to
+    write() in bulk from a background thread every `interval` seconds.
+
+    Pending values live only in memory: a crashed worker loses at most the
+    writes of one interval. A clean interpreter exit flushes what is left.
+    Once `max_pending` keys are waiting, the caller that adds one flushes.
+    """
+    interval = 5.0
+    max_pending = None
+
+    def __init__(self):
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def merge(self, old, new):
+        return new
+
+    @abc.abstractmethod
+    def write(self, items):
+        """Write the buffered {key: value} items to the database."""
+
+    def add(self, key, value):
+        with self._lock:
+            old = self._pending.get(key)
+            self._pending[key] = value if old is None else self.merge(old, value)
+            full = self.max_pending is not None and len(self._pending) >= self.max_pending
+        self._ensure_started()
+        if full:
+            self._flush_quietly()
+
+    def flush(self):
+        """
+        Write everything buffered so far. Returns the number of keys written.
+        On failure the items are merged back so the next flush retries them.
+        """
+        with self._lock:
+            items, self._pending = self._pending, {}
+        if not items:
+            return 0
+        try:
+            self.write(items)
+        except Exception:
+            with self._lock:
+                for key, value in items.items():
+                    newer = self._pending.get(key)
+                    self._pending[key] = value if newer is None else self.merge(value, newer)
+            raise
+        return len(items)
+
+    def _ensure_started(self):
+        # one flusher thread per process; forked workers start their own
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is None:
+                atexit.register(self._flush_quietly)
+            self._pid = os.getpid()
+            threading.Thread(
+                target=self._run, name=type(self).__name__, daemon=True).start()
+
+    def _run(self):
+        stop = threading.Event()
+        while not stop.wait(self.interval):
+            self._flush_quietly()
+            # the flusher thread owns its connection; don't hold it idle
+            connection.close()
+
+    def _flush_quietly(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("%s flush failed", type(self).__name__)
+
+
+class AccessBuffer(WriteBehindBuffer):
+    """
+    Buffered LessonProgress.last_accessed values:
+    {user_id: {progress_id: accessed_at}}, keeping the latest timestamp.
+    """
+    batch_size = 500
+
+    @property
+    def interval(self):
+        return settings.PROGRESS_ACCESS_FLUSH_SECONDS
+
+    @property
+    def max_pending(self):
+        return settings.PROGRESS_ACCESS_MAX_PENDING
+
+    def merge(self, old, new):
+        for progress_id, accessed_at in new.items():
+            if progress_id not in old or accessed_at > old[progress_id]:
+                old[progress_id] = accessed_at
+        return old
+
+    def write(self, items):
+        accessed = {}
+        for per_user in items.values():
+            accessed.update(per_user)
+        progress_ids = sorted(accessed)
+        for start in range(0, len(progress_ids), self.batch_size):
+            batch = progress_ids[start:start + self.batch_size]
+            # Greatest: never move a timestamp written directly (e.g. by PATCH) back
+            LessonProgress.objects.filter(pk__in=batch).update(
+                last_accessed=Greatest(
+                    F("last_accessed"),
+                    Case(*[When(pk=pk, then=Value(accessed[pk])) for pk in batch],
+                         output_field=DateTimeField()),
+                )
+            )
+
+    def for_user(self, user_id):
+        """{progress_id: accessed_at} still waiting to be written for a user."""
+        with self._lock:
+            return dict(self._pending.get(user_id, {}))
+
+    def overlay(self, progress_rows):
+        """Apply buffered timestamps to LessonProgress instances in place."""
+        pending = {}
+        for user_id in {row.user_id for row in progress_rows}:
+            pending.update(self.for_user(user_id))
+        for row in progress_rows:
+            accessed_at = pending.get(row.pk)
+            if accessed_at and accessed_at > row.last_accessed:
+                row.last_accessed = accessed_at
+        return progress_rows
+
+
+access_buffer = AccessBuffer()
+
+
+def buffer_access(progress, accessed_at=None):
+    """
+    Record a lesson open on an existing progress row without writing it:
+    the timestamp is flushed later by access_buffer.
+    """
+    accessed_at = accessed_at or timezone.now()
+    access_buffer.add(progress.user_id, {progress.pk: accessed_at})
+    progress.last_accessed = accessed_at
+    lesson_progress_changed.send(
+        sender=LessonProgress,
+        user_id=progress.user_id,
+        lesson_id=progress.lesson_id,
+        created=False,
+        deleted=False,
+        was_completed=progress.is_completed,
+        is_completed=progress.is_completed,
+        accessed_at=accessed_at,
+    )
+    return progress
+
+
+class HeartbeatBuffer(WriteBehindBuffer):
+    """
+    Time on task not written yet: {(user_id, lesson_id): [seconds, sessions]},
+    summed, and added to LessonTime rows on flush.
+    """
+
+    @property
+    def interval(self):
+        return settings.PROGRESS_HEARTBEAT_FLUSH_SECONDS
+
+    @property
+    def max_pending(self):
+        return settings.PROGRESS_HEARTBEAT_MAX_PENDING
+
+    def merge(self, old, new):
+        return [old[0] + new[0], old[1] + new[1]]
+
+    def pending(self, key):
+        with self._lock:
+            return list(self._pending.get(key, (0.0, 0)))
+
+    def write(self, items):
+        # users and lessons may be deleted before the flush; drop them here
+        # so one bad key cannot fail (and requeue) the whole batch
+        lesson_ids = set(Lesson.objects.filter(
+            id__in={lesson_id for _, lesson_id in items}).values_list("id", flat=True))
+        user_ids = set(get_user_model().objects.filter(
+            id__in={user_id for user_id, _ in items}).values_list("id", flat=True))
+        LessonTime.objects.add_time([
+            (user_id, lesson_id, seconds, sessions)
+            for (user_id, lesson_id), (seconds, sessions) in sorted(items.items())
+            if user_id in user_ids and lesson_id in lesson_ids
+        ])
+
+
+heartbeat_buffer = HeartbeatBuffer()
+
+
+def record_heartbeat(user_id, lesson_id, now=None):
+    """
+    Count the time since the previous heartbeat of this user on this lesson,
+    or start a new session when there was none within the session gap.
+    The last ping time is kept in the cache; nothing touches the database.
+    Sessions survive pings landing on different workers only when CACHE_URL
+    points at a shared cache: the default locmem cache is per process, so
+    each worker would start its own sessions. Callers check `lesson_id`.
+    """
+    now = now or timezone.now()
+    gap = settings.PROGRESS_HEARTBEAT_SESSION_GAP_SECONDS
+    key = f"heartbeat:{user_id}:{lesson_id}"
+    last = cache.get(key)
+    cache.set(key, now.timestamp(), timeout=gap)
+    elapsed = None if last is None else now.timestamp() - last
+    if elapsed is None or elapsed > gap:
+        heartbeat_buffer.add((user_id, lesson_id), [0.0, 1])
+    else:
+        # clocks of different workers may disagree slightly
+        heartbeat_buffer.add((user_id, lesson_id), [max(elapsed, 0.0), 0])
@@ -0,0 +1,99 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Max, Sum
+
+from learning.curriculum import grade_layout
+from learning.models import Course
+from quizzes.models import QuizAttemptSummary
+from .buffers import access_buffer
+from .models import GradeProgress, LessonProgress
+from .vectors import current_vectors, popcount
+
+
+def _cache_key(class_id):
+    return f"class-dashboard:{class_id}"
+
+
+def _compute(class_group):
+    """
+    Five grouped queries whatever the class size: students, courses,
+    progress vectors, last activity and quiz summaries, plus one for the
+    vectors that predate a curriculum change. Nothing is written.
+    """
+    grade_id = class_group.grade_id
+    layout = grade_layout(grade_id)
+    students = list(class_group.students.order_by("username").values("id", "username", "email"))
+    student_ids = [student["id"] for student in students]
+    courses = list(Course.objects.filter(grade_id=grade_id).order_by("id").values("id", "name"))
+
+    vectors = current_vectors(grade_id, GradeProgress.objects.filter(
+        grade_id=grade_id, user_id__in=student_ids
+    ).values_list("user_id", "completed_bits", "layout_version"))
+
+    last_activity = dict(
+        LessonProgress.objects.filter(user_id__in=student_ids)
+        .values("user_id").annotate(last=Max("last_accessed"))
+        .values_list("user_id", "last")
+    )
+    quizzes = {
+        row["user_id"]: row
+        for row in QuizAttemptSummary.objects.filter(
+            user_id__in=student_ids, quiz__lesson__unit__course__grade_id=grade_id
+        ).values("user_id").annotate(
+            quizzes_taken=Count("id"),
+            attempts=Sum("attempts_count"),
+            average_best_score=Avg("best_score"),
+            last_attempted_at=Max("last_attempted_at"),
+        )
+    }
+
+    rows = []
+    for student in students:
+        bits = vectors.get(student["id"], b"")
+        # lesson opens buffered in this process are not in the table yet
+        moments = list(access_buffer.for_user(student["id"]).values())
+        if student["id"] in last_activity:
+            moments.append(last_activity[student["id"]])
+        quiz = quizzes.get(student["id"], {})
+        rows.append({
+            **student,
+            "completed_lessons": popcount(bits),
+            "total_lessons": layout["size"],
+            "courses": [
+                {
+                    "course_id": course["id"],
+                    "completed_lessons": popcount(bits, *layout["courses"].get(course["id"], (0, 0))),
+                }
+                for course in courses
+            ],
+            "last_activity": max(moments, default=None),
+            "quizzes_taken": quiz.get("quizzes_taken", 0),
+            "quiz_attempts": quiz.get("attempts") or 0,
+            "average_best_score": quiz.get("average_best_score"),
+            "last_quiz_at": quiz.get("last_attempted_at"),
+        })
+
+    for course in courses:
+        start, stop = layout["courses"].get(course["id"], (0, 0))
+        course["total_lessons"] = stop - start
+
+    return {
+        "id": class_group.id,
+        "name": class_group.name,
+        "grade_id": grade_id,
+        "courses": courses,
+        "students": rows,
+    }
+
+
+def class_dashboard(class_group):
+    """
+    Every student's course completion, last activity and quiz summary for a
+    class, cached for PROGRESS_CLASS_DASHBOARD_CACHE_TIMEOUT seconds.
+    """
+    key = _cache_key(class_group.id)
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = _compute(class_group)
+        cache.set(key, dashboard, timeout=settings.PROGRESS_CLASS_DASHBOARD_CACHE_TIMEOUT)
+    return dashboard
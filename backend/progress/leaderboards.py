@@ -0,0 +1,246 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from learning.curriculum import lesson_location
+from quizzes.models import Quiz, QuizAttemptSummary
+from quizzes.signals import best_score_changed
+from .models import LeaderboardBucket, LeaderboardEntry, LessonProgress
+from .signals import lesson_progress_changed
+
+METRICS = {
+    "lessons": "lessons_completed",
+    "points": "quiz_points",
+}
+
+
+def week_window(day=None):
+    year, week, _ = (day or timezone.localdate()).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _boards(course_id, grade_id):
+    week = week_window()
+    for scope, scope_id in ((LeaderboardEntry.GRADE, grade_id),
+                            (LeaderboardEntry.COURSE, course_id)):
+        for window in (LeaderboardEntry.ALL_TIME, week):
+            yield {"scope": scope, "scope_id": scope_id, "window": window}
+
+
+def _bump_bucket(board, metric, score, delta):
+    buckets = LeaderboardBucket.objects.filter(**board, metric=metric, score=score)
+    if delta > 0:
+        LeaderboardBucket.objects.get_or_create(**board, metric=metric, score=score)
+    buckets.update(users=F("users") + delta)
+
+
+def _move(board, old, new):
+    """Move an entry between the board's buckets, {metric: score} to {metric: score}."""
+    for metric in METRICS:
+        if old.get(metric) != new.get(metric):
+            if metric in old:
+                _bump_bucket(board, metric, old[metric], -1)
+            if metric in new:
+                _bump_bucket(board, metric, new[metric], 1)
+
+
+def _scores(entry):
+    return {metric: getattr(entry, field) for metric, field in METRICS.items()}
+
+
+def add_to_boards(user_id, course_id, grade_id, lessons=0, points=0.0):
+    """
+    Add deltas to the user's entries on the four boards a course belongs to
+    (grade/course x all-time/this week), and move them between the boards'
+    score buckets. Negative deltas only update existing entries: they come
+    from un-completions and deletes, including the cascade of a user being
+    deleted, whose entries are gone.
+    """
+    if not lessons and not points:
+        return
+
+    for board in _boards(course_id, grade_id):
+        with transaction.atomic():
+            entries = LeaderboardEntry.objects.select_for_update().filter(user_id=user_id, **board)
+            entry = entries.first()
+            old = _scores(entry) if entry else {}
+            if entry is None:
+                if lessons < 0 or points < 0:
+                    continue
+                try:
+                    with transaction.atomic():
+                        entry = LeaderboardEntry.objects.create(user_id=user_id, **board)
+                except IntegrityError:
+                    # created concurrently; apply the delta to that row
+                    entry = entries.get()
+                    old = _scores(entry)
+            entry.lessons_completed = max(entry.lessons_completed + lessons, 0)
+            entry.quiz_points += points
+            entry.save(update_fields=["lessons_completed", "quiz_points"])
+            _move(board, old, _scores(entry))
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remove_deleted_user_entries(sender, instance, **kwargs):
+    """
+    Take a user being deleted out of the score buckets; the cascade deletes
+    their entries without signals.
+    """
+    entries = LeaderboardEntry.objects.filter(user_id=instance.pk)
+    for entry in entries:
+        board = {"scope": entry.scope, "scope_id": entry.scope_id, "window": entry.window}
+        _move(board, _scores(entry), {})
+    entries.delete()
+
+
+@receiver(lesson_progress_changed)
+def lesson_completion_changed(sender, user_id, lesson_id, was_completed=False,
+                              is_completed=False, **kwargs):
+    delta = int(is_completed) - int(was_completed)
+    location = lesson_location(lesson_id) if delta else None
+    if location is not None:
+        add_to_boards(user_id, *location, lessons=delta)
+
+
+@receiver(best_score_changed)
+def quiz_best_score_changed(sender, user_id, quiz_id, delta, **kwargs):
+    lesson_id = Quiz.objects.filter(pk=quiz_id).values_list("lesson_id", flat=True).first()
+    location = lesson_location(lesson_id) if lesson_id else None
+    if location is not None:
+        add_to_boards(user_id, *location, points=delta)
+
+
+def _entry_data(entry, rank):
+    return {
+        "rank": rank,
+        "user_id": entry.user_id,
+        "username": entry.user.username,
+        "lessons_completed": entry.lessons_completed,
+        "quiz_points": entry.quiz_points,
+    }
+
+
+def leaderboard(scope, scope_id, window, metric, user, limit=10, around=0):
+    """
+    Top `limit` entries of a board, and the user's rank with `around`
+    neighbours on each side. Entries are ordered by the metric (desc), then
+    user id, on the board's metric index; equal scores share a rank.
+
+    A rank is one plus the users in the buckets with a higher score, so it
+    costs one read per distinct score ahead (at most one per lesson count or
+    points total), not one per user ahead.
+    """
+    field = METRICS[metric]
+    key = {"scope": scope, "scope_id": scope_id, "window": window}
+    board = LeaderboardEntry.objects.filter(**key).select_related("user")
+    buckets = LeaderboardBucket.objects.filter(**key, metric=metric)
+
+    top, previous = [], None
+    for position, entry in enumerate(board.order_by(f"-{field}", "user_id")[:limit], 1):
+        rank = previous[1] if previous and previous[0] == getattr(entry, field) else position
+        top.append(_entry_data(entry, rank))
+        previous = (getattr(entry, field), rank)
+
+    mine = board.filter(user=user).first()
+    if mine is None:
+        return {"top": top, "me": None, "around": []}
+
+    score = getattr(mine, field)
+    ahead = Q(**{f"{field}__gt": score}) | Q(**{field: score, "user_id__lt": user.id})
+    behind = Q(**{f"{field}__lt": score}) | Q(**{field: score, "user_id__gt": user.id})
+    higher = buckets.filter(score__gt=score).aggregate(users=Sum("users"))["users"] or 0
+
+    above = list(board.filter(ahead).order_by(field, "-user_id")[:around])[::-1]
+    below = list(board.filter(behind).order_by(f"-{field}", "user_id")[:around])
+    neighbours = above + [mine] + below
+    scores = [getattr(entry, field) for entry in neighbours]
+    between = list(buckets.filter(score__gte=min(scores), score__lte=max(scores))
+                   .values_list("score", "users"))
+
+    def rank_of(value):
+        if value >= score:
+            return 1 + higher - sum(users for s, users in between if score < s <= value)
+        return 1 + higher + sum(users for s, users in between if value < s <= score)
+
+    return {
+        "top": top,
+        "me": _entry_data(mine, rank_of(score)),
+        "around": [_entry_data(entry, rank_of(getattr(entry, field))) for entry in neighbours],
+    }
+
+
+def prune_weekly_boards(keep_weeks=None):
+    """
+    Drop weekly windows older than `keep_weeks` weeks. Weekly boards roll
+    over by key, so this is the only scheduled maintenance they need.
+    """
+    keep_weeks = keep_weeks or settings.LEADERBOARD_WEEKS_KEPT
+    today = timezone.localdate()
+    kept = {
+        week_window(today - timedelta(weeks=n)) for n in range(keep_weeks)
+    } | {LeaderboardEntry.ALL_TIME}
+    LeaderboardBucket.objects.exclude(window__in=kept).delete()
+    deleted, _ = LeaderboardEntry.objects.exclude(window__in=kept).delete()
+    return deleted
+
+
+def rebuild_all_time_boards():
+    """
+    Recompute every all-time entry from LessonProgress and quiz summaries.
+    For backfilling and repairs; normal updates are incremental.
+    """
+    totals = {}
+
+    def add(user_id, course_id, grade_id, field, value):
+        for scope, scope_id in ((LeaderboardEntry.GRADE, grade_id),
+                                (LeaderboardEntry.COURSE, course_id)):
+            entry = totals.setdefault((scope, scope_id, user_id), {
+                "lessons_completed": 0, "quiz_points": 0.0})
+            entry[field] += value
+
+    lessons = (
+        LessonProgress.objects.filter(is_completed=True)
+        .values("user_id", "lesson__unit__course_id", "lesson__unit__course__grade_id")
+        .annotate(total=Count("id"))
+        .order_by()
+    )
+    for row in lessons.iterator():
+        add(row["user_id"], row["lesson__unit__course_id"],
+            row["lesson__unit__course__grade_id"], "lessons_completed", row["total"])
+
+    points = (
+        QuizAttemptSummary.objects
+        .values("user_id", "quiz__lesson__unit__course_id",
+                "quiz__lesson__unit__course__grade_id")
+        .annotate(total=Sum("best_score"))
+        .order_by()
+    )
+    for row in points.iterator():
+        add(row["user_id"], row["quiz__lesson__unit__course_id"],
+            row["quiz__lesson__unit__course__grade_id"], "quiz_points", row["total"])
+
+    buckets = {}
+    for (scope, scope_id, _), values in totals.items():
+        for metric, field in METRICS.items():
+            bucket = (scope, scope_id, metric, values[field])
+            buckets[bucket] = buckets.get(bucket, 0) + 1
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.filter(window=LeaderboardEntry.ALL_TIME).delete()
+        LeaderboardBucket.objects.filter(window=LeaderboardEntry.ALL_TIME).delete()
+        LeaderboardEntry.objects.bulk_create([
+            LeaderboardEntry(scope=scope, scope_id=scope_id, user_id=user_id,
+                             window=LeaderboardEntry.ALL_TIME, **values)
+            for (scope, scope_id, user_id), values in totals.items()
+        ], batch_size=1000)
+        LeaderboardBucket.objects.bulk_create([
+            LeaderboardBucket(scope=scope, scope_id=scope_id, window=LeaderboardEntry.ALL_TIME,
+                              metric=metric, score=score, users=users)
+            for (scope, scope_id, metric, score), users in buckets.items()
+        ], batch_size=1000)
+    return len(totals)
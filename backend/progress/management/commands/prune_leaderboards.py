@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from progress.leaderboards import prune_weekly_boards
+
+
+class Command(BaseCommand):
+    help = "Delete expired weekly leaderboard windows. Run on a schedule (e.g. daily)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-weeks", type=int, default=None,
+            help="Weekly windows to keep, including the current one "
+                 "(default: LEADERBOARD_WEEKS_KEPT)")
+
+    def handle(self, *args, **options):
+        deleted = prune_weekly_boards(options["keep_weeks"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired leaderboard entries."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from progress.leaderboards import rebuild_all_time_boards
+
+
+class Command(BaseCommand):
+    help = "Recompute all-time leaderboards from lesson progress and quiz summaries."
+
+    def handle(self, *args, **options):
+        total = rebuild_all_time_boards()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} leaderboard entries."))
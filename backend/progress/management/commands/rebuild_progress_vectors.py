@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from progress.vectors import rebuild_stale_vectors
+
+
+class Command(BaseCommand):
+    help = ("Store the progress vectors written against an older curriculum layout. "
+            "Run after adding, removing or reordering lessons.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        total = rebuild_stale_vectors(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {total} progress vectors."))
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_counters(apps, schema_editor):
+    LessonProgress = apps.get_model('progress', 'LessonProgress')
+    GradeProgress = apps.get_model('progress', 'GradeProgress')
+    GradeCompletionBucket = apps.get_model('progress', 'GradeCompletionBucket')
+
+    rows = (
+        LessonProgress.objects
+        .values('user_id', grade_id=models.F('lesson__unit__course__grade_id'))
+        .annotate(
+            lessons_started=models.Count('id'),
+            completed_count=models.Count('id', filter=models.Q(is_completed=True)),
+        )
+        .order_by()
+    )
+    counters = [GradeProgress(**row) for row in rows]
+    GradeProgress.objects.bulk_create(counters, batch_size=1000)
+
+    buckets = {}
+    for row in counters:
+        key = (row.grade_id, row.completed_count)
+        buckets[key] = buckets.get(key, 0) + 1
+    GradeCompletionBucket.objects.bulk_create([
+        GradeCompletionBucket(grade_id=grade_id, completed_count=count, users=users)
+        for (grade_id, count), users in buckets.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_alter_lesson_estimated_time'),
+        ('progress', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeCompletionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.PositiveIntegerField()),
+                ('users', models.IntegerField(default=0)),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='completion_buckets', to='learning.grade')),
+            ],
+            options={
+                'unique_together': {('grade', 'completed_count')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GradeProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lessons_started', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('grade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_progress', to='learning.grade')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='grade_progress', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'grade')},
+            },
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0003_gradecompletionbucket_gradeprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('grade', 'Grade'), ('course', 'Course')], max_length=10)),
+                ('scope_id', models.PositiveBigIntegerField()),
+                ('window', models.CharField(max_length=10)),
+                ('lessons_completed', models.IntegerField(default=0)),
+                ('quiz_points', models.FloatField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['scope', 'scope_id', 'window', '-lessons_completed', 'user'], name='leaderboard_lessons_idx'), models.Index(fields=['scope', 'scope_id', 'window', '-quiz_points', 'user'], name='leaderboard_points_idx')],
+                'unique_together': {('scope', 'scope_id', 'window', 'user')},
+            },
+        ),
+    ]
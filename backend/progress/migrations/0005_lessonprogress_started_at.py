@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def copy_last_accessed(apps, schema_editor):
+    LessonProgress = apps.get_model('progress', 'LessonProgress')
+    LessonProgress.objects.update(started_at=models.F('last_accessed'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0004_leaderboardentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='started_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_last_accessed, migrations.RunPython.noop),
+    ]
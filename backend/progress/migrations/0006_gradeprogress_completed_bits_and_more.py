@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0005_lessonprogress_started_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gradeprogress',
+            name='completed_bits',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AddField(
+            model_name='gradeprogress',
+            name='layout_version',
+            field=models.CharField(blank=True, max_length=16),
+        ),
+    ]
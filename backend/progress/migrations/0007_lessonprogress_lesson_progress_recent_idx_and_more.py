@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_lesson_position_lesson_predecessor'),
+        ('progress', '0006_gradeprogress_completed_bits_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['user', '-last_accessed'], name='lesson_progress_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(fields=['user', 'is_completed'], name='lesson_progress_done_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_completed_at(apps, schema_editor):
+    # the last access is the closest record of when a lesson was completed
+    LessonProgress = apps.get_model("progress", "LessonProgress")
+    LessonProgress.objects.filter(is_completed=True).update(
+        completed_at=models.F("last_accessed"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_lesson_position_lesson_predecessor'),
+        ('progress', '0007_lessonprogress_lesson_progress_recent_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lessonprogress',
+            name='completed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_completed_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lessonprogress',
+            index=models.Index(condition=models.Q(('completed_at__isnull', False)), fields=['completed_at', 'id'], name='lesson_progress_completed_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:14
+
+from django.db import migrations, models
+
+
+def backfill_boards(apps, schema_editor):
+    """
+    Rebuild the all-time entries (0004 created the table empty), then the
+    score buckets of every board. Deletes first, so it can be re-run.
+    """
+    LessonProgress = apps.get_model('progress', 'LessonProgress')
+    LeaderboardEntry = apps.get_model('progress', 'LeaderboardEntry')
+    LeaderboardBucket = apps.get_model('progress', 'LeaderboardBucket')
+    QuizAttemptSummary = apps.get_model('quizzes', 'QuizAttemptSummary')
+
+    totals = {}
+    lessons = (
+        LessonProgress.objects.filter(is_completed=True)
+        .values('user_id', course_id=models.F('lesson__unit__course_id'),
+                grade_id=models.F('lesson__unit__course__grade_id'))
+        .annotate(total=models.Count('id'))
+        .order_by()
+    )
+    points = (
+        QuizAttemptSummary.objects
+        .values('user_id', course_id=models.F('quiz__lesson__unit__course_id'),
+                grade_id=models.F('quiz__lesson__unit__course__grade_id'))
+        .annotate(total=models.Sum('best_score'))
+        .order_by()
+    )
+    for rows, field in ((lessons, 'lessons_completed'), (points, 'quiz_points')):
+        for row in rows.iterator():
+            for scope, scope_id in (('grade', row['grade_id']), ('course', row['course_id'])):
+                entry = totals.setdefault((scope, scope_id, row['user_id']), {
+                    'lessons_completed': 0, 'quiz_points': 0.0})
+                entry[field] += row['total']
+
+    LeaderboardEntry.objects.filter(window='all').delete()
+    LeaderboardEntry.objects.bulk_create([
+        LeaderboardEntry(scope=scope, scope_id=scope_id, user_id=user_id, window='all', **values)
+        for (scope, scope_id, user_id), values in totals.items()
+    ], batch_size=1000)
+
+    buckets = {}
+    entries = LeaderboardEntry.objects.values_list(
+        'scope', 'scope_id', 'window', 'lessons_completed', 'quiz_points')
+    for scope, scope_id, window, lessons_completed, quiz_points in entries.iterator():
+        for metric, score in (('lessons', lessons_completed), ('points', quiz_points)):
+            key = (scope, scope_id, window, metric, score)
+            buckets[key] = buckets.get(key, 0) + 1
+    LeaderboardBucket.objects.all().delete()
+    LeaderboardBucket.objects.bulk_create([
+        LeaderboardBucket(scope=scope, scope_id=scope_id, window=window,
+                          metric=metric, score=score, users=users)
+        for (scope, scope_id, window, metric, score), users in buckets.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('progress', '0010_lessontime'),
+        ('quizzes', '0009_quizattempt_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('grade', 'Grade'), ('course', 'Course')], max_length=10)),
+                ('scope_id', models.PositiveBigIntegerField()),
+                ('window', models.CharField(max_length=10)),
+                ('metric', models.CharField(max_length=10)),
+                ('score', models.FloatField()),
+                ('users', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('scope', 'scope_id', 'window', 'metric', 'score')},
+            },
+        ),
+        migrations.RunPython(backfill_boards, migrations.RunPython.noop),
+    ]
@@ -1,12 +1,151 @@
-from django.db import models
+from django.db import connection, connections, models, router, transaction
 from django.conf import settings
+from django.utils import timezone
 
-from learning.models import Lesson
+from learning.models import Grade, Lesson
+
+
+def _from_db(db, field, value):
+    """Convert a value read with a raw cursor like the ORM would."""
+    col = field.cached_col
+    for converter in db.ops.get_db_converters(col) + col.get_db_converters(db):
+        value = converter(value, col, db)
+    return value
+
+
+class LessonProgressManager(models.Manager):
+    def record_access(self, user, lesson, accessed_at=None):
+        """
+        Bump the user's last_accessed on a lesson, or create the progress row
+        on the first open: one UPDATE ... RETURNING for a lesson opened
+        before, then an INSERT ... ON CONFLICT DO NOTHING RETURNING (SQLite
+        3.35+ and PostgreSQL) if there was no row. Which statement returned
+        the row says whether it was created. The row and the counters kept by
+        lesson_progress_changed receivers commit together.
+        Returns (progress, created).
+        """
+        accessed_at = accessed_at or timezone.now()
+        db = connections[router.db_for_write(self.model)]
+        qn = db.ops.quote_name
+        opts = self.model._meta
+        table = qn(opts.db_table)
+        pk_col, user_col, lesson_col, completed_col, accessed_col, started_col = (
+            qn(opts.get_field(name).column)
+            for name in ("id", "user", "lesson", "is_completed", "last_accessed", "started_at")
+        )
+        db_accessed_at = db.ops.adapt_datetimefield_value(accessed_at)
+        # the first statement writes, so even in SQLite's DEFERRED mode the
+        # transaction holds the write lock before the signal receivers read
+        # the counters they update, and concurrent opens wait instead of failing
+        with transaction.atomic(using=db.alias):
+            with db.cursor() as cursor:
+                while True:
+                    cursor.execute(
+                        f"UPDATE {table} SET {accessed_col} = %s "
+                        f"WHERE {user_col} = %s AND {lesson_col} = %s "
+                        f"RETURNING {pk_col}, {completed_col}, {started_col}",
+                        [db_accessed_at, user.pk, lesson.pk],
+                    )
+                    row = cursor.fetchone()
+                    if row is not None:
+                        created = False
+                        break
+                    cursor.execute(
+                        f"INSERT INTO {table} "
+                        f"({user_col}, {lesson_col}, {completed_col}, {accessed_col}, {started_col}) "
+                        f"VALUES (%s, %s, %s, %s, %s) "
+                        f"ON CONFLICT ({user_col}, {lesson_col}) DO NOTHING "
+                        f"RETURNING {pk_col}, {completed_col}, {started_col}",
+                        [user.pk, lesson.pk, False, db_accessed_at, db_accessed_at],
+                    )
+                    row = cursor.fetchone()
+                    if row is not None:
+                        created = True
+                        break
+                    # another request inserted the row in between: update it
+
+            loaded = {"user_id": user.pk, "lesson_id": lesson.pk, "last_accessed": accessed_at}
+            for name, value in zip(("id", "is_completed", "started_at"), row):
+                loaded[name] = _from_db(db, opts.get_field(name), value)
+            # from_db() takes the values in field order; completed_at stays deferred
+            fields = [field.attname for field in opts.concrete_fields if field.attname in loaded]
+            progress = self.model.from_db(db.alias, fields, [loaded[name] for name in fields])
+            progress.user = user
+            progress.lesson = lesson
+
+            # deferred import: signals imports this module
+            from .signals import lesson_progress_changed
+            lesson_progress_changed.send(
+                sender=self.model,
+                user_id=user.pk,
+                lesson_id=lesson.pk,
+                created=created,
+                deleted=False,
+                was_completed=progress.is_completed,
+                is_completed=progress.is_completed,
+                accessed_at=accessed_at,
+            )
+        return progress, created
+
+    def is_unlocked(self, user, lesson):
+        """
+        A lesson is unlocked once the lesson before it in the course sequence
+        is completed: one lookup on the (user, lesson) unique index.
+        """
+        if lesson.predecessor_id is None:
+            return True
+        return self.filter(
+            user=user, lesson_id=lesson.predecessor_id, is_completed=True).exists()
+
+    def bulk_upsert(self, user, rows, batch_size=500):
+        """
+        Write (lesson_id, is_completed, started_at, last_accessed) rows for a
+        user with INSERT ... ON CONFLICT DO UPDATE, `batch_size` rows per
+        statement. Values are written as given: last_accessed is not auto_now
+        here, and no signals are sent. A row that becomes completed gets the
+        server time as completed_at: last_accessed comes from the client and
+        may be far in the past, behind the rollups' completed_at watermark.
+        """
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        table = qn(opts.db_table)
+        user_col, lesson_col, completed_col, accessed_col, started_col, completed_at_col = (
+            qn(opts.get_field(name).column)
+            for name in ("user", "lesson", "is_completed", "last_accessed", "started_at",
+                         "completed_at")
+        )
+        adapt = connection.ops.adapt_datetimefield_value
+        completed_at = adapt(timezone.now())
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(batch))
+                params = []
+                for lesson_id, is_completed, started_at, last_accessed in batch:
+                    params += [user.pk, lesson_id, is_completed,
+                               adapt(last_accessed), adapt(started_at),
+                               completed_at if is_completed else None]
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    f"({user_col}, {lesson_col}, {completed_col}, {accessed_col}, {started_col}, "
+                    f"{completed_at_col}) "
+                    f"VALUES {values} "
+                    f"ON CONFLICT ({user_col}, {lesson_col}) DO UPDATE "
+                    f"SET {completed_col} = excluded.{completed_col}, "
+                    f"{accessed_col} = excluded.{accessed_col}, "
+                    # keep the first completion time of an already completed row
+                    f"{completed_at_col} = CASE WHEN excluded.{completed_col} "
+                    f"THEN COALESCE({table}.{completed_at_col}, excluded.{completed_at_col}) END",
+                    params,
+                )
 
 
 class LessonProgress(models.Model):
     is_completed = models.BooleanField(default=False)
     last_accessed = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(default=timezone.now)
+    # set by save() when the lesson becomes completed, cleared when it is not
+    completed_at = models.DateTimeField(null=True, blank=True)
 
     # relations (FKs)
     user = models.ForeignKey(
@@ -17,8 +156,234 @@ class LessonProgress(models.Model):
     lesson = models.ForeignKey(
         Lesson, on_delete=models.CASCADE, related_name='progress')
 
+    objects = LessonProgressManager()
+
     class Meta:
         unique_together = ('user', 'lesson')
+        indexes = [
+            # LastActivityView: a user's rows by most recent access
+            models.Index(fields=["user", "-last_accessed"], name="lesson_progress_recent_idx"),
+            # completed lessons of a user (progress vectors, unlock checks)
+            models.Index(fields=["user", "is_completed"], name="lesson_progress_done_idx"),
+            # completions in time order (analytics rollups)
+            models.Index(fields=["completed_at", "id"], name="lesson_progress_completed_idx",
+                         condition=models.Q(completed_at__isnull=False)),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remembered so post_save can tell whether completion changed
+        instance._loaded_is_completed = instance.is_completed
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._loaded_is_completed = self.is_completed
+
+    def save(self, *args, **kwargs):
+        if not self.is_completed:
+            self.completed_at = None
+        elif self.completed_at is None:
+            self.completed_at = timezone.now()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "is_completed" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "completed_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.user} - {self.lesson}: ({'Completed' if self.is_completed else 'In Progress'})"
+
+
+class GradeProgress(models.Model):
+    """
+    Per-(user, grade) counters maintained from LessonProgress changes.
+    A user is ranked in a grade once they have started one of its lessons.
+
+    `completed_bits` is a bitset of the completed lessons, laid out by
+    learning.curriculum.grade_layout(); `layout_version` is the layout it was
+    built against and is rebuilt lazily when they differ.
+    """
+    lessons_started = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    completed_bits = models.BinaryField(default=b"")
+    layout_version = models.CharField(max_length=16, blank=True)
+
+    # relations (FKs)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='grade_progress'
+    )
+    grade = models.ForeignKey(
+        Grade, on_delete=models.CASCADE, related_name='user_progress')
+
+    class Meta:
+        unique_together = ('user', 'grade')
+
+    def __str__(self):
+        return f"{self.user} - {self.grade}: {self.completed_count} completed"
+
+
+class LessonTimeManager(models.Manager):
+    def add_time(self, rows, batch_size=500):
+        """
+        Add (user_id, lesson_id, seconds, sessions) to the accumulated time of
+        each pair with INSERT ... ON CONFLICT DO UPDATE, `batch_size` rows per
+        statement, so concurrent flushes from several workers never lose time.
+        """
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        table = qn(opts.db_table)
+        user_col, lesson_col, seconds_col, sessions_col, updated_col = (
+            qn(opts.get_field(name).column)
+            for name in ("user", "lesson", "seconds", "sessions", "updated_at")
+        )
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                values = ", ".join(["(%s, %s, %s, %s, %s)"] * len(batch))
+                params = []
+                for user_id, lesson_id, seconds, sessions in batch:
+                    params += [user_id, lesson_id, seconds, sessions, now]
+                cursor.execute(
+                    f"INSERT INTO {table} "
+                    f"({user_col}, {lesson_col}, {seconds_col}, {sessions_col}, {updated_col}) "
+                    f"VALUES {values} "
+                    f"ON CONFLICT ({user_col}, {lesson_col}) DO UPDATE "
+                    f"SET {seconds_col} = {table}.{seconds_col} + excluded.{seconds_col}, "
+                    f"{sessions_col} = {table}.{sessions_col} + excluded.{sessions_col}, "
+                    f"{updated_col} = excluded.{updated_col}",
+                    params,
+                )
+
+
+class LessonTime(models.Model):
+    """
+    Time a user spent on a lesson, summed from heartbeats by
+    progress.buffers.heartbeat_buffer. A session is a run of heartbeats at
+    most PROGRESS_HEARTBEAT_SESSION_GAP_SECONDS apart.
+    """
+    seconds = models.FloatField(default=0)
+    sessions = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    # relations (FKs)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='lesson_times'
+    )
+    lesson = models.ForeignKey(
+        Lesson, on_delete=models.CASCADE, related_name='time_spent')
+
+    objects = LessonTimeManager()
+
+    class Meta:
+        unique_together = ('user', 'lesson')
+
+    def __str__(self):
+        return f"{self.user} - {self.lesson}: {self.seconds:.0f}s in {self.sessions} sessions"
+
+
+class ActivityCalendar(models.Model):
+    """
+    A user's active days as a bitmap: bit i of `days` (little-endian) is set
+    when the user opened a lesson or submitted a quiz on first_day + i days.
+    About 46 bytes per year, so a whole history is one row read.
+    Maintained by progress.activity.
+    """
+    first_day = models.DateField()
+    days = models.BinaryField(default=b"")
+
+    # relations (FKs)
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='activity_calendar'
+    )
+
+    def __str__(self):
+        return f"{self.user} active since {self.first_day}"
+
+
+class GradeCompletionBucket(models.Model):
+    """
+    Completion histogram of a grade: how many ranked users have completed
+    exactly `completed_count` of its lessons.
+    """
+    completed_count = models.PositiveIntegerField()
+    users = models.IntegerField(default=0)
+
+    # relations (FKs)
+    grade = models.ForeignKey(
+        Grade, on_delete=models.CASCADE, related_name='completion_buckets')
+
+    class Meta:
+        unique_together = ('grade', 'completed_count')
+
+    def __str__(self):
+        return f"{self.grade}: {self.users} users with {self.completed_count} completed"
+
+
+class LeaderboardEntry(models.Model):
+    """
+    A user's standing on one leaderboard: a grade or course scope and either
+    the all-time window or an ISO week ("2026-W42"). Maintained incrementally
+    by progress.leaderboards.
+    """
+    GRADE = "grade"
+    COURSE = "course"
+    SCOPE_CHOICES = [
+        (GRADE, "Grade"),
+        (COURSE, "Course"),
+    ]
+    ALL_TIME = "all"
+
+    scope = models.CharField(max_length=10, choices=SCOPE_CHOICES)
+    scope_id = models.PositiveBigIntegerField()
+    window = models.CharField(max_length=10)
+    lessons_completed = models.IntegerField(default=0)
+    quiz_points = models.FloatField(default=0)
+
+    # relations (FKs)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries'
+    )
+
+    class Meta:
+        unique_together = ('scope', 'scope_id', 'window', 'user')
+        indexes = [
+            models.Index(
+                fields=["scope", "scope_id", "window", "-lessons_completed", "user"],
+                name="leaderboard_lessons_idx"),
+            models.Index(
+                fields=["scope", "scope_id", "window", "-quiz_points", "user"],
+                name="leaderboard_points_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.scope} {self.scope_id} ({self.window})"
+
+
+class LeaderboardBucket(models.Model):
+    """
+    Score histogram of a leaderboard: how many of a board's entries have
+    exactly `score` in a metric ("lessons" or "points"). Ranks are summed
+    from it instead of counting the entries ahead of a user.
+    """
+    scope = models.CharField(max_length=10, choices=LeaderboardEntry.SCOPE_CHOICES)
+    scope_id = models.PositiveBigIntegerField()
+    window = models.CharField(max_length=10)
+    metric = models.CharField(max_length=10)
+    score = models.FloatField()
+    users = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('scope', 'scope_id', 'window', 'metric', 'score')
+
+    def __str__(self):
+        return f"{self.scope} {self.scope_id} ({self.window}): {self.users} users with {self.score} {self.metric}"
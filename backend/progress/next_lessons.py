@@ -0,0 +1,76 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.dispatch import receiver
+
+from learning.curriculum import grade_layout, lesson_location
+from learning.models import Course, Lesson
+from .signals import lesson_progress_changed
+from .vectors import grade_vector
+
+
+def _cache_key(user_id, grade_id):
+    return f"next-lessons:{user_id}:{grade_id}"
+
+
+def _compute(user_id, grade_id):
+    """
+    Walk each course's bit range of the user's progress vector in
+    curriculum order and stop at the first incomplete lesson. Three
+    queries: the vector, the grade's courses and the chosen lessons.
+    """
+    bits, layout = grade_vector(user_id, grade_id)
+    completed = int.from_bytes(bits, "little")
+    by_position = {position: lesson_id for lesson_id, position in layout["positions"].items()}
+
+    next_lesson_ids = {}
+    for course_id, (start, stop) in layout["courses"].items():
+        for position in range(start, stop):
+            if not completed >> position & 1:
+                next_lesson_ids[course_id] = by_position[position]
+                break
+
+    lessons = {
+        lesson["id"]: lesson
+        for lesson in Lesson.objects.filter(id__in=next_lesson_ids.values())
+        .values("id", "title", "position", "unit_id", "estimated_time")
+    }
+    courses = Course.objects.filter(grade_id=grade_id).order_by("id").values("id", "name")
+
+    entries = []
+    for course in courses:
+        start, stop = layout["courses"].get(course["id"], (0, 0))
+        completed_mask = (completed >> start) & ((1 << (stop - start)) - 1)
+        entries.append({
+            "course": course,
+            "lesson": lessons.get(next_lesson_ids.get(course["id"])),
+            "completed_lessons": completed_mask.bit_count(),
+            "total_lessons": stop - start,
+        })
+    return entries
+
+
+def next_lessons(user_id, grade_id):
+    """
+    The next incomplete lesson of every course in a grade for a user (None
+    once a course is finished). Cached per user until their completions
+    change; entries built against an older curriculum layout are recomputed.
+    """
+    key = _cache_key(user_id, grade_id)
+    layout_version = grade_layout(grade_id)["version"]
+    cached = cache.get(key)
+    if cached is not None and cached["layout_version"] == layout_version:
+        return cached["entries"]
+
+    entries = _compute(user_id, grade_id)
+    cache.set(key, {"layout_version": layout_version, "entries": entries},
+              timeout=settings.PROGRESS_NEXT_CACHE_TIMEOUT)
+    return entries
+
+
+@receiver(lesson_progress_changed)
+def forget_next_lessons(sender, user_id, lesson_id, deleted=False,
+                        was_completed=False, is_completed=False, **kwargs):
+    if deleted or was_completed != is_completed:
+        location = lesson_location(lesson_id)
+        if location is not None:
+            cache.delete(_cache_key(user_id, location[1]))
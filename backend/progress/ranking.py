@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from learning.curriculum import lesson_location
+from .models import GradeProgress, GradeCompletionBucket
+from .signals import lesson_progress_changed
+from .vectors import update_vector
+
+
+def _bump_bucket(grade_id, completed_count, delta):
+    buckets = GradeCompletionBucket.objects.filter(grade_id=grade_id, completed_count=completed_count)
+    if delta > 0:
+        GradeCompletionBucket.objects.get_or_create(grade_id=grade_id, completed_count=completed_count)
+    buckets.update(users=F("users") + delta)
+
+
+def apply_progress_change(user_id, grade_id, started_delta, completed_delta,
+                          lesson_id=None, is_completed=False):
+    """
+    Adjust a user's counters in a grade and move them between histogram
+    buckets. Only touches the user's own row and at most two bucket rows.
+    When `lesson_id` is given, its bit in the progress vector is updated too.
+
+    Only a started lesson creates the user's row: decrements apply to an
+    existing row, so the cascade deleting a user or grade (whose rows may
+    already be gone) never recreates them.
+    """
+    with transaction.atomic():
+        rows = GradeProgress.objects.select_for_update()
+        if started_delta > 0:
+            row, _ = rows.get_or_create(user_id=user_id, grade_id=grade_id)
+        else:
+            row = rows.filter(user_id=user_id, grade_id=grade_id).first()
+            if row is None:
+                return
+        was_ranked, old_count = row.lessons_started > 0, row.completed_count
+
+        row.lessons_started = max(0, row.lessons_started + started_delta)
+        row.completed_count = max(0, row.completed_count + completed_delta)
+        fields = ["lessons_started", "completed_count"]
+        if lesson_id is not None and completed_delta:
+            update_vector(row, lesson_id, is_completed)
+            fields += ["completed_bits", "layout_version"]
+        row.save(update_fields=fields)
+
+        if was_ranked:
+            _bump_bucket(grade_id, old_count, -1)
+        if row.lessons_started > 0:
+            _bump_bucket(grade_id, row.completed_count, 1)
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def remove_deleted_user(sender, instance, **kwargs):
+    """
+    Take a user being deleted out of the grade histograms, and drop their
+    rows up front so the LessonProgress deletes that follow find nothing to
+    adjust, whatever order the cascade runs in.
+    """
+    rows = GradeProgress.objects.filter(user_id=instance.pk)
+    for grade_id, completed_count in rows.filter(lessons_started__gt=0) \
+            .values_list("grade_id", "completed_count"):
+        _bump_bucket(grade_id, completed_count, -1)
+    rows.delete()
+
+
+@receiver(lesson_progress_changed)
+def update_grade_ranking(sender, user_id, lesson_id, created=False, deleted=False,
+                         was_completed=False, is_completed=False, **kwargs):
+    started_delta = 1 if created else -1 if deleted else 0
+    completed_delta = int(is_completed) - int(was_completed)
+    if not started_delta and not completed_delta:
+        return
+
+    location = lesson_location(lesson_id)
+    if location is not None:
+        apply_progress_change(user_id, location[1], started_delta, completed_delta,
+                              lesson_id=lesson_id, is_completed=is_completed)
+
+
+def top_percentile(grade_id, completed_count):
+    """
+    Share (in %) of ranked users in the grade that did not complete more
+    lessons than `completed_count`. Reads only the grade's histogram, which
+    has at most one row per possible completion count.
+    """
+    totals = GradeCompletionBucket.objects.filter(grade_id=grade_id).aggregate(
+        total=Sum("users"),
+        better=Sum("users", filter=Q(completed_count__gt=completed_count)),
+    )
+    total_users = totals["total"] or 0
+    better_count = totals["better"] or 0
+    return ((total_users - better_count) / total_users * 100) if total_users > 0 else 0.0
@@ -1,3 +1,7 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import serializers
 
 from .models import LessonProgress
@@ -30,6 +34,29 @@ class LessonProgressUpdateSerializer(serializers.Serializer):
     )
 
 
+class ProgressEventSerializer(serializers.Serializer):
+    """
+    A progress event recorded by a client, possibly offline.
+    Example payload: { "lesson_id": 1, "is_completed": true, "timestamp": "2026-10-19T08:00:00Z" }
+    Omit `is_completed` for a plain lesson open.
+    """
+    lesson_id = serializers.IntegerField()
+    is_completed = serializers.BooleanField(required=False, allow_null=True, default=None)
+    timestamp = serializers.DateTimeField()
+
+    def validate_timestamp(self, value):
+        oldest = timezone.now() - timedelta(days=settings.PROGRESS_SYNC_MAX_EVENT_AGE_DAYS)
+        if value < oldest:
+            raise serializers.ValidationError(
+                f"Events older than {settings.PROGRESS_SYNC_MAX_EVENT_AGE_DAYS} days are not accepted.")
+        return value
+
+
+class ProgressSyncSerializer(serializers.Serializer):
+    events = ProgressEventSerializer(
+        many=True, allow_empty=False, max_length=settings.PROGRESS_SYNC_MAX_EVENTS)
+
+
 class OverallProgressSerializer(serializers.Serializer):
     total_lessons = serializers.IntegerField()
     completed_lessons = serializers.IntegerField()
@@ -52,3 +79,100 @@ class LastActivitySerializer(serializers.ModelSerializer):
     class Meta:
         model = LessonProgress
         fields = ["id", "lesson", "is_completed", "last_accessed"]
+
+
+class NextLessonInfoSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    position = serializers.IntegerField()
+    unit_id = serializers.IntegerField()
+    estimated_time = serializers.IntegerField(allow_null=True)
+
+
+class NextLessonCourseSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+
+
+class NextLessonSerializer(serializers.Serializer):
+    course = NextLessonCourseSerializer()
+    lesson = NextLessonInfoSerializer(allow_null=True)
+    completed_lessons = serializers.IntegerField()
+    total_lessons = serializers.IntegerField()
+
+
+class ClassCourseSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    total_lessons = serializers.IntegerField()
+
+
+class StudentCourseCompletionSerializer(serializers.Serializer):
+    course_id = serializers.IntegerField()
+    completed_lessons = serializers.IntegerField()
+
+
+class ClassStudentSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    email = serializers.EmailField()
+    completed_lessons = serializers.IntegerField()
+    total_lessons = serializers.IntegerField()
+    courses = StudentCourseCompletionSerializer(many=True)
+    last_activity = serializers.DateTimeField(allow_null=True)
+    quizzes_taken = serializers.IntegerField()
+    quiz_attempts = serializers.IntegerField()
+    average_best_score = serializers.FloatField(allow_null=True)
+    last_quiz_at = serializers.DateTimeField(allow_null=True)
+
+
+class ClassDashboardSerializer(serializers.Serializer):
+    """
+    A class with each student's completion of the class grade's courses,
+    last activity and quiz summary (quizzes of the grade only).
+    """
+    id = serializers.IntegerField()
+    name = serializers.CharField()
+    grade_id = serializers.IntegerField()
+    courses = ClassCourseSerializer(many=True)
+    students = ClassStudentSerializer(many=True)
+
+
+class LessonTimeSerializer(serializers.Serializer):
+    """
+    Time the user spent on a lesson, from heartbeats, next to the lesson's
+    estimated time (both in seconds).
+    """
+    lesson_id = serializers.IntegerField()
+    seconds = serializers.FloatField()
+    sessions = serializers.IntegerField()
+    estimated_seconds = serializers.IntegerField(allow_null=True)
+
+
+class ActivityCalendarSerializer(serializers.Serializer):
+    """
+    Streaks in days and the calendar from `start` to `end` (today): one
+    character per day, oldest first, "1" when the user was active.
+    """
+    current_streak = serializers.IntegerField()
+    longest_streak = serializers.IntegerField()
+    active_days = serializers.IntegerField()
+    start = serializers.DateField()
+    end = serializers.DateField()
+    days = serializers.CharField()
+
+
+class LeaderboardEntrySerializer(serializers.Serializer):
+    rank = serializers.IntegerField()
+    user_id = serializers.IntegerField()
+    username = serializers.CharField()
+    lessons_completed = serializers.IntegerField()
+    quiz_points = serializers.FloatField()
+
+
+class LeaderboardSerializer(serializers.Serializer):
+    window = serializers.CharField()
+    metric = serializers.CharField()
+    top = LeaderboardEntrySerializer(many=True)
+    me = LeaderboardEntrySerializer(allow_null=True)
+    around = LeaderboardEntrySerializer(many=True)
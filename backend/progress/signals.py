@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import LessonProgress
+
+
+# Sent whenever a LessonProgress row is created, accessed, (un)completed or
+# deleted, including by bulk code paths that bypass model signals.
+# Arguments: user_id, lesson_id, created, deleted, was_completed,
+# is_completed, accessed_at.
+lesson_progress_changed = Signal()
+
+
+@receiver(post_save, sender=LessonProgress)
+def lesson_progress_saved(sender, instance, created, **kwargs):
+    was_completed = getattr(instance, "_loaded_is_completed", False)
+    lesson_progress_changed.send(
+        sender=LessonProgress,
+        user_id=instance.user_id,
+        lesson_id=instance.lesson_id,
+        created=created,
+        deleted=False,
+        was_completed=False if created else was_completed,
+        is_completed=instance.is_completed,
+        accessed_at=instance.last_accessed,
+    )
+    instance._loaded_is_completed = instance.is_completed
+
+
+@receiver(post_delete, sender=LessonProgress)
+def lesson_progress_deleted(sender, instance, **kwargs):
+    lesson_progress_changed.send(
+        sender=LessonProgress,
+        user_id=instance.user_id,
+        lesson_id=instance.lesson_id,
+        created=False,
+        deleted=True,
+        was_completed=getattr(instance, "_loaded_is_completed", instance.is_completed),
+        is_completed=False,
+        accessed_at=None,
+    )
@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .activity import record_activity_days
+from .models import LessonProgress
+from .signals import lesson_progress_changed
+
+
+def merge_events(events, now=None):
+    """
+    Fold a batch of client events into one state per lesson:
+    {lesson_id: {"started_at", "last_accessed", "is_completed", "completion_at"}}.
+    Later events win; `is_completed` stays None when no event set it, and
+    `completion_at` is the time of the last event that did.
+    Timestamps from the future are clamped to `now`.
+    """
+    now = now or timezone.now()
+    merged = {}
+    for event in sorted(events, key=lambda event: event["timestamp"]):
+        timestamp = min(event["timestamp"], now)
+        state = merged.setdefault(event["lesson_id"], {
+            "started_at": timestamp,
+            "last_accessed": timestamp,
+            "is_completed": None,
+            "completion_at": None,
+        })
+        state["last_accessed"] = timestamp
+        if event.get("is_completed") is not None:
+            state["is_completed"] = event["is_completed"]
+            state["completion_at"] = timestamp
+    return merged
+
+
+def merge_completion(current, state):
+    """
+    Completion of a lesson after a merge: an offline completion always
+    applies, while an offline un-complete only undoes a stored completion
+    it happened after. Opening a lesson online never hides a completion
+    made offline before it.
+    """
+    was_completed = current is not None and current.is_completed
+    if state["is_completed"] is None:
+        return was_completed
+    if state["is_completed"] or not was_completed:
+        return state["is_completed"]
+    return state["completion_at"] <= (current.completed_at or current.started_at)
+
+
+def sync_progress(user, events):
+    """
+    Apply a batch of offline progress events for a user in one transaction.
+
+    last_accessed keeps the later of the stored and the synced value, and
+    completion is merged on its own by merge_completion(); rows that change
+    are written with bulk upserts. Every day with an event counts as an
+    active day, not only the last access of each lesson. Returns the user's
+    progress for the lessons in the batch after the merge.
+    """
+    now = timezone.now()
+    merged = merge_events(events, now)
+    changes = []
+    with transaction.atomic():
+        existing = {
+            progress.lesson_id: progress
+            for progress in LessonProgress.objects.select_for_update()
+            .filter(user=user, lesson_id__in=merged)
+        }
+        rows = []
+        for lesson_id, state in merged.items():
+            current = existing.get(lesson_id)
+            was_completed = current.is_completed if current else False
+            is_completed = merge_completion(current, state)
+            if current is None:
+                started_at, last_accessed = state["started_at"], state["last_accessed"]
+            else:
+                started_at = current.started_at
+                last_accessed = max(current.last_accessed, state["last_accessed"])
+                if last_accessed == current.last_accessed and is_completed == was_completed:
+                    continue
+            rows.append((lesson_id, is_completed, started_at, last_accessed))
+            changes.append({
+                "lesson_id": lesson_id,
+                "created": current is None,
+                "was_completed": was_completed,
+                "is_completed": is_completed,
+                "accessed_at": last_accessed,
+            })
+
+        LessonProgress.objects.bulk_upsert(user, rows)
+        for change in changes:
+            lesson_progress_changed.send(
+                sender=LessonProgress, user_id=user.pk, deleted=False, **change)
+        record_activity_days(user.pk, {
+            timezone.localdate(min(event["timestamp"], now)) for event in events})
+
+    return LessonProgress.objects.filter(user=user, lesson_id__in=merged) \
+        .select_related("lesson").order_by("lesson_id")
@@ -1,11 +1,33 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from datetime import timedelta
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.test import APITestCase
+from core.testing import QueryPlanTestMixin, create_course, create_student
 from django.urls import reverse
 from rest_framework import status
 from django.contrib.auth import get_user_model
 
-from .models import LessonProgress
+from .models import (
+    ActivityCalendar, LessonProgress, LessonTime, GradeProgress, GradeCompletionBucket, LeaderboardEntry,
+    LeaderboardBucket,
+)
+from .buffers import access_buffer, heartbeat_buffer, record_heartbeat
+from .activity import activity_summary, record_activity
+from .dashboard import _compute as compute_dashboard
+from .vectors import completion_distribution, course_completion, grade_completion
+from .leaderboards import prune_weekly_boards, rebuild_all_time_boards
+from quizzes.models import Quiz, Question, Answer, QuizAttemptSummary
+from learning.curriculum import grade_layout
 from learning.models import Grade, Course, Lesson, Unit
+from users.models import ClassGroup
 
 User = get_user_model()
 
@@ -276,3 +298,739 @@ class ProgressAPITest(APITestCase):
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data["top_percentile"], 50.0)  # one user better, one user worse
+
+    def test_grade_counters_follow_completion_changes(self):
+        other_student = User.objects.create_user(
+            email="other@example.com", username="other", grade=self.grade1, firebase_uid="other_uid"
+        )
+        mine = LessonProgress.objects.create(user=self.student, lesson=self.lesson1)
+        LessonProgress.objects.create(user=other_student, lesson=self.lesson1, is_completed=True)
+
+        url = reverse("overall-progress")
+        self.assertEqual(self.client.get(url).data["top_percentile"], 50.0)
+
+        # complete via the API, then un-complete through the model
+        self.client.patch(reverse("lesson-progress", args=[self.lesson1.id]),
+                          {"is_completed": True}, format="json")
+        self.assertEqual(self.client.get(url).data["top_percentile"], 100.0)
+
+        mine.refresh_from_db()
+        mine.is_completed = False
+        mine.save()
+        counter = GradeProgress.objects.get(user=self.student, grade=self.grade1)
+        self.assertEqual((counter.lessons_started, counter.completed_count), (1, 0))
+
+        # deleting the only row removes the user from the ranking
+        mine.delete()
+        self.assertEqual(
+            list(GradeCompletionBucket.objects.filter(grade=self.grade1)
+                 .order_by("completed_count").values_list("completed_count", "users")),
+            [(0, 0), (1, 1)])
+        self.assertEqual(self.client.get(url).data["top_percentile"], 0.0)
+
+
+class LeaderboardTests(APITestCase):
+    def setUp(self):
+        self.course, self.lessons = create_course(lessons=3)
+        self.grade = self.course.grade
+        self.students = [create_student(f"s{i}", self.grade) for i in range(4)]
+        # student i completes i lessons
+        for i, student in enumerate(self.students):
+            for lesson in self.lessons[:i]:
+                LessonProgress.objects.create(user=student, lesson=lesson, is_completed=True)
+        self.client.force_authenticate(self.students[1])
+
+    def test_top_and_rank_around(self):
+        url = reverse("grade-leaderboard")
+        response = self.client.get(url, {"limit": 2, "around": 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([e["username"] for e in response.data["top"]], ["s3", "s2"])
+        self.assertEqual(response.data["me"]["rank"], 3)
+        self.assertEqual([e["username"] for e in response.data["around"]], ["s2", "s1"])
+        self.assertEqual([e["rank"] for e in response.data["around"]], [2, 3])
+
+        response = self.client.get(url, {"window": "week"})
+        self.assertEqual(response.data["me"]["lessons_completed"], 1)
+
+        response = self.client.get(url, {"window": "month"})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_quiz_points_and_uncompletion(self):
+        quiz = Quiz.objects.create(title="Quiz", time_limit=10, max_score=5,
+                                   min_score=1, lesson=self.lessons[0])
+        question = Question.objects.create(text="Q", points=5, quiz=quiz)
+        right = Answer.objects.create(text="A", question=question, is_correct=True)
+        submit = reverse("submit-quiz", kwargs={"quiz_id": quiz.id})
+        payload = {"answers": [{"question_id": question.id, "selected_answer_id": right.id}]}
+        self.client.post(submit, payload, format="json")
+        # retaking with the same score adds nothing
+        self.client.post(submit, payload, format="json")
+
+        url = reverse("course-leaderboard", args=[self.course.id])
+        response = self.client.get(url, {"metric": "points"})
+        self.assertEqual(response.data["top"][0]["username"], "s1")
+        self.assertEqual(response.data["me"]["quiz_points"], 5)
+
+        progress = LessonProgress.objects.get(user=self.students[3], lesson=self.lessons[0])
+        progress.is_completed = False
+        progress.save()
+        entry = LeaderboardEntry.objects.get(
+            user=self.students[3], scope=LeaderboardEntry.GRADE, window=LeaderboardEntry.ALL_TIME)
+        self.assertEqual(entry.lessons_completed, 2)
+
+        before = list(LeaderboardEntry.objects.filter(window=LeaderboardEntry.ALL_TIME)
+                      .order_by("id").values_list("user_id", "scope", "lessons_completed", "quiz_points"))
+        rebuild_all_time_boards()
+        after = list(LeaderboardEntry.objects.filter(window=LeaderboardEntry.ALL_TIME)
+                     .order_by("id").values_list("user_id", "scope", "lessons_completed", "quiz_points"))
+        self.assertCountEqual(before, after)
+
+    def all_time_buckets(self):
+        return list(LeaderboardBucket.objects.filter(window=LeaderboardEntry.ALL_TIME, users__gt=0)
+                    .order_by("scope", "metric", "score").values_list("scope", "metric", "score", "users"))
+
+    def test_equal_scores_share_a_rank(self):
+        LessonProgress.objects.create(user=self.students[1], lesson=self.lessons[1], is_completed=True)
+        response = self.client.get(reverse("grade-leaderboard"), {"around": 2})
+        self.assertEqual([e["rank"] for e in response.data["top"]], [1, 2, 2])
+        self.assertEqual(response.data["me"]["rank"], 2)
+        self.assertEqual([(e["username"], e["rank"]) for e in response.data["around"]],
+                         [("s3", 1), ("s1", 2), ("s2", 2)])
+
+    def test_buckets_match_a_rebuild(self):
+        self.students[3].delete()
+        LessonProgress.objects.filter(user=self.students[2], lesson=self.lessons[0]).delete()
+        before = self.all_time_buckets()
+        self.assertIn(("grade", "lessons", 1.0, 2), before)
+        rebuild_all_time_boards()
+        self.assertEqual(self.all_time_buckets(), before)
+
+    def test_limit_and_around_are_validated(self):
+        url = reverse("grade-leaderboard")
+        self.assertEqual(self.client.get(url, {"limit": "abc"}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+        response = self.client.get(url, {"limit": -5, "around": -1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["top"]), 1)
+        self.assertEqual(len(response.data["around"]), 1)
+
+    def test_deleting_a_user_with_progress(self):
+        self.students[3].delete()
+        # the cascade must not recreate rows for the deleted user
+        connection.check_constraints()
+        self.assertFalse(GradeProgress.objects.filter(user_id=self.students[3].id).exists())
+        self.assertFalse(LeaderboardEntry.objects.filter(user_id=self.students[3].id).exists())
+        self.assertEqual(
+            list(GradeCompletionBucket.objects.filter(grade=self.grade, users__gt=0)
+                 .order_by("completed_count").values_list("completed_count", "users")),
+            [(1, 1), (2, 1)])
+        self.assertEqual(LeaderboardEntry.objects.get(
+            user=self.students[2], scope=LeaderboardEntry.GRADE,
+            window=LeaderboardEntry.ALL_TIME).lessons_completed, 2)
+
+    def test_deleting_a_grade_with_progress(self):
+        self.grade.delete()
+        connection.check_constraints()
+        self.assertFalse(GradeProgress.objects.exists())
+        self.assertFalse(GradeCompletionBucket.objects.exists())
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_prune_drops_old_weeks_only(self):
+        LeaderboardEntry.objects.create(
+            scope=LeaderboardEntry.GRADE, scope_id=self.grade.id,
+            window="2000-W01", user=self.students[0], lessons_completed=3)
+        self.assertEqual(prune_weekly_boards(keep_weeks=1), 1)
+        self.assertTrue(LeaderboardEntry.objects.filter(window=LeaderboardEntry.ALL_TIME).exists())
+        self.assertFalse(LeaderboardBucket.objects.filter(window="2000-W01").exists())
+
+
+class LessonAccessUpsertTests(TransactionTestCase):
+    def setUp(self):
+        course, (self.lesson,) = create_course()
+        self.student = create_student(grade=course.grade)
+
+    def test_repeat_access_is_one_statement(self):
+        progress, created = LessonProgress.objects.record_access(self.student, self.lesson)
+        self.assertTrue(created)
+        first_access = progress.last_accessed
+
+        with CaptureQueriesContext(connection) as queries:
+            progress, created = LessonProgress.objects.record_access(self.student, self.lesson)
+        statements = [query["sql"].split()[0] for query in queries]
+        self.assertEqual([sql for sql in statements if sql not in ("BEGIN", "COMMIT")], ["UPDATE"])
+        self.assertFalse(created)
+        self.assertGreater(progress.last_accessed, first_access)
+        self.assertEqual(progress.started_at, first_access)
+        self.assertEqual(LessonProgress.objects.count(), 1)
+
+    def test_existing_rows_are_never_reported_as_created(self):
+        # started_at backfilled from last_accessed, then opened in the same tick
+        tick = timezone.now()
+        LessonProgress.objects.bulk_create([LessonProgress(
+            user=self.student, lesson=self.lesson, started_at=tick, last_accessed=tick)])
+        progress, created = LessonProgress.objects.record_access(
+            self.student, self.lesson, accessed_at=tick)
+        self.assertFalse(created)
+        self.assertEqual((progress.started_at, progress.is_completed), (tick, False))
+
+    def test_simultaneous_opens_never_raise(self):
+        barrier = threading.Barrier(2)
+        results, errors = [], []
+
+        def open_lesson():
+            try:
+                barrier.wait()
+                results.append(
+                    LessonProgress.objects.record_access(self.student, self.lesson)[1])
+            except Exception as e:  # collected and asserted below
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=open_lesson) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertCountEqual(results, [True, False])
+        self.assertEqual(LessonProgress.objects.count(), 1)
+        self.assertEqual(GradeProgress.objects.get(user=self.student).lessons_started, 1)
+
+
+@override_settings(PROGRESS_ACCESS_WRITE_BEHIND=True, PROGRESS_ACCESS_FLUSH_SECONDS=3600)
+class AccessBufferTests(APITestCase):
+    def setUp(self):
+        course, (self.lesson1, self.lesson2) = create_course(lessons=2)
+        self.student = create_student(grade=course.grade)
+        self.client.force_authenticate(self.student)
+
+    def tearDown(self):
+        access_buffer.flush()
+
+    def test_reopen_is_buffered_until_flush(self):
+        url = reverse("lesson-progress", args=[self.lesson1.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+        stored = LessonProgress.objects.get(user=self.student).last_accessed
+
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(LessonProgress.objects.get(user=self.student).last_accessed, stored)
+        self.assertEqual(self.client.get(url).data["last_accessed"], response.data["last_accessed"])
+
+        self.assertEqual(access_buffer.flush(), 1)
+        self.assertGreater(LessonProgress.objects.get(user=self.student).last_accessed, stored)
+
+    @override_settings(PROGRESS_ACCESS_MAX_PENDING=1)
+    def test_full_buffer_writes_right_away(self):
+        url = reverse("lesson-progress", args=[self.lesson1.id])
+        self.client.post(url)
+        stored = LessonProgress.objects.get(user=self.student).last_accessed
+        self.client.post(url)
+        self.assertGreater(LessonProgress.objects.get(user=self.student).last_accessed, stored)
+        self.assertEqual(access_buffer.for_user(self.student.id), {})
+
+    def test_last_activity_sees_buffered_opens(self):
+        self.client.post(reverse("lesson-progress", args=[self.lesson1.id]))
+        self.client.patch(reverse("lesson-progress", args=[self.lesson1.id]),
+                          {"is_completed": True}, format="json")
+        self.assertEqual(self.client.post(
+            reverse("lesson-progress", args=[self.lesson2.id])).status_code, status.HTTP_201_CREATED)
+        # lesson 1 was re-opened last but only the buffer knows it yet
+        self.client.post(reverse("lesson-progress", args=[self.lesson1.id]))
+
+        response = self.client.get(reverse("last-activity"), {"limit": 1})
+        self.assertEqual([row["lesson"]["id"] for row in response.data], [self.lesson1.id])
+
+    def test_flush_never_moves_timestamps_back(self):
+        progress, _ = LessonProgress.objects.record_access(self.student, self.lesson1)
+        later = timezone.now() + timedelta(minutes=1)
+        LessonProgress.objects.filter(pk=progress.pk).update(last_accessed=later)
+
+        access_buffer.add(self.student.id, {progress.pk: later - timedelta(minutes=5)})
+        access_buffer.flush()
+        self.assertEqual(LessonProgress.objects.get(pk=progress.pk).last_accessed, later)
+
+
+class ProgressVectorTests(TestCase):
+    def setUp(self):
+        self.math, self.math_lessons = create_course(lessons=3)
+        self.grade = self.math.grade
+        self.science, (self.science_lesson,) = create_course("Science", self.grade)
+        self.student = create_student(grade=self.grade)
+
+    def complete(self, lesson, is_completed=True):
+        progress, _ = LessonProgress.objects.get_or_create(user=self.student, lesson=lesson)
+        progress.is_completed = is_completed
+        progress.save()
+
+    def test_vector_tracks_completions(self):
+        self.complete(self.math_lessons[0])
+        self.complete(self.math_lessons[2])
+        self.complete(self.science_lesson)
+        self.complete(self.math_lessons[2], is_completed=False)
+
+        self.assertEqual(course_completion(self.student.id, self.grade.id, self.math.id), (1, 3))
+        self.assertEqual(course_completion(self.student.id, self.grade.id, self.science.id), (1, 1))
+        with self.assertNumQueries(1):
+            self.assertEqual(grade_completion(self.student.id, self.grade.id), (2, 4))
+        self.assertEqual(completion_distribution(self.grade.id), {2: 1})
+        self.assertEqual(completion_distribution(self.grade.id, self.science.id), {1: 1})
+
+    def test_vector_rebuilt_after_curriculum_change(self):
+        self.complete(self.science_lesson)
+        # a new lesson ahead of the science course shifts its bit
+        Lesson.objects.create(title="Math 0", order=0, unit=self.math_lessons[0].unit)
+
+        self.assertEqual(course_completion(self.student.id, self.grade.id, self.science.id), (1, 1))
+        self.assertEqual(grade_completion(self.student.id, self.grade.id), (1, 5))
+        self.assertEqual(GradeProgress.objects.get(user=self.student).completed_count, 1)
+
+    def test_stale_vectors_are_read_only_until_rebuilt(self):
+        self.complete(self.science_lesson)
+        other = User.objects.create_user(
+            email="other@example.com", username="other", firebase_uid="other_uid", grade=self.grade)
+        LessonProgress.objects.create(user=other, lesson=self.math_lessons[0], is_completed=True)
+        Lesson.objects.create(title="Math 0", order=0, unit=self.math_lessons[0].unit)
+        grade_layout(self.grade.id)
+        stale = dict(GradeProgress.objects.values_list("user_id", "completed_bits"))
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(completion_distribution(self.grade.id, self.science.id), {0: 1, 1: 1})
+        # the vectors and one query for both stale users
+        self.assertEqual(len(queries), 2)
+        self.assertTrue(all(query["sql"].startswith("SELECT") for query in queries))
+        self.assertEqual(dict(GradeProgress.objects.values_list("user_id", "completed_bits")), stale)
+
+        call_command("rebuild_progress_vectors", stdout=StringIO())
+        version = grade_layout(self.grade.id)["version"]
+        self.assertFalse(GradeProgress.objects.exclude(layout_version=version).exists())
+        with self.assertNumQueries(1):
+            self.assertEqual(grade_completion(self.student.id, self.grade.id), (1, 5))
+
+
+class ProgressSyncTests(APITestCase):
+    def setUp(self):
+        course, (self.lesson1, self.lesson2) = create_course(lessons=2)
+        self.student = create_student(grade=course.grade)
+        self.client.force_authenticate(self.student)
+        self.url = reverse("progress-sync")
+
+    def event(self, lesson, hours_ago, is_completed=None):
+        event = {"lesson_id": lesson.id,
+                 "timestamp": (timezone.now() - timedelta(hours=hours_ago)).isoformat()}
+        if is_completed is not None:
+            event["is_completed"] = is_completed
+        return event
+
+    def test_sync_merges_offline_events(self):
+        response = self.client.post(self.url, {"events": [
+            self.event(self.lesson1, 48),
+            self.event(self.lesson1, 47, is_completed=True),
+            self.event(self.lesson1, 30),
+            self.event(self.lesson2, 20),
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(row["lesson"]["id"], row["is_completed"]) for row in response.data],
+                         [(self.lesson1.id, True), (self.lesson2.id, False)])
+
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson1)
+        self.assertLess(progress.started_at, progress.last_accessed)
+        self.assertEqual(round((timezone.now() - progress.last_accessed).total_seconds() / 3600), 30)
+        self.assertEqual(GradeProgress.objects.get(user=self.student).completed_count, 1)
+
+    def test_older_events_lose_to_server_state(self):
+        LessonProgress.objects.create(user=self.student, lesson=self.lesson1, is_completed=True)
+
+        response = self.client.post(self.url, {"events": [
+            self.event(self.lesson1, 5, is_completed=False),
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data[0]["is_completed"])
+
+        response = self.client.post(self.url, {"events": [
+            self.event(self.lesson1, -1, is_completed=False),
+        ]}, format="json")
+        # future timestamps are clamped to now and still win
+        self.assertFalse(response.data[0]["is_completed"])
+        self.assertEqual(GradeProgress.objects.get(user=self.student).completed_count, 0)
+
+    def test_offline_completion_survives_a_later_online_open(self):
+        # completed offline, then opened online before the device synced
+        LessonProgress.objects.record_access(self.student, self.lesson1)
+        response = self.client.post(self.url, {"events": [
+            self.event(self.lesson1, 5, is_completed=True),
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data[0]["is_completed"])
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.lesson1)
+        # the online open stays the last access
+        self.assertLess((timezone.now() - progress.last_accessed).total_seconds(), 60)
+        self.assertEqual(GradeProgress.objects.get(user=self.student).completed_count, 1)
+
+        # an un-complete made offline before that completion does not undo it
+        self.client.post(self.url, {"events": [
+            self.event(self.lesson1, 6, is_completed=False),
+        ]}, format="json")
+        self.assertTrue(LessonProgress.objects.get(pk=progress.pk).is_completed)
+
+    def test_completed_at_follows_completion(self):
+        progress = LessonProgress.objects.create(user=self.student, lesson=self.lesson1)
+        self.assertIsNone(progress.completed_at)
+        progress.is_completed = True
+        progress.save(update_fields=["is_completed"])
+        completed_at = LessonProgress.objects.get(pk=progress.pk).completed_at
+        self.assertIsNotNone(completed_at)
+
+        # synced again while completed: the first completion time is kept
+        self.client.post(self.url, {"events": [
+            self.event(self.lesson1, -1, is_completed=True),
+            self.event(self.lesson2, 3, is_completed=True),
+        ]}, format="json")
+        rows = dict(LessonProgress.objects.values_list("lesson_id", "completed_at"))
+        self.assertEqual(rows[self.lesson1.id], completed_at)
+        # completed offline 3 hours ago, stamped when the server saw it
+        self.assertLess((timezone.now() - rows[self.lesson2.id]).total_seconds(), 60)
+        self.assertLess(LessonProgress.objects.get(lesson=self.lesson2).last_accessed,
+                        rows[self.lesson2.id])
+
+        self.client.post(self.url, {"events": [self.event(self.lesson1, -1, is_completed=False)]},
+                         format="json")
+        self.assertIsNone(LessonProgress.objects.get(pk=progress.pk).completed_at)
+
+    def test_unknown_lessons_are_rejected(self):
+        response = self.client.post(self.url, {"events": [
+            {"lesson_id": 9999, "timestamp": timezone.now().isoformat()},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_every_event_day_is_an_active_day(self):
+        cache.clear()
+        # one lesson opened on three days: only the last is its last access
+        self.client.post(self.url, {"events": [
+            self.event(self.lesson1, 0), self.event(self.lesson1, 48), self.event(self.lesson1, 120),
+        ]}, format="json")
+        summary = activity_summary(self.student.id)
+        self.assertEqual(summary["active_days"], 3)
+        self.assertEqual(summary["days"][-6:], "100101")
+
+    def test_absurdly_old_events_are_rejected(self):
+        response = self.client.post(self.url, {"events": [
+            {"lesson_id": self.lesson1.id, "timestamp": "1970-01-01T00:00:00Z"},
+        ]}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(ActivityCalendar.objects.exists())
+
+
+class LessonUnlockTests(APITestCase):
+    def setUp(self):
+        self.course, (self.lesson1, self.lesson2) = create_course(units=2)
+        self.student = create_student(grade=self.course.grade)
+        self.client.force_authenticate(self.student)
+
+    def test_lesson_locked_until_previous_completed(self):
+        url = reverse("lesson-progress", args=[self.lesson2.id])
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(LessonProgress.objects.filter(lesson=self.lesson2).exists())
+
+        LessonProgress.objects.create(user=self.student, lesson=self.lesson1, is_completed=True)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+
+    def test_unlock_check_is_one_lookup(self):
+        lesson = Lesson.objects.get(pk=self.lesson2.pk)
+        with self.assertNumQueries(1):
+            self.assertFalse(LessonProgress.objects.is_unlocked(self.student, lesson))
+
+    def test_outline_flags_unlocked_lessons(self):
+        LessonProgress.objects.create(user=self.student, lesson=self.lesson1, is_completed=True)
+        third = Lesson.objects.create(title="Lesson 3", order=2, unit=self.lesson2.unit)
+
+        response = self.client.get(reverse("lesson-list", args=[self.course.id]))
+        flags = {lesson["id"]: lesson["is_unlocked"]
+                 for unit in response.data for lesson in unit["lessons"]}
+        self.assertEqual(flags, {self.lesson1.id: True, self.lesson2.id: True, third.id: False})
+
+
+class NextLessonsTests(APITestCase):
+    def setUp(self):
+        self.math, (self.math1, self.math2) = create_course(lessons=2)
+        grade = self.math.grade
+        self.science, (self.science1,) = create_course("Science", grade)
+        self.student = create_student(grade=grade)
+        self.client.force_authenticate(self.student)
+        self.url = reverse("next-lessons")
+        cache.clear()
+
+    def next_by_course(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {entry["course"]["id"]: entry["lesson"] and entry["lesson"]["id"]
+                for entry in response.data}
+
+    def test_next_lesson_per_course(self):
+        self.assertEqual(self.next_by_course(),
+                         {self.math.id: self.math1.id, self.science.id: self.science1.id})
+
+        LessonProgress.objects.create(user=self.student, lesson=self.math1, is_completed=True)
+        LessonProgress.objects.create(user=self.student, lesson=self.science1, is_completed=True)
+        self.assertEqual(self.next_by_course(),
+                         {self.math.id: self.math2.id, self.science.id: None})
+
+    def test_cached_until_progress_changes(self):
+        self.next_by_course()
+        with self.assertNumQueries(0):
+            self.next_by_course()
+
+        LessonProgress.objects.create(user=self.student, lesson=self.math1)
+        with self.assertNumQueries(0):
+            self.next_by_course()
+
+        progress = LessonProgress.objects.get(user=self.student, lesson=self.math1)
+        progress.is_completed = True
+        progress.save()
+        with self.assertNumQueries(3):
+            self.assertEqual(self.next_by_course()[self.math.id], self.math2.id)
+
+
+@override_settings(PROGRESS_HEARTBEAT_SESSION_GAP_SECONDS=90, PROGRESS_HEARTBEAT_FLUSH_SECONDS=3600)
+class LessonTimeTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        heartbeat_buffer.flush()
+        course, (self.lesson,) = create_course(estimated_time=10)
+        self.student = create_student(grade=course.grade)
+        self.start = timezone.now()
+
+    def tearDown(self):
+        heartbeat_buffer.flush()
+
+    def ping(self, *seconds):
+        for offset in seconds:
+            record_heartbeat(self.student.id, self.lesson.id,
+                             now=self.start + timedelta(seconds=offset))
+
+    def test_heartbeats_are_sessionized(self):
+        # two sessions: 0-60s, then a gap longer than 90s, then 200-230s
+        self.ping(0, 30, 60, 200, 230)
+        self.assertEqual(heartbeat_buffer.pending((self.student.id, self.lesson.id)), [90.0, 2])
+
+    def test_flush_adds_to_stored_time(self):
+        self.ping(0, 30)
+        with self.assertNumQueries(0):
+            self.ping(60)
+        self.assertFalse(LessonTime.objects.exists())
+        self.assertEqual(heartbeat_buffer.flush(), 1)
+
+        cache.clear()
+        self.ping(1000, 1020)
+        heartbeat_buffer.flush()
+        row = LessonTime.objects.get(user=self.student, lesson=self.lesson)
+        self.assertEqual((row.seconds, row.sessions), (80.0, 2))
+        self.assertFalse(LessonProgress.objects.exists())
+
+    def test_unknown_lessons_are_dropped_on_flush(self):
+        record_heartbeat(self.student.id, self.lesson.id + 100)
+        self.ping(0)
+        self.assertEqual(heartbeat_buffer.flush(), 2)
+        self.assertEqual(list(LessonTime.objects.values_list("lesson_id", flat=True)),
+                         [self.lesson.id])
+
+    def test_endpoint_includes_buffered_time(self):
+        self.client.force_authenticate(self.student)
+        url = reverse("lesson-heartbeat", kwargs={"lesson_id": self.lesson.id})
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_204_NO_CONTENT)
+        self.ping(30)
+        heartbeat_buffer.flush()
+        self.ping(45)
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["sessions"], 1)
+        self.assertGreater(response.data["seconds"], 0)
+        self.assertEqual(response.data["estimated_seconds"], 600)
+        unknown = reverse("lesson-heartbeat", kwargs={"lesson_id": self.lesson.id + 100})
+        self.assertEqual(self.client.get(unknown).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.post(unknown).status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(heartbeat_buffer.pending((self.student.id, self.lesson.id + 100)), [0.0, 0])
+
+    @override_settings(PROGRESS_HEARTBEAT_MAX_PENDING=2)
+    def test_full_buffer_flushes(self):
+        lesson2 = Lesson.objects.create(title="Lesson 2", order=2, unit=self.lesson.unit)
+        self.ping(0)
+        self.assertFalse(LessonTime.objects.exists())
+        record_heartbeat(self.student.id, lesson2.id)
+        self.assertEqual(LessonTime.objects.count(), 2)
+        self.assertEqual(heartbeat_buffer.flush(), 0)
+
+
+class ActivityCalendarTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email="student@example.com", username="student", password="password123")
+        self.today = timezone.localdate()
+
+    def record(self, *days_ago):
+        for days in days_ago:
+            record_activity(self.user.id, self.today - timedelta(days=days))
+
+    def test_streaks_and_calendar(self):
+        self.record(400, 10, 9, 8, 1, 0)
+        summary = activity_summary(self.user.id)
+        self.assertEqual((summary["current_streak"], summary["longest_streak"]), (2, 3))
+        self.assertEqual(len(summary["days"]), 365)
+        # the day 400 days ago is outside the calendar
+        self.assertEqual(summary["active_days"], 5)
+        self.assertEqual(summary["days"][-11:], "11100000011")
+        self.assertEqual(summary["start"], self.today - timedelta(days=364))
+
+    def test_streak_holds_until_the_day_ends(self):
+        self.record(0, 2, 3)
+        self.assertEqual(activity_summary(self.user.id)["current_streak"], 1)
+        self.assertEqual(
+            activity_summary(self.user.id, today=self.today + timedelta(days=1))["current_streak"], 1)
+        self.assertEqual(
+            activity_summary(self.user.id, today=self.today + timedelta(days=2))["current_streak"], 0)
+
+    def test_earlier_day_shifts_the_bitmap(self):
+        self.record(0, 3)
+        summary = activity_summary(self.user.id)
+        self.assertEqual(summary["days"][-4:], "1001")
+        self.assertEqual(summary["longest_streak"], 1)
+
+    def test_one_write_per_day(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.record(0)
+        with self.assertNumQueries(0):
+            self.record(0)
+
+    def test_lesson_access_and_quiz_submit_count(self):
+        grade = Grade.objects.create(name="Grade 1")
+        course = Course.objects.create(name="Math", grade=grade)
+        lesson = Lesson.objects.create(
+            title="Lesson 1", order=1, unit=Unit.objects.create(course=course, title="U", order=1))
+        self.client.force_authenticate(self.user)
+        self.client.post(reverse("lesson-progress", kwargs={"lesson_id": lesson.id}))
+        self.assertEqual(activity_summary(self.user.id)["current_streak"], 1)
+
+        ActivityCalendar.objects.all().delete()
+        cache.clear()
+        quiz = Quiz.objects.create(title="Quiz", time_limit=10, max_score=10, min_score=5,
+                                   lesson=lesson)
+        question = Question.objects.create(quiz=quiz, text="Q", points=10)
+        answer = Answer.objects.create(question=question, text="A", is_correct=True)
+        self.client.post(reverse("submit-quiz", kwargs={"quiz_id": quiz.id}), {"answers": [
+            {"question_id": question.id, "selected_answer_id": answer.id}]}, format="json")
+        response = self.client.get(reverse("activity-calendar"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["current_streak"], 1)
+        self.assertTrue(response.data["days"].endswith("1"))
+
+
+class ClassDashboardTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.math, (self.lesson1, _) = create_course(lessons=2)
+        self.grade = self.math.grade
+        create_course("Science", self.grade)
+        self.quiz = Quiz.objects.create(title="Quiz", time_limit=10, max_score=10, min_score=5,
+                                        lesson=self.lesson1)
+
+        self.teacher = User.objects.create_user(
+            email="teacher@example.com", username="teacher", password="password123")
+        self.class_group = ClassGroup.objects.create(
+            name="5A", teacher=self.teacher, grade=self.grade)
+        self.students = [self.add_student(i) for i in range(3)]
+        self.url = reverse("class-dashboard", kwargs={"class_id": self.class_group.id})
+
+    def add_student(self, number):
+        student = create_student(f"student{number}", self.grade)
+        self.class_group.students.add(student)
+        LessonProgress.objects.create(user=student, lesson=self.lesson1, is_completed=True)
+        QuizAttemptSummary.objects.create(
+            user=student, quiz=self.quiz, attempts_count=2, best_score=8, last_score=6,
+            last_attempted_at=timezone.now())
+        return student
+
+    def test_dashboard_for_teacher(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([(course["name"], course["total_lessons"]) for course in response.data["courses"]],
+                         [("Math", 2), ("Science", 1)])
+        student = response.data["students"][0]
+        self.assertEqual(student["username"], "student0")
+        self.assertEqual((student["completed_lessons"], student["total_lessons"]), (1, 3))
+        self.assertEqual([course["completed_lessons"] for course in student["courses"]], [1, 0])
+        self.assertIsNotNone(student["last_activity"])
+        self.assertEqual((student["quizzes_taken"], student["quiz_attempts"],
+                          student["average_best_score"]), (1, 2, 8.0))
+
+    def test_queries_do_not_grow_with_class_size(self):
+        grade_layout(self.grade.id)
+        with CaptureQueriesContext(connection) as small:
+            compute_dashboard(self.class_group)
+        for number in range(3, 10):
+            self.add_student(number)
+        with CaptureQueriesContext(connection) as large:
+            dashboard = compute_dashboard(self.class_group)
+        self.assertEqual(len(dashboard["students"]), 10)
+        self.assertEqual(len(large), len(small))
+
+    def test_dashboard_is_cached(self):
+        self.client.force_authenticate(self.teacher)
+        self.client.get(self.url)
+        self.add_student(3)
+        # class lookup only; the new student shows up once the entry expires
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["students"]), 3)
+
+    def test_only_teacher_or_staff(self):
+        self.client.force_authenticate(self.students[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+        staff = User.objects.create_user(
+            email="staff@example.com", username="staff", password="password123", is_staff=True)
+        self.client.force_authenticate(staff)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_200_OK)
+
+
+class ProgressQueryPlanTests(QueryPlanTestMixin, APITestCase):
+    """Hot progress endpoints must not fall back to full scans on seeded data."""
+
+    def setUp(self):
+        cache.clear()
+        self.course, lessons = create_course(units=3, lessons=4)
+        grade = self.course.grade
+        Course.objects.create(name="Science", grade=grade)
+        self.lesson = lessons[0]
+        students = [create_student(f"student{i}", grade) for i in range(5)]
+        for i, student in enumerate(students):
+            for lesson in lessons[:3 + i]:
+                LessonProgress.objects.create(user=student, lesson=lesson, is_completed=True)
+        self.student = students[0]
+        self.client.force_authenticate(self.student)
+
+    def test_hot_endpoints_use_indexes(self):
+        urls = [
+            reverse("lesson-progress", args=[self.lesson.id]),
+            reverse("course-lessons-progress", args=[self.course.id]),
+            reverse("course-progress", args=[self.course.id]),
+            reverse("overall-progress"),
+            reverse("last-activity"),
+            reverse("next-lessons"),
+            reverse("grade-leaderboard"),
+            reverse("course-leaderboard", args=[self.course.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoFullScans():
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        # the recent-activity list must be read in index order, not sorted
+        with self.assertNoFullScans(allow_sorts=False):
+            self.client.get(reverse("last-activity"))
+
+        with self.assertNoFullScans():
+            self.client.post(reverse("lesson-progress", args=[self.lesson.id]))
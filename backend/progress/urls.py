@@ -1,15 +1,26 @@
 from django.urls import path
 from .views import (
     LessonProgressView,
+    ProgressSyncView,
+    LessonHeartbeatView,
     CourseLessonsProgressView,
     OverallProgressView,
     LastActivityView,
+    NextLessonsView,
+    ActivityCalendarView,
+    ClassDashboardView,
     CourseOverallProgressView,
+    GradeLeaderboardView,
+    CourseLeaderboardView,
 )
 
 urlpatterns = [
     path('lessons/<int:lesson_id>/',
          LessonProgressView.as_view(), name='lesson-progress'),
+    path('lessons/<int:lesson_id>/heartbeat/',
+         LessonHeartbeatView.as_view(), name='lesson-heartbeat'),
+    path('sync/',
+         ProgressSyncView.as_view(), name='progress-sync'),
     path('courses/<int:course_id>/lessons/',
          CourseLessonsProgressView.as_view(), name='course-lessons-progress'),
     path('courses/<int:course_id>/',
@@ -18,4 +29,14 @@ urlpatterns = [
          OverallProgressView.as_view(), name='overall-progress'),
     path('last-activity/',
          LastActivityView.as_view(), name='last-activity'),
+    path('next/',
+         NextLessonsView.as_view(), name='next-lessons'),
+    path('activity/',
+         ActivityCalendarView.as_view(), name='activity-calendar'),
+    path('classes/<int:class_id>/dashboard/',
+         ClassDashboardView.as_view(), name='class-dashboard'),
+    path('leaderboards/grade/',
+         GradeLeaderboardView.as_view(), name='grade-leaderboard'),
+    path('leaderboards/courses/<int:course_id>/',
+         CourseLeaderboardView.as_view(), name='course-leaderboard'),
 ]
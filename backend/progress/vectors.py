@@ -0,0 +1,155 @@
+from collections import Counter
+
+from django.db import transaction
+
+from learning.curriculum import grade_layout
+from .models import GradeProgress, LessonProgress
+
+
+def popcount(bits, start=0, stop=None):
+    """Number of set bits in positions [start, stop) of a bitset."""
+    value = int.from_bytes(bits, "little") >> start
+    if stop is not None:
+        value &= (1 << max(0, stop - start)) - 1
+    return value.bit_count()
+
+
+def set_bit(bits, position, value):
+    number = int.from_bytes(bits, "little")
+    if value:
+        number |= 1 << position
+    else:
+        number &= ~(1 << position)
+    return number.to_bytes((number.bit_length() + 7) // 8, "little")
+
+
+def build_vectors(user_ids, layout):
+    """{user_id: completed-lessons bitset} from LessonProgress, in one query."""
+    positions = layout["positions"]
+    numbers = dict.fromkeys(user_ids, 0)
+    completed = LessonProgress.objects.filter(
+        user_id__in=numbers, lesson_id__in=positions, is_completed=True
+    ).values_list("user_id", "lesson_id")
+    for user_id, lesson_id in completed:
+        numbers[user_id] |= 1 << positions[lesson_id]
+    return {
+        user_id: number.to_bytes((number.bit_length() + 7) // 8, "little")
+        for user_id, number in numbers.items()
+    }
+
+
+def build_vector(user_id, layout):
+    """Completed-lessons bitset of a user, from LessonProgress."""
+    return build_vectors([user_id], layout)[user_id]
+
+
+def update_vector(row, lesson_id, is_completed):
+    """
+    Set or clear a lesson's bit on a locked GradeProgress row (not saved).
+    Rebuilds the whole vector if it was built against another layout.
+    """
+    layout = grade_layout(row.grade_id)
+    if row.layout_version != layout["version"] or lesson_id not in layout["positions"]:
+        row.completed_bits = build_vector(row.user_id, layout)
+        row.layout_version = layout["version"]
+    else:
+        row.completed_bits = set_bit(
+            bytes(row.completed_bits), layout["positions"][lesson_id], is_completed)
+
+
+def grade_vector(user_id, grade_id):
+    """
+    (bits, layout) for a user in a grade: one row read, plus one more when
+    the curriculum changed since the vector was written. Stale vectors are
+    rebuilt in memory only; the next completion change or
+    `manage.py rebuild_progress_vectors` stores them.
+    """
+    layout = grade_layout(grade_id)
+    row = GradeProgress.objects.filter(user_id=user_id, grade_id=grade_id) \
+        .values("completed_bits", "layout_version").first()
+    if row is None:
+        return b"", layout
+    if row["layout_version"] == layout["version"]:
+        return bytes(row["completed_bits"]), layout
+    return build_vector(user_id, layout), layout
+
+
+def rebuild_stale_vectors(batch_size=500):
+    """
+    Rebuild and store every vector written against an older layout.
+    Returns the number of rows rebuilt.
+    """
+    rebuilt = 0
+    for grade_id in GradeProgress.objects.values_list("grade_id", flat=True) \
+            .distinct().order_by("grade_id"):
+        layout = grade_layout(grade_id)
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    GradeProgress.objects.select_for_update()
+                    .filter(grade_id=grade_id).exclude(layout_version=layout["version"])
+                    .order_by("id")[:batch_size]
+                )
+                if not rows:
+                    break
+                vectors = build_vectors([row.user_id for row in rows], layout)
+                for row in rows:
+                    row.completed_bits = vectors[row.user_id]
+                    row.layout_version = layout["version"]
+                GradeProgress.objects.bulk_update(rows, ["completed_bits", "layout_version"])
+            rebuilt += len(rows)
+    return rebuilt
+
+
+def current_vectors(grade_id, rows):
+    """
+    {user_id: bits} from (user_id, completed_bits, layout_version) rows of a
+    grade, rebuilding the stale ones in memory with a single query.
+    """
+    layout = grade_layout(grade_id)
+    vectors, stale = {}, []
+    for user_id, bits, version in rows:
+        if version == layout["version"]:
+            vectors[user_id] = bytes(bits)
+        else:
+            stale.append(user_id)
+    if stale:
+        vectors.update(build_vectors(stale, layout))
+    return vectors
+
+
+def completed_lessons(user_id, grade_id):
+    """Ids of the lessons a user completed in a grade, from their vector."""
+    bits, layout = grade_vector(user_id, grade_id)
+    number = int.from_bytes(bits, "little")
+    return {lesson_id for lesson_id, position in layout["positions"].items()
+            if number >> position & 1}
+
+
+def course_completion(user_id, grade_id, course_id):
+    """(completed, total) lessons of a user in one course of a grade."""
+    bits, layout = grade_vector(user_id, grade_id)
+    start, stop = layout["courses"].get(course_id, (0, 0))
+    return popcount(bits, start, stop), stop - start
+
+
+def grade_completion(user_id, grade_id):
+    """(completed, total) lessons of a user across a grade."""
+    bits, layout = grade_vector(user_id, grade_id)
+    return popcount(bits), layout["size"]
+
+
+def completion_distribution(grade_id, course_id=None):
+    """
+    {completed_count: users} over the users ranked in a grade, optionally
+    restricted to one course's lessons. Reads only the grade's vectors, plus
+    one query for all of those built against an older layout.
+    """
+    layout = grade_layout(grade_id)
+    start, stop = (0, None) if course_id is None else layout["courses"].get(course_id, (0, 0))
+    rows = GradeProgress.objects.filter(grade_id=grade_id, lessons_started__gt=0) \
+        .values_list("user_id", "completed_bits", "layout_version")
+    distribution = Counter()
+    for bits in current_vectors(grade_id, rows).values():
+        distribution[popcount(bits, start, stop)] += 1
+    return dict(distribution)
@@ -1,22 +1,38 @@
-from django.db.models import Count, Q, F, FloatField, ExpressionWrapper
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
+from django.conf import settings
 from django.utils import timezone
-from drf_yasg.utils import swagger_auto_schema
+from drf_yasg.utils import no_body, swagger_auto_schema
 from drf_yasg import openapi
 
 from .serializers import (
+    ActivityCalendarSerializer,
+    ClassDashboardSerializer,
     LessonProgressSerializer,
     LessonProgressUpdateSerializer,
+    LessonTimeSerializer,
     OverallProgressSerializer,
     OverallProgressWithRankSerializer,
-    LastActivitySerializer
+    LastActivitySerializer,
+    LeaderboardSerializer,
+    NextLessonSerializer,
+    ProgressSyncSerializer,
 )
-from .models import LessonProgress
+from .models import LessonProgress, LessonTime, LeaderboardEntry
+from .activity import activity_summary
+from .buffers import access_buffer, buffer_access, heartbeat_buffer, record_heartbeat
+from .dashboard import class_dashboard
+from .next_lessons import next_lessons
+from .sync import sync_progress
+from . import leaderboards
+from . import ranking
+from . import vectors
+from learning.curriculum import lesson_location
 from learning.models import Lesson, Course
+from users.models import ClassGroup
 
 
 # ---------------------------
@@ -41,23 +57,37 @@ class LessonProgressView(APIView):
                 {"detail": "Lesson progress not found. Start the lesson first."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        access_buffer.overlay([progress])
         serializer = LessonProgressSerializer(progress)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
         operation_id="access_lesson",
-        operation_description="Access a lesson and update the access_time in DB for the authenticated user",
+        operation_description="Access a lesson and update the access_time in DB for the authenticated user. \
+            A lesson can only be accessed once the previous lesson of the course is completed.",
         responses={200: LessonProgressSerializer,
-                   201: LessonProgressSerializer},
+                   201: LessonProgressSerializer,
+                   403: "Previous lesson not completed"},
     )
-    # TODO: only allow access if user completed the previous lesson (order - 1)
     def post(self, request, lesson_id):
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        progress, created = LessonProgress.objects.get_or_create(
-            user=request.user,
-            lesson=lesson
-        )
-        progress.save()  # updates last_accessed
+        lesson = get_object_or_404(
+            Lesson.objects.only("id", "title", "predecessor"), id=lesson_id)
+        if not LessonProgress.objects.is_unlocked(request.user, lesson):
+            return Response(
+                {"detail": "Complete the previous lesson first."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        if settings.PROGRESS_ACCESS_WRITE_BEHIND:
+            # re-opening a started lesson only moves last_accessed: buffer it
+            progress = LessonProgress.objects.filter(
+                user=request.user, lesson=lesson).first()
+            if progress is not None:
+                progress.lesson = lesson
+                buffer_access(progress)
+                serializer = LessonProgressSerializer(progress)
+                return Response(serializer.data, status=status.HTTP_200_OK)
+        # single upsert: creates the row or updates last_accessed
+        progress, created = LessonProgress.objects.record_access(request.user, lesson)
         serializer = LessonProgressSerializer(progress)
         return Response(serializer.data,
                         status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
@@ -95,6 +125,73 @@ class LessonProgressView(APIView):
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
 
+class LessonHeartbeatView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="lesson_heartbeat",
+        operation_description="Ping while a lesson is open (e.g. every 30 seconds) to measure time \
+            on task. Pings are sessionized in memory and written in batches.",
+        request_body=no_body,
+        responses={204: "Recorded", 404: "Lesson not found"},
+    )
+    def post(self, request, lesson_id):
+        # lesson locations are cached: a ping usually needs no query
+        if lesson_location(lesson_id) is None:
+            return Response({"detail": "Lesson not found."}, status=status.HTTP_404_NOT_FOUND)
+        record_heartbeat(request.user.id, lesson_id)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @swagger_auto_schema(
+        operation_id="lesson_time",
+        operation_description="Time the authenticated user has spent on a lesson, with the \
+            lesson's estimated time for comparison",
+        responses={200: LessonTimeSerializer},
+    )
+    def get(self, request, lesson_id):
+        lesson = get_object_or_404(Lesson, id=lesson_id)
+        saved = LessonTime.objects.filter(user=request.user, lesson=lesson) \
+            .values_list("seconds", "sessions").first() or (0.0, 0)
+        pending = heartbeat_buffer.pending((request.user.id, lesson.id))
+        serializer = LessonTimeSerializer({
+            "lesson_id": lesson.id,
+            "seconds": saved[0] + pending[0],
+            "sessions": saved[1] + pending[1],
+            "estimated_seconds": lesson.estimated_time * 60 if lesson.estimated_time else None,
+        })
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ProgressSyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="sync_lesson_progress",
+        operation_description="Apply a batch of lesson opens and completions recorded offline. \
+            Events are merged per lesson with last-writer-wins on last_accessed; \
+            returns the merged progress of every lesson in the batch.",
+        request_body=ProgressSyncSerializer,
+        responses={200: LessonProgressSerializer(many=True)},
+    )
+    def post(self, request):
+        serializer = ProgressSyncSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        events = serializer.validated_data["events"]
+
+        lesson_ids = {event["lesson_id"] for event in events}
+        unknown = lesson_ids - set(
+            Lesson.objects.filter(id__in=lesson_ids).values_list("id", flat=True))
+        if unknown:
+            return Response(
+                {"detail": f"Lessons {sorted(unknown)} do not exist."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        progress = sync_progress(request.user, events)
+        return Response(LessonProgressSerializer(progress, many=True).data,
+                        status=status.HTTP_200_OK)
+
+
 class CourseLessonsProgressView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -129,19 +226,11 @@ class CourseOverallProgressView(APIView):
     )
     def get(self, request, course_id):
         # Ensure course exists
-        course = get_object_or_404(Course, id=course_id)
-
-        # Get lessons that belong ONLY to this course
-        lessons_in_course = Lesson.objects.filter(unit__course=course)
+        course = get_object_or_404(Course.objects.only("id", "grade_id"), id=course_id)
 
-        total_lessons = lessons_in_course.count()
-
-        # Count completed lessons by this user in this course
-        completed_lessons = LessonProgress.objects.filter(
-            user=request.user,
-            lesson__in=lessons_in_course,
-            is_completed=True,
-        ).count()
+        # Popcount over the course's bit range of the user's grade vector
+        completed_lessons, total_lessons = vectors.course_completion(
+            request.user.id, course.grade_id, course.id)
 
         # Compute percentage for this course
         completion_percentage = (
@@ -169,21 +258,15 @@ class OverallProgressView(APIView):
     )
     def get(self, request):
         user = request.user
-        if user.grade is None:
+        if user.grade_id is None:
             return Response(
                 {"detail": "User is not assigned to a grade."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # All lessons for the user's grade (via courses in that grade)
-        total_lessons = Lesson.objects.filter(unit__course__grade=user.grade).count()
-
-        # Lessons the user has completed
-        completed_lessons = LessonProgress.objects.filter(
-            user=user,
-            is_completed=True,
-            lesson__unit__course__grade=user.grade  # optional, if you want to restrict by grade
-        ).count()
+        # Lessons of the grade and the user's completed ones, from the
+        # grade layout and the user's progress vector
+        completed_lessons, total_lessons = vectors.grade_completion(user.id, user.grade_id)
 
         # Calculate percentage
         completion_percentage = (
@@ -191,27 +274,9 @@ class OverallProgressView(APIView):
             100 if total_lessons > 0 else 0.0
         )
 
-        # Calculate top percentile
-        users_progress = (
-            LessonProgress.objects
-            .filter(lesson__unit__course__grade=user.grade)
-            .values('user')
-            .annotate(
-                completed_count=Count('id', filter=Q(is_completed=True))
-            )
-            .annotate(
-                completion_percentage=ExpressionWrapper(
-                    F('completed_count') * 100.0 / total_lessons,
-                    output_field=FloatField()
-                )
-            )
-            .order_by('-completion_percentage')
-        )
+        # Rank among users of the grade, from the grade's completion histogram
+        top_percentile = ranking.top_percentile(user.grade_id, completed_lessons)
 
-        # Count how many users have a lower completion % than the current user
-        better_count = sum(1 for u in users_progress if u['completion_percentage'] > completion_percentage)
-        total_users = len(users_progress)
-        top_percentile = ((total_users - better_count) / total_users * 100) if total_users > 0 else 0.0
         data = {
             "total_lessons": total_lessons,
             "completed_lessons": completed_lessons,
@@ -241,10 +306,158 @@ class LastActivityView(APIView):
     )
     def get(self, request):
         limit = int(request.query_params.get("limit", 5))
-        last_activities = (
-            LessonProgress.objects
-            .filter(user=request.user)
-            .order_by("-last_accessed")[:limit]
-        )
+        user_progress = LessonProgress.objects.filter(user=request.user)
+        last_activities = list(user_progress.order_by("-last_accessed")[:limit])
+
+        # lessons opened since the last access-buffer flush may not be in the
+        # top N yet: fetch them too and re-rank with the buffered timestamps
+        buffered = access_buffer.for_user(request.user.id)
+        missing = set(buffered) - {progress.pk for progress in last_activities}
+        if missing:
+            last_activities += user_progress.filter(pk__in=missing)
+        if buffered:
+            access_buffer.overlay(last_activities)
+            last_activities.sort(key=lambda progress: progress.last_accessed, reverse=True)
+            last_activities = last_activities[:limit]
         serializer = LastActivitySerializer(last_activities, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class NextLessonsView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="next_lessons",
+        operation_description="Get the next incomplete lesson of every course in the authenticated user's grade \
+            (null once a course is completed)",
+        responses={200: NextLessonSerializer(many=True)},
+    )
+    def get(self, request):
+        if request.user.grade_id is None:
+            return Response(
+                {"detail": "User is not assigned to a grade."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        entries = next_lessons(request.user.id, request.user.grade_id)
+        serializer = NextLessonSerializer(entries, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ActivityCalendarView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="activity_calendar",
+        operation_description="The authenticated user's current and longest streak of active days \
+            (a lesson opened or a quiz submitted) and their activity over the last 365 days",
+        responses={200: ActivityCalendarSerializer},
+    )
+    def get(self, request):
+        serializer = ActivityCalendarSerializer(activity_summary(request.user.id))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+# ---------------------------
+# Teacher class dashboard
+# ---------------------------
+class ClassDashboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="class_dashboard",
+        operation_description="Course completion, last activity and quiz summary of every student \
+            in a class, in one response. Only the class teacher (or staff) may read it; \
+            cached for a short while.",
+        responses={200: ClassDashboardSerializer},
+    )
+    def get(self, request, class_id):
+        class_group = get_object_or_404(ClassGroup, id=class_id)
+        if class_group.teacher_id != request.user.id and not request.user.is_staff:
+            return Response(
+                {"detail": "Only the teacher of this class can view its dashboard."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        serializer = ClassDashboardSerializer(class_dashboard(class_group))
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+leaderboard_parameters = [
+    openapi.Parameter(
+        "window", openapi.IN_QUERY,
+        description="`week` (current ISO week) or `all` (default: all)",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "metric", openapi.IN_QUERY,
+        description="`lessons` (completed lessons) or `points` (best quiz scores) (default: lessons)",
+        type=openapi.TYPE_STRING,
+    ),
+    openapi.Parameter(
+        "limit", openapi.IN_QUERY,
+        description="Number of top entries to return (default: 10, max: 100)",
+        type=openapi.TYPE_INTEGER,
+    ),
+    openapi.Parameter(
+        "around", openapi.IN_QUERY,
+        description="Neighbours to return on each side of the user (default: 2, max: 10)",
+        type=openapi.TYPE_INTEGER,
+    ),
+]
+
+
+def leaderboard_response(request, scope, scope_id):
+    window = request.query_params.get("window", LeaderboardEntry.ALL_TIME)
+    metric = request.query_params.get("metric", "lessons")
+    if window not in (LeaderboardEntry.ALL_TIME, "week") or metric not in leaderboards.METRICS:
+        return Response(
+            {"detail": "window must be 'week' or 'all'; metric must be 'lessons' or 'points'."},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if window == "week":
+        window = leaderboards.week_window()
+
+    try:
+        limit = min(max(int(request.query_params.get("limit", 10)), 1), 100)
+        around = min(max(int(request.query_params.get("around", 2)), 0), 10)
+    except ValueError:
+        return Response({"detail": "limit and around must be integers."},
+                        status=status.HTTP_400_BAD_REQUEST)
+    data = leaderboards.leaderboard(
+        scope, scope_id, window, metric, request.user, limit=limit, around=around)
+    data.update(window=window, metric=metric)
+
+    serializer = LeaderboardSerializer(data)
+    return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class GradeLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="grade_leaderboard",
+        operation_description="Leaderboard of the authenticated user's grade: top entries and \
+            the user's rank with neighbours",
+        manual_parameters=leaderboard_parameters,
+        responses={200: LeaderboardSerializer()},
+    )
+    def get(self, request):
+        if request.user.grade_id is None:
+            return Response(
+                {"detail": "User is not assigned to a grade."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return leaderboard_response(request, LeaderboardEntry.GRADE, request.user.grade_id)
+
+
+class CourseLeaderboardView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="course_leaderboard",
+        operation_description="Leaderboard of a course: top entries and the user's rank with neighbours",
+        manual_parameters=leaderboard_parameters,
+        responses={200: LeaderboardSerializer()},
+    )
+    def get(self, request, course_id):
+        course = get_object_or_404(Course, id=course_id)
+        return leaderboard_response(request, LeaderboardEntry.COURSE, course.id)
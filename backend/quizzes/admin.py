@@ -1,5 +1,22 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db.models import F, FloatField, ExpressionWrapper
+from django.db.models.functions import NullIf
 from .models import Quiz, Question, Answer
+from .rescoring import enqueue_rescores
+
+
+@admin.action(description="Re-score existing attempts")
+def rescore_attempts(modeladmin, request, queryset):
+    # re-scoring is batched over every attempt of a quiz, so it runs in
+    # `manage.py rescore_quiz --queued`, not in the request
+    if queryset.model is Quiz:
+        quiz_ids = queryset.values_list("id", flat=True)
+    else:
+        quiz_ids = queryset.values_list("quiz_id", flat=True).distinct()
+
+    queued = enqueue_rescores(list(quiz_ids))
+    modeladmin.message_user(
+        request, f"Queued {queued} quizzes for re-scoring.", messages.SUCCESS)
 
 
 class AnswerInline(admin.TabularInline):
@@ -18,22 +35,64 @@ class QuestionInline(admin.StackedInline):
 
 @admin.register(Quiz)
 class QuizAdmin(admin.ModelAdmin):
-    list_display = ("title", "lesson", "time_limit", "max_score", "min_score")
+    list_display = ("title", "lesson", "time_limit", "max_score", "min_score", "exam_mode")
     search_fields = ("title", "description")
-    list_filter = ("lesson",)
+    list_filter = ("lesson", "exam_mode")
     inlines = [QuestionInline]
+    actions = [rescore_attempts]
+
+
+def _rate(value):
+    return "-" if value is None else f"{value:.0%}"
 
 
 @admin.register(Question)
 class QuestionAdmin(admin.ModelAdmin):
-    list_display = ("text", "quiz", "points")
+    list_display = ("text", "quiz", "points", "responses", "difficulty", "discrimination")
+    list_select_related = ("quiz", "stats")
     search_fields = ("text",)
     list_filter = ("quiz",)
     inlines = [AnswerInline]
+    actions = [rescore_attempts]
+
+    # item statistics are maintained by `manage.py analyze_items`
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            correct_share=ExpressionWrapper(
+                F("stats__correct") * 1.0 / NullIf(F("stats__responses"), 0),
+                output_field=FloatField()))
+
+    @admin.display(ordering="stats__responses")
+    def responses(self, obj):
+        stats = getattr(obj, "stats", None)
+        return stats.responses if stats else 0
+
+    @admin.display(description="Correct", ordering="correct_share")
+    def difficulty(self, obj):
+        return _rate(obj.correct_share)
+
+    @admin.display(description="Discrimination")
+    def discrimination(self, obj):
+        stats = getattr(obj, "stats", None)
+        value = stats.discrimination if stats else None
+        return "-" if value is None else f"{value:.2f}"
 
 
 @admin.register(Answer)
 class AnswerAdmin(admin.ModelAdmin):
-    list_display = ("text", "question", "is_correct")
+    list_display = ("text", "question", "is_correct", "picks", "pick_rate")
+    list_select_related = ("question__stats", "stats")
     search_fields = ("text",)
     list_filter = ("is_correct", "question__quiz")
+
+    @admin.display(ordering="stats__picks")
+    def picks(self, obj):
+        stats = getattr(obj, "stats", None)
+        return stats.picks if stats else 0
+
+    @admin.display(description="Pick rate")
+    def pick_rate(self, obj):
+        question_stats = getattr(obj.question, "stats", None)
+        if not question_stats or not question_stats.responses:
+            return "-"
+        return _rate(self.picks(obj) / question_stats.responses)
@@ -0,0 +1,98 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import QuizAttempt, UserAnswer, ArchivedQuizAttempt, QuizSubmission
+from .summaries import rebuild_summaries
+
+
+def archive_cutoff(days=None):
+    """
+    Attempts made before the returned datetime are eligible for archiving.
+    """
+    if days is None:
+        days = settings.QUIZ_ARCHIVE_AFTER_DAYS
+    return timezone.now() - timedelta(days=days)
+
+
+def _archive_batch(cutoff, batch_size):
+    with transaction.atomic():
+        attempts = list(
+            QuizAttempt.objects
+            .filter(attempted_at__lt=cutoff)
+            .order_by("id")
+            .values("id", "user_id", "quiz_id", "score", "attempted_at")[:batch_size]
+        )
+        if not attempts:
+            return 0
+
+        attempt_ids = [attempt["id"] for attempt in attempts]
+        answers = {}
+        answer_rows = (
+            UserAnswer.objects
+            .filter(attempt_id__in=attempt_ids)
+            .order_by("id")
+            .values("id", "attempt_id", "is_correct",
+                    "question_id", "question__text",
+                    "selected_answer_id", "selected_answer__text")
+        )
+        for row in answer_rows:
+            answers.setdefault(row["attempt_id"], []).append({
+                "id": row["id"],
+                "question_id": row["question_id"],
+                # same text as Question.__str__ / Answer.__str__
+                "question": row["question__text"][:50],
+                "selected_answer_id": row["selected_answer_id"],
+                "selected_answer": row["selected_answer__text"][:50],
+                "is_correct": row["is_correct"],
+            })
+
+        ArchivedQuizAttempt.objects.bulk_create([
+            ArchivedQuizAttempt(
+                id=attempt["id"],
+                user_id=attempt["user_id"],
+                quiz_id=attempt["quiz_id"],
+                score=attempt["score"],
+                attempted_at=attempt["attempted_at"],
+                user_answers=answers.get(attempt["id"], []),
+            )
+            for attempt in attempts
+        ], ignore_conflicts=True)
+
+        # the archived row keeps the attempt id; keep submissions pointing at it
+        QuizSubmission.objects.filter(attempt_id__in=attempt_ids).update(
+            archived_attempt_id=F("attempt_id"))
+        UserAnswer.objects.filter(attempt_id__in=attempt_ids).delete()
+        QuizAttempt.objects.filter(id__in=attempt_ids).delete()
+
+        # Attempts made before summaries existed only live in the tables we
+        # just moved them between, so recompute from both.
+        rebuild_summaries(
+            (attempt["user_id"], attempt["quiz_id"]) for attempt in attempts)
+    return len(attempts)
+
+
+def archive_attempts(days=None, batch_size=None, pause=0.0, progress=None):
+    """
+    Move attempts older than `days` into ArchivedQuizAttempt, `batch_size`
+    attempts per transaction so the hot tables are only locked briefly.
+    Returns the number of attempts archived.
+    """
+    cutoff = archive_cutoff(days)
+    batch_size = batch_size or settings.QUIZ_ARCHIVE_BATCH_SIZE
+
+    total = 0
+    while True:
+        archived = _archive_batch(cutoff, batch_size)
+        if not archived:
+            break
+        total += archived
+        if progress:
+            progress(total)
+        if pause:
+            time.sleep(pause)
+    return total
@@ -0,0 +1,85 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.http import Http404
+
+from .models import Answer, Question, Quiz
+from .serializers import QuestionDeliverySerializer, QuizDeliverySerializer
+
+
+def delivery_queryset():
+    """
+    Quizzes with everything the delivery payload needs: one query for the
+    quiz and lesson label chain, one for questions, one for answers.
+    """
+    return (
+        Quiz.objects
+        .select_related("lesson__unit__course__grade")
+        .prefetch_related(Prefetch(
+            "questions",
+            queryset=Question.objects.order_by("id").prefetch_related(
+                Prefetch("answers", queryset=Answer.objects.order_by("id"))),
+        ))
+    )
+
+
+def cache_key(quiz):
+    return f"quiz-delivery:{quiz.id}:{quiz.content_version}"
+
+
+def get_delivery_payloads(quizzes):
+    """
+    Student payloads for `quizzes` (only `id` and `content_version` need to be
+    loaded), in the same order. Cached per quiz content version.
+    """
+    quizzes = list(quizzes)
+    keys = {quiz.id: cache_key(quiz) for quiz in quizzes}
+    cached = cache.get_many(keys.values())
+    payloads = {
+        quiz.id: cached[keys[quiz.id]] for quiz in quizzes if keys[quiz.id] in cached
+    }
+
+    missing = [quiz.id for quiz in quizzes if quiz.id not in payloads]
+    if missing:
+        built = {}
+        for quiz in delivery_queryset().filter(id__in=missing):
+            payloads[quiz.id] = QuizDeliverySerializer(quiz).data
+            # keyed by the version that was actually serialized
+            built[cache_key(quiz)] = payloads[quiz.id]
+        cache.set_many(built, timeout=settings.QUIZ_DELIVERY_CACHE_TIMEOUT)
+
+    return [payloads[quiz.id] for quiz in quizzes if quiz.id in payloads]
+
+
+def get_delivery_payload(quiz):
+    """
+    Payload of a single quiz; raises Http404 if it was deleted since `quiz`
+    was loaded.
+    """
+    payloads = get_delivery_payloads([quiz])
+    if not payloads:
+        raise Http404("No Quiz matches the given query.")
+    return payloads[0]
+
+
+def get_draw_payload(quiz, question_ids):
+    """
+    Payload limited to the drawn questions, in draw order. Only touches the
+    drawn rows, so its cost does not depend on the size of the question bank.
+    `quiz` should come with its lesson label chain selected.
+    """
+    questions = (
+        Question.objects
+        .filter(quiz_id=quiz.id, id__in=question_ids)
+        .prefetch_related(Prefetch("answers", queryset=Answer.objects.order_by("id")))
+    )
+    position = {question_id: i for i, question_id in enumerate(question_ids)}
+    questions = sorted(questions, key=lambda question: position[question.id])
+    return {
+        "id": quiz.id,
+        "title": quiz.title,
+        "description": quiz.description,
+        "time_limit": quiz.time_limit,
+        "lesson": str(quiz.lesson),
+        "questions": QuestionDeliverySerializer(questions, many=True).data,
+    }
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from quizzes.archive import archive_attempts
+
+
+class Command(BaseCommand):
+    help = "Move old quiz attempts and their answers into the archive table."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=None,
+            help="Archive attempts older than this many days "
+                 "(default: QUIZ_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Attempts moved per transaction (default: QUIZ_ARCHIVE_BATCH_SIZE)")
+        parser.add_argument(
+            "--pause", type=float, default=0.0,
+            help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        total = archive_attempts(
+            days=options["days"],
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            progress=lambda done: self.stdout.write(f"Archived {done} attempts..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} quiz attempts."))
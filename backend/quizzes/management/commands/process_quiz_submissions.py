@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quizzes.submissions import process_submissions
+
+
+class Command(BaseCommand):
+    help = "Score queued exam-mode quiz submissions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Submissions scored per batch (default: QUIZ_SUBMISSION_BATCH_SIZE)")
+        parser.add_argument(
+            "--interval", type=float, default=1.0,
+            help="Seconds to wait when the queue is empty")
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Drain the queue and exit instead of polling forever")
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_submissions(batch_size=options["batch_size"])
+            if processed:
+                self.stdout.write(f"Processed {processed} submissions")
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes.models import Quiz
+from quizzes.rescoring import process_rescores, rescore_quiz
+
+
+class Command(BaseCommand):
+    help = "Recompute scores of existing attempts after a quiz's answer key changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_ids", nargs="*", type=int)
+        parser.add_argument(
+            "--queued", action="store_true",
+            help="Also run the re-scores queued from the admin")
+        parser.add_argument(
+            "--batch-size", type=int, default=None,
+            help="Attempts re-scored per transaction (default: QUIZ_RESCORE_BATCH_SIZE)")
+
+    def progress(self, quiz_id, done, total):
+        self.stdout.write(f"Quiz {quiz_id}: {done}/{total} attempts re-scored")
+
+    def handle(self, *args, **options):
+        if not options["quiz_ids"] and not options["queued"]:
+            raise CommandError("Give quiz ids, --queued, or both.")
+
+        for quiz_id in options["quiz_ids"]:
+            if not Quiz.objects.filter(id=quiz_id).exists():
+                raise CommandError(f"Quiz {quiz_id} does not exist.")
+
+            total = rescore_quiz(
+                quiz_id,
+                batch_size=options["batch_size"],
+                progress=lambda done, total: self.progress(quiz_id, done, total),
+            )
+            self.stdout.write(self.style.SUCCESS(
+                f"Quiz {quiz_id}: re-scored {total} attempts."))
+
+        if options["queued"]:
+            processed = process_rescores(
+                batch_size=options["batch_size"], progress=self.progress)
+            self.stdout.write(self.style.SUCCESS(
+                f"Ran {processed} queued re-scores."))
@@ -0,0 +1,89 @@
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+
+from .models import ArchivedQuizAttempt, QuestionMastery, UserAnswer
+
+# Days until a question is due again, by Leitner box. Box 0 (never answered
+# correctly, or just missed) is due right away.
+REVIEW_INTERVALS = (0, 1, 3, 7, 16, 35)
+
+
+def _schedule(row, is_correct, answered_at):
+    row.times_seen += 1
+    if is_correct:
+        row.times_correct += 1
+        row.box = min(row.box + 1, len(REVIEW_INTERVALS) - 1)
+    else:
+        row.box = 0
+    row.last_seen_at = answered_at
+    row.due_at = answered_at + timedelta(days=REVIEW_INTERVALS[row.box])
+
+
+def _apply(answers):
+    users = {user_id for user_id, _, _, _ in answers}
+    questions = {question_id for _, question_id, _, _ in answers}
+    rows = {
+        (row.user_id, row.question_id): row
+        for row in QuestionMastery.objects.select_for_update()
+        .filter(user_id__in=users, question_id__in=questions)
+    }
+    changed, created = {}, {}
+    for user_id, question_id, is_correct, answered_at in sorted(answers, key=lambda a: a[3]):
+        key = (user_id, question_id)
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = created[key] = QuestionMastery(user_id=user_id, question_id=question_id)
+        elif key not in created:
+            changed[key] = row
+        _schedule(row, is_correct, answered_at)
+
+    QuestionMastery.objects.bulk_update(
+        changed.values(), ["times_seen", "times_correct", "box", "last_seen_at", "due_at"], batch_size=500)
+    QuestionMastery.objects.bulk_create(created.values(), batch_size=500)
+
+
+def record_answers(answers):
+    """
+    Fold scored answers, as (user_id, question_id, is_correct, answered_at)
+    tuples, into the users' mastery rows: one read and one bulk write per
+    batch, whatever the number of questions.
+    """
+    if not answers:
+        return
+    for retry in (False, True):
+        try:
+            with transaction.atomic():
+                _apply(answers)
+            return
+        except IntegrityError:
+            # a concurrent submission created one of the rows first
+            if retry:
+                raise
+
+
+def rebuild_mastery(user_ids, question_ids):
+    """
+    Recompute the mastery rows of `user_ids` on `question_ids` by replaying
+    their live and archived answers, e.g. after a re-score changed which of
+    them were correct.
+    """
+    user_ids, question_ids = set(user_ids), set(question_ids)
+    if not user_ids or not question_ids:
+        return
+    answers = list(
+        UserAnswer.objects
+        .filter(attempt__user_id__in=user_ids, question_id__in=question_ids)
+        .values_list("attempt__user_id", "question_id", "is_correct", "attempt__attempted_at")
+    )
+    archived = ArchivedQuizAttempt.objects.filter(
+        user_id__in=user_ids, quiz__questions__id__in=question_ids).distinct()
+    for attempt in archived.only("user_id", "attempted_at", "user_answers"):
+        answers.extend(
+            (attempt.user_id, answer["question_id"], answer["is_correct"], attempt.attempted_at)
+            for answer in attempt.user_answers if answer.get("question_id") in question_ids)
+
+    with transaction.atomic():
+        QuestionMastery.objects.filter(user_id__in=user_ids, question_id__in=question_ids).delete()
+        if answers:
+            _apply(answers)
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:28
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_summaries(apps, schema_editor):
+    QuizAttempt = apps.get_model('quizzes', 'QuizAttempt')
+    QuizAttemptSummary = apps.get_model('quizzes', 'QuizAttemptSummary')
+
+    latest = QuizAttempt.objects.filter(
+        user_id=models.OuterRef('user_id'), quiz_id=models.OuterRef('quiz_id')
+    ).order_by('-attempted_at', '-id')
+    rows = (
+        QuizAttempt.objects
+        .values('user_id', 'quiz_id')
+        .annotate(
+            attempts_count=models.Count('id'),
+            best_score=models.Max('score'),
+            last_attempted_at=models.Max('attempted_at'),
+            last_score=models.Subquery(latest.values('score')[:1]),
+        )
+        .order_by()
+    )
+    QuizAttemptSummary.objects.bulk_create(
+        (QuizAttemptSummary(**row) for row in rows.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedQuizAttempt',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('score', models.FloatField()),
+                ('attempted_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user_answers', models.JSONField(default=list)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_attempts', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_quiz_attempts', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuizAttemptSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('best_score', models.FloatField()),
+                ('last_score', models.FloatField()),
+                ('last_attempted_at', models.DateTimeField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_summaries', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_attempt_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'quiz')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
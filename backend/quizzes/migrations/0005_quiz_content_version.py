@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:32
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_quiz_exam_mode_alter_quizattempt_attempted_at_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='content_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quiz_content_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quiz',
+            name='sample_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Questions drawn at random per attempt (empty = all questions)', null=True),
+        ),
+        migrations.AddField(
+            model_name='quiz',
+            name='stratify_by_points',
+            field=models.BooleanField(default=False, help_text='Keep the share of questions per point value when sampling'),
+        ),
+        migrations.CreateModel(
+            name='QuestionDraw',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('seed', models.BigIntegerField()),
+                ('question_ids', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='draws', to='quizzes.quiz')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_draws', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='quizattempt',
+            name='draw',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempt', to='quizzes.questiondraw'),
+        ),
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='draw',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submissions', to='quizzes.questiondraw'),
+        ),
+    ]
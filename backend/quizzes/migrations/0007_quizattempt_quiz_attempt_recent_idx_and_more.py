@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-19 18:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_quiz_sample_size_quiz_stratify_by_points_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['user', '-attempted_at'], name='quiz_attempt_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'user', '-attempted_at'], name='quiz_attempt_quiz_user_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0007_quizattempt_quiz_attempt_recent_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionMastery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('times_seen', models.PositiveIntegerField(default=0)),
+                ('times_correct', models.PositiveIntegerField(default=0)),
+                ('box', models.PositiveSmallIntegerField(default=0)),
+                ('last_seen_at', models.DateTimeField()),
+                ('due_at', models.DateTimeField()),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mastery', to='quizzes.question')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_mastery', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'due_at'], name='question_mastery_due_idx')],
+                'unique_together': {('user', 'question')},
+            },
+        ),
+    ]
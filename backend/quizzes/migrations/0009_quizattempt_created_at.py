@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 19:35
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def backfill_created_at(apps, schema_editor):
+    # existing attempts: when they were attempted is the closest record
+    QuizAttempt = apps.get_model("quizzes", "QuizAttempt")
+    QuizAttempt.objects.update(created_at=models.F("attempted_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0008_questionmastery'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizattempt',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+    ]
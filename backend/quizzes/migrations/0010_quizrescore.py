@@ -0,0 +1,29 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0009_quizattempt_created_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizRescore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('done', 'Done')], default='pending', max_length=10)),
+                ('attempts_rescored', models.PositiveIntegerField(default=0)),
+                ('requested_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rescores', to='quizzes.quiz')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='quiz_rescore_queue_idx')],
+            },
+        ),
+    ]
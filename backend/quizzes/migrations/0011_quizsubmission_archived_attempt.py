@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-19 20:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0010_quizrescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='quizsubmission',
+            name='archived_attempt',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='submission', to='quizzes.archivedquizattempt'),
+        ),
+    ]
@@ -1,6 +1,9 @@
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.core.exceptions import ValidationError
+from django.utils import timezone
 
 
 class Quiz(models.Model):
@@ -9,6 +12,18 @@ class Quiz(models.Model):
     time_limit = models.PositiveIntegerField(help_text="Time limit in minutes")
     max_score = models.PositiveIntegerField()
     min_score = models.PositiveIntegerField()
+    exam_mode = models.BooleanField(
+        default=False,
+        help_text="Queue submissions and score them in batches (for timed exams)")
+    sample_size = models.PositiveIntegerField(
+        null=True, blank=True,
+        help_text="Questions drawn at random per attempt (empty = all questions)")
+    stratify_by_points = models.BooleanField(
+        default=False,
+        help_text="Keep the share of questions per point value when sampling")
+    # replaced whenever the quiz, its questions or answers change;
+    # part of the cache key of the delivery payload
+    content_version = models.UUIDField(default=uuid.uuid4, editable=False)
 
     # relations (FKs)
     lesson = models.ForeignKey(
@@ -61,15 +76,48 @@ class Answer(models.Model):
         return self.text[:50]  # Return first 50 characters of the answer
 
 
+class QuestionDraw(models.Model):
+    """
+    The questions a user was served when starting a sampled quiz. Recorded so
+    the submission can be checked against exactly these questions.
+    """
+    seed = models.BigIntegerField()
+    question_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    # relations (FKs)
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name='draws')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='question_draws')
+
+    def __str__(self):
+        return f"{self.user} - {self.quiz} - seed {self.seed}"
+
+
 class QuizAttempt(models.Model):
     score = models.FloatField()
-    attempted_at = models.DateTimeField(auto_now_add=True)
+    attempted_at = models.DateTimeField(default=timezone.now)
+    # server time the row was written; attempted_at is backdated to the
+    # submission time when exam submissions are scored later
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
 
     # relations (FKs)
     quiz = models.ForeignKey(
         Quiz, on_delete=models.CASCADE, related_name='attempts')
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='quiz_attempts')
+    draw = models.OneToOneField(
+        QuestionDraw, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='attempt')
+
+    class Meta:
+        indexes = [
+            # UserQuizAttemptsListView: a user's latest attempts
+            models.Index(fields=["user", "-attempted_at"], name="quiz_attempt_recent_idx"),
+            # a user's attempts at one quiz, latest first
+            models.Index(fields=["quiz", "user", "-attempted_at"], name="quiz_attempt_quiz_user_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.quiz.title} - {self.score}"
@@ -89,3 +137,156 @@ class UserAnswer(models.Model):
     def __str__(self):
         return f"{self.attempt.user.username} - {self.question.text[:30]} \
             - {self.selected_answer.text[:30]} - {'Correct' if self.is_correct else 'Incorrect'}"
+
+
+class QuizAttemptSummary(models.Model):
+    """
+    Per-(user, quiz) rollup of attempts. Kept up to date on submission so best
+    and last scores stay correct after old attempts are archived.
+    """
+    attempts_count = models.PositiveIntegerField(default=0)
+    best_score = models.FloatField()
+    last_score = models.FloatField()
+    last_attempted_at = models.DateTimeField()
+
+    # relations (FKs)
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name='attempt_summaries')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='quiz_attempt_summaries')
+
+    class Meta:
+        unique_together = ('user', 'quiz')
+
+    def __str__(self):
+        return f"{self.user} - {self.quiz} - best {self.best_score}"
+
+
+class QuestionMastery(models.Model):
+    """
+    Per-(user, question) answer record with a Leitner-style spaced-repetition
+    schedule, maintained by quizzes.mastery on every scored submission.
+    `box` counts consecutive correct answers (capped); it sets the review
+    interval, and a wrong answer sends the question back to box 0.
+    """
+    times_seen = models.PositiveIntegerField(default=0)
+    times_correct = models.PositiveIntegerField(default=0)
+    box = models.PositiveSmallIntegerField(default=0)
+    last_seen_at = models.DateTimeField()
+    due_at = models.DateTimeField()
+
+    # relations (FKs)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='question_mastery')
+    question = models.ForeignKey(
+        Question, on_delete=models.CASCADE, related_name='mastery')
+
+    class Meta:
+        unique_together = ('user', 'question')
+        indexes = [
+            # ReviewQueueView: a user's questions, most overdue first
+            models.Index(fields=["user", "due_at"], name="question_mastery_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.question}: {self.times_correct}/{self.times_seen}"
+
+
+class ArchivedQuizAttempt(models.Model):
+    """
+    Cold copy of a QuizAttempt moved out of the hot tables by the archiver.
+    Keeps the original attempt id; answers are stored inline as JSON.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    score = models.FloatField()
+    attempted_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    user_answers = models.JSONField(default=list)
+
+    # relations (FKs)
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name='archived_attempts')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_quiz_attempts')
+
+    def __str__(self):
+        return f"{self.user} - {self.quiz} - {self.score} (archived)"
+
+
+class QuizSubmission(models.Model):
+    """
+    Exam-mode submission waiting to be scored by
+    `manage.py process_quiz_submissions`.
+    """
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    answers = models.JSONField()
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.TextField(blank=True)
+    submitted_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    # relations (FKs)
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name='submissions')
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='quiz_submissions')
+    attempt = models.OneToOneField(
+        QuizAttempt, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='submission')
+    # set when the archiver moves `attempt` to the archive table
+    archived_attempt = models.OneToOneField(
+        ArchivedQuizAttempt, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='submission')
+    draw = models.ForeignKey(
+        QuestionDraw, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='submissions')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="quiz_submission_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.quiz} - {self.status}"
+
+
+class QuizRescore(models.Model):
+    """
+    Re-score of a quiz's attempts requested from the admin, run by
+    `manage.py rescore_quiz --queued`.
+    """
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    STATUS_CHOICES = [
+        (PENDING, "Pending"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+    ]
+
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts_rescored = models.PositiveIntegerField(default=0)
+    requested_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    # relations (FKs)
+    quiz = models.ForeignKey(
+        Quiz, on_delete=models.CASCADE, related_name='rescores')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "id"], name="quiz_rescore_queue_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.quiz} - {self.status}"
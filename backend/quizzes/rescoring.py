@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .mastery import rebuild_mastery
+from .models import Answer, Question, QuizAttempt, QuizRescore, UserAnswer
+from .summaries import rebuild_summaries
+
+
+def _rescore_range(quiz_id, question_ids, after_id, upto_id):
+    """
+    Re-score attempts of `quiz_id` with after_id < id <= upto_id using two
+    UPDATE statements. Returns the ids of users whose attempts were touched.
+    """
+    with transaction.atomic():
+        UserAnswer.objects.filter(
+            attempt_id__gt=after_id,
+            attempt_id__lte=upto_id,
+            question_id__in=question_ids,
+        ).update(
+            is_correct=Subquery(
+                Answer.objects.filter(pk=OuterRef("selected_answer_id"))
+                .values("is_correct")[:1]
+            )
+        )
+
+        points = (
+            UserAnswer.objects
+            .filter(attempt_id=OuterRef("pk"), is_correct=True)
+            .values("attempt_id")
+            .annotate(total=Sum("question__points"))
+            .values("total")
+        )
+        attempts = QuizAttempt.objects.filter(
+            quiz_id=quiz_id, id__gt=after_id, id__lte=upto_id)
+        attempts.update(
+            score=Coalesce(Subquery(points), Value(0),
+                           output_field=FloatField()))
+
+        user_ids = set(attempts.values_list("user_id", flat=True).distinct())
+        rebuild_summaries((user_id, quiz_id) for user_id in user_ids)
+    return user_ids
+
+
+def rescore_quiz(quiz_id, batch_size=None, progress=None):
+    """
+    Recompute UserAnswer.is_correct and QuizAttempt.score for every live
+    attempt of a quiz from the current answer key and question points.
+
+    Attempts are processed in id-ordered batches of `batch_size`, each in its
+    own transaction; `progress(done, total)` is called after every batch.
+    Summaries are rebuilt per batch, which sends best_score_changed for the
+    leaderboards; the users' question mastery is replayed at the end.
+    Archived attempts keep the score they were archived with.
+    Returns the number of attempts re-scored.
+    """
+    batch_size = batch_size or settings.QUIZ_RESCORE_BATCH_SIZE
+    question_ids = list(
+        Question.objects.filter(quiz_id=quiz_id).values_list("id", flat=True))
+    attempts = QuizAttempt.objects.filter(quiz_id=quiz_id).order_by("id")
+    total = attempts.count()
+
+    done = 0
+    last_id = 0
+    user_ids = set()
+    while done < total:
+        # keyset pagination: id of the last attempt in the next batch
+        batch_ids = list(
+            attempts.filter(id__gt=last_id)
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not batch_ids:
+            break
+        user_ids |= _rescore_range(quiz_id, question_ids, last_id, batch_ids[-1])
+        last_id = batch_ids[-1]
+        done += len(batch_ids)
+        if progress:
+            progress(done, total)
+
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), batch_size):
+        rebuild_mastery(user_ids[start:start + batch_size], question_ids)
+    return done
+
+
+def enqueue_rescores(quiz_ids):
+    """
+    Queue a re-score of each quiz that has none pending yet. Returns the
+    number of re-scores queued.
+    """
+    pending = set(QuizRescore.objects.filter(
+        quiz_id__in=quiz_ids, status=QuizRescore.PENDING).values_list("quiz_id", flat=True))
+    queued = QuizRescore.objects.bulk_create([
+        QuizRescore(quiz_id=quiz_id) for quiz_id in set(quiz_ids) - pending])
+    return len(queued)
+
+
+def process_rescores(batch_size=None, progress=None):
+    """
+    Run the queued re-scores, oldest first. A request is claimed with a
+    conditional UPDATE, so concurrent workers never run the same one.
+    Returns the number of requests processed.
+    """
+    processed = 0
+    for rescore in QuizRescore.objects.filter(status=QuizRescore.PENDING).order_by("id"):
+        claimed = QuizRescore.objects.filter(
+            pk=rescore.pk, status=QuizRescore.PENDING).update(status=QuizRescore.RUNNING)
+        if not claimed:
+            continue
+        rescore.attempts_rescored = rescore_quiz(
+            rescore.quiz_id, batch_size=batch_size,
+            progress=progress and (lambda done, total: progress(rescore.quiz_id, done, total)))
+        rescore.status = QuizRescore.DONE
+        rescore.processed_at = timezone.now()
+        rescore.save(update_fields=["status", "attempts_rescored", "processed_at"])
+        processed += 1
+    return processed
@@ -0,0 +1,105 @@
+import random
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.exceptions import NotFound, ValidationError
+
+from .models import Question, QuestionDraw
+
+
+@lru_cache(maxsize=256)
+def _question_index(quiz_id, content_version):
+    """
+    {"ids": [...], "strata": {points: [...]}} for a quiz. Memoized per process
+    and shared through the cache; both are keyed by the content version, so
+    edits to the quiz produce a new index.
+    """
+    key = f"quiz-question-index:{quiz_id}:{content_version}"
+    index = cache.get(key)
+    if index is None:
+        index = {"ids": [], "strata": {}}
+        rows = Question.objects.filter(quiz_id=quiz_id) \
+            .order_by("id").values_list("id", "points")
+        for question_id, points in rows:
+            index["ids"].append(question_id)
+            index["strata"].setdefault(points, []).append(question_id)
+        cache.set(key, index, timeout=settings.QUIZ_DELIVERY_CACHE_TIMEOUT)
+    return index
+
+
+def question_index(quiz):
+    return _question_index(quiz.id, str(quiz.content_version))
+
+
+def _allocate(strata, size):
+    """
+    Split `size` across strata proportionally to their size (largest
+    remainder), never asking a stratum for more than it has.
+    """
+    total = sum(len(ids) for ids in strata.values())
+    shares = {points: size * len(ids) / total for points, ids in strata.items()}
+    counts = {points: int(share) for points, share in shares.items()}
+    leftover = size - sum(counts.values())
+    by_remainder = sorted(
+        strata, key=lambda points: (counts[points] - shares[points], points))
+    for points in by_remainder[:leftover]:
+        counts[points] += 1
+    return counts
+
+
+def draw_questions(quiz, seed):
+    """
+    Question ids served for one attempt: `quiz.sample_size` ids drawn with a
+    RNG seeded by `seed`, or every question when the quiz is not sampled.
+    Runs in O(sample size) once the index is memoized.
+    """
+    index = question_index(quiz)
+    size = quiz.sample_size
+    if not size or size >= len(index["ids"]):
+        return list(index["ids"])
+
+    rng = random.Random(seed)
+    if not quiz.stratify_by_points:
+        return rng.sample(index["ids"], size)
+
+    strata = index["strata"]
+    drawn = []
+    for points, count in sorted(_allocate(strata, size).items()):
+        drawn.extend(rng.sample(strata[points], count))
+    rng.shuffle(drawn)
+    return drawn
+
+
+def start_draw(user, quiz):
+    seed = random.SystemRandom().getrandbits(62)
+    return QuestionDraw.objects.create(
+        user=user,
+        quiz=quiz,
+        seed=seed,
+        question_ids=draw_questions(quiz, seed),
+    )
+
+
+def validate_draw(user, quiz, draw_id, answers_data):
+    """
+    Return the unused draw a submission refers to, checking the submitted
+    questions were all served in it. Returns None for quizzes that are not
+    sampled and submitted without a draw.
+    """
+    if draw_id is None:
+        if quiz.sample_size:
+            raise ValidationError({"draw_id": "This quiz must be started first."})
+        return None
+
+    draw = QuestionDraw.objects.filter(
+        id=draw_id, user=user, quiz=quiz, attempt__isnull=True).first()
+    if draw is None:
+        raise NotFound("Quiz draw not found or already submitted.")
+
+    served = set(draw.question_ids)
+    extra = {ans["question_id"] for ans in answers_data} - served
+    if extra:
+        raise ValidationError(
+            {"answers": f"Questions {sorted(extra)} were not part of this attempt."})
+    return draw
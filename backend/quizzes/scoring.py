@@ -0,0 +1,52 @@
+from rest_framework.exceptions import NotFound
+
+from .models import Answer
+
+
+def load_answer_keys(quiz_ids):
+    """
+    Answer keys for the given quizzes in a single query:
+    {quiz_id: {question_id: (points, {answer_id: is_correct})}}
+    """
+    keys = {quiz_id: {} for quiz_id in quiz_ids}
+    rows = (
+        Answer.objects
+        .filter(question__quiz_id__in=quiz_ids)
+        .values_list("id", "is_correct", "question_id",
+                     "question__points", "question__quiz_id")
+    )
+    for answer_id, is_correct, question_id, points, quiz_id in rows:
+        _, answers = keys[quiz_id].setdefault(question_id, (points, {}))
+        answers[answer_id] = is_correct
+    return keys
+
+
+def score_answers(answer_key, answers_data):
+    """
+    Score submitted answers against a quiz's answer key.
+    Returns (score, [{"question_id", "selected_answer_id", "is_correct"}]).
+    Raises NotFound for questions or answers that are not part of the quiz.
+    """
+    score = 0
+    user_answers = []
+    for ans in answers_data:
+        question_id = ans["question_id"]
+        selected_answer_id = ans["selected_answer_id"]
+
+        if question_id not in answer_key:
+            raise NotFound(f"Question {question_id} does not belong to this quiz.")
+        points, answers = answer_key[question_id]
+        if selected_answer_id not in answers:
+            raise NotFound(
+                f"Answer {selected_answer_id} does not belong to question {question_id}.")
+
+        is_correct = answers[selected_answer_id]
+        if is_correct:
+            score += points
+
+        user_answers.append({
+            "question_id": question_id,
+            "selected_answer_id": selected_answer_id,
+            "is_correct": is_correct,
+        })
+    return score, user_answers
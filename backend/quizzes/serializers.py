@@ -6,7 +6,10 @@ from .models import (
     Question,
     Answer,
     UserAnswer,
-    QuizAttempt
+    QuizAttempt,
+    QuestionMastery,
+    ArchivedQuizAttempt,
+    QuizSubmission,
 )
 
 
@@ -34,6 +37,48 @@ class QuizSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'description', 'lesson', 'questions']
 
 
+class AnswerDeliverySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Answer
+        fields = ['id', 'text']
+
+
+class QuestionDeliverySerializer(serializers.ModelSerializer):
+    answers = AnswerDeliverySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Question
+        fields = ['id', 'text', 'points', 'answers']
+
+
+class QuizDeliverySerializer(serializers.ModelSerializer):
+    """
+    Student-facing quiz payload: no answer key. Built by quizzes.delivery,
+    which prefetches and caches it.
+    """
+    questions = QuestionDeliverySerializer(many=True, read_only=True)
+    lesson = serializers.StringRelatedField()
+
+    class Meta:
+        model = Quiz
+        fields = ['id', 'title', 'description', 'time_limit',
+                  'lesson', 'questions']
+
+
+class ReviewQuestionSerializer(serializers.ModelSerializer):
+    """
+    A question due for review with the user's record on it; the question is
+    delivered without its answer key.
+    """
+    question = QuestionDeliverySerializer(read_only=True)
+    quiz_id = serializers.IntegerField(source='question.quiz_id', read_only=True)
+
+    class Meta:
+        model = QuestionMastery
+        fields = ['question', 'quiz_id', 'times_seen', 'times_correct',
+                  'last_seen_at', 'due_at']
+
+
 class SubmitAnswerSerializer(serializers.Serializer):
     """
     Serializer for student submitting answers to a quiz.
@@ -46,8 +91,19 @@ class SubmitAnswerSerializer(serializers.Serializer):
 class SubmitQuizSerializer(serializers.Serializer):
     """
     Serializer for quiz submission with multiple answers.
+    `draw_id` is required for quizzes that sample their questions.
     """
     answers = SubmitAnswerSerializer(many=True)
+    draw_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class QuizDrawSerializer(serializers.Serializer):
+    """
+    Response of starting a quiz: the draw to submit against and the questions
+    that were drawn for it.
+    """
+    draw_id = serializers.IntegerField()
+    quiz = QuizDeliverySerializer()
 
 
 class UserAnswerSerializer(serializers.ModelSerializer):
@@ -68,6 +124,25 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         fields = ['id', 'quiz', 'score', 'attempted_at', 'user_answers']
 
 
+class ArchivedUserAnswerSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    question = serializers.CharField()
+    selected_answer = serializers.CharField()
+    is_correct = serializers.BooleanField()
+
+
+class ArchivedQuizAttemptSerializer(serializers.ModelSerializer):
+    """
+    Same shape as QuizAttemptSerializer, read from the archive table.
+    """
+    quiz = serializers.StringRelatedField()
+    user_answers = ArchivedUserAnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedQuizAttempt
+        fields = ['id', 'quiz', 'score', 'attempted_at', 'user_answers']
+
+
 class QuizResultsSerializer(serializers.ModelSerializer):
     """
     Serializer to return quiz results after submission.
@@ -79,6 +154,38 @@ class QuizResultsSerializer(serializers.ModelSerializer):
         fields = ['id', 'score', 'attempted_at', 'user_answers']
 
 
+class ArchivedQuizResultsSerializer(serializers.ModelSerializer):
+    """
+    Same shape as QuizResultsSerializer, read from the archive table.
+    """
+    user_answers = ArchivedUserAnswerSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ArchivedQuizAttempt
+        fields = ['id', 'score', 'attempted_at', 'user_answers']
+
+
+class QuizSubmissionSerializer(serializers.ModelSerializer):
+    """
+    Exam-mode submission status; `results` stays null until it is scored,
+    and is read from the archive once its attempt has been archived.
+    """
+    results = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuizSubmission
+        fields = ['id', 'quiz', 'status', 'error',
+                  'submitted_at', 'processed_at', 'results']
+
+    @swagger_serializer_method(serializer_or_field=QuizResultsSerializer(allow_null=True))
+    def get_results(self, obj):
+        if obj.attempt_id:
+            return QuizResultsSerializer(obj.attempt).data
+        if obj.archived_attempt_id:
+            return ArchivedQuizResultsSerializer(obj.archived_attempt).data
+        return None
+
+
 class UserQuizAttemptSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = QuizAttempt
@@ -87,16 +194,40 @@ class UserQuizAttemptSummarySerializer(serializers.ModelSerializer):
 
 class LessonQuizWithAttemptsSerializer(serializers.ModelSerializer):
     attempts = serializers.SerializerMethodField()
+    best_score = serializers.SerializerMethodField()
+    last_score = serializers.SerializerMethodField()
 
     class Meta:
         model = Quiz
         fields = ['id', 'title', 'description', 'time_limit',
-                  'max_score', 'min_score', 'attempts']
+                  'max_score', 'min_score', 'best_score', 'last_score',
+                  'attempts']
+
+    def _summary(self, obj):
+        # `user_summaries` is prefetched by the view, filtered to the user
+        summaries = getattr(obj, 'user_summaries', None)
+        if summaries is None:
+            summaries = list(obj.attempt_summaries.filter(
+                user=self.context['request'].user))
+        return summaries[0] if summaries else None
+
+    @swagger_serializer_method(serializer_or_field=serializers.FloatField(allow_null=True))
+    def get_best_score(self, obj):
+        summary = self._summary(obj)
+        return summary.best_score if summary else None
+
+    @swagger_serializer_method(serializer_or_field=serializers.FloatField(allow_null=True))
+    def get_last_score(self, obj):
+        summary = self._summary(obj)
+        return summary.last_score if summary else None
 
     @swagger_serializer_method(
         serializer_or_field=UserQuizAttemptSummarySerializer(many=True)
     )
     def get_attempts(self, obj):
-        user = self.context['request'].user
-        attempts = obj.attempts.filter(user=user).order_by('-attempted_at')
+        # `user_attempts` is prefetched by the view, filtered to the user
+        attempts = getattr(obj, 'user_attempts', None)
+        if attempts is None:
+            user = self.context['request'].user
+            attempts = obj.attempts.filter(user=user).order_by('-attempted_at')
         return UserQuizAttemptSummarySerializer(attempts, many=True).data
@@ -0,0 +1,32 @@
+import uuid
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal, receiver
+
+from .models import Answer, Question, Quiz
+
+
+# Sent when a user's best score on a quiz changes, with user_id, quiz_id and
+# delta (new best minus old best; the whole score for a first attempt).
+best_score_changed = Signal()
+
+# Sent for every new quiz attempt, with user_id, quiz_id and attempted_at.
+quiz_attempted = Signal()
+
+
+@receiver(pre_save, sender=Quiz)
+def quiz_content_changed(sender, instance, **kwargs):
+    instance.content_version = uuid.uuid4()
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    Quiz.objects.filter(pk=instance.quiz_id).update(content_version=uuid.uuid4())
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def answer_changed(sender, instance, **kwargs):
+    Quiz.objects.filter(questions__id=instance.question_id).update(
+        content_version=uuid.uuid4())
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import NotFound
+
+from .models import QuizAttempt, QuizSubmission, UserAnswer
+from .mastery import record_answers
+from .scoring import load_answer_keys, score_answers
+from .signals import quiz_attempted
+from .summaries import rebuild_summaries
+
+
+def enqueue_submission(user, quiz, answers_data, draw=None):
+    """
+    Accept an exam-mode submission; it is scored later by process_submissions().
+    """
+    return QuizSubmission.objects.create(
+        user=user,
+        quiz=quiz,
+        answers=[dict(ans) for ans in answers_data],
+        draw=draw,
+    )
+
+
+def process_submissions(batch_size=None):
+    """
+    Score one batch of pending submissions and write their attempts with bulk
+    inserts. Returns the number of submissions processed (0 when idle).
+
+    Rows are claimed with SELECT ... FOR UPDATE SKIP LOCKED where the database
+    supports it, so several workers can drain the queue concurrently.
+    """
+    batch_size = batch_size or settings.QUIZ_SUBMISSION_BATCH_SIZE
+
+    with transaction.atomic():
+        submissions = list(
+            QuizSubmission.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=QuizSubmission.PENDING)
+            .order_by("id")[:batch_size]
+        )
+        if not submissions:
+            return 0
+
+        answer_keys = load_answer_keys({sub.quiz_id for sub in submissions})
+        now = timezone.now()
+
+        # a draw backs at most one attempt; later duplicates fail
+        used_draws = set(QuizAttempt.objects.filter(
+            draw_id__in=[sub.draw_id for sub in submissions if sub.draw_id]
+        ).values_list("draw_id", flat=True))
+
+        scored = []
+        for sub in submissions:
+            if sub.draw_id in used_draws:
+                sub.status = QuizSubmission.FAILED
+                sub.error = "This quiz draw was already submitted."
+                sub.processed_at = now
+                continue
+            if sub.draw_id:
+                used_draws.add(sub.draw_id)
+            try:
+                score, user_answers = score_answers(
+                    answer_keys[sub.quiz_id], sub.answers)
+            except NotFound as e:
+                sub.status = QuizSubmission.FAILED
+                sub.error = str(e.detail)
+                sub.processed_at = now
+                continue
+            scored.append((sub, QuizAttempt(
+                user_id=sub.user_id,
+                quiz_id=sub.quiz_id,
+                score=score,
+                attempted_at=sub.submitted_at,
+                draw_id=sub.draw_id,
+            ), user_answers))
+
+        attempts = QuizAttempt.objects.bulk_create(
+            [attempt for _, attempt, _ in scored])
+
+        UserAnswer.objects.bulk_create([
+            UserAnswer(
+                attempt=attempt,
+                question_id=ua["question_id"],
+                selected_answer_id=ua["selected_answer_id"],
+                is_correct=ua["is_correct"],
+            )
+            for (_, _, user_answers), attempt in zip(scored, attempts)
+            for ua in user_answers
+        ])
+
+        for (sub, _, _), attempt in zip(scored, attempts):
+            sub.attempt = attempt
+            sub.status = QuizSubmission.DONE
+            sub.processed_at = now
+
+        QuizSubmission.objects.bulk_update(
+            submissions, ["status", "error", "processed_at", "attempt"])
+        rebuild_summaries(
+            (attempt.user_id, attempt.quiz_id) for attempt in attempts)
+        for attempt in attempts:
+            quiz_attempted.send(sender=QuizAttempt, user_id=attempt.user_id,
+                                quiz_id=attempt.quiz_id, attempted_at=attempt.attempted_at)
+        record_answers([
+            (attempt.user_id, ua["question_id"], ua["is_correct"], attempt.attempted_at)
+            for (_, _, user_answers), attempt in zip(scored, attempts)
+            for ua in user_answers
+        ])
+
+    return len(submissions)
@@ -0,0 +1,118 @@
+from django.db import transaction
+from django.db.models import Count, Max, OuterRef, Subquery
+
+from .models import QuizAttempt, ArchivedQuizAttempt, QuizAttemptSummary
+from .signals import best_score_changed, quiz_attempted
+
+
+def _notify_best_score(user_id, quiz_id, delta):
+    if delta:
+        best_score_changed.send(
+            sender=QuizAttemptSummary, user_id=user_id, quiz_id=quiz_id, delta=delta)
+
+
+def record_attempt(attempt):
+    """
+    Fold a newly created attempt into the user's summary for that quiz.
+    """
+    quiz_attempted.send(sender=QuizAttempt, user_id=attempt.user_id,
+                        quiz_id=attempt.quiz_id, attempted_at=attempt.attempted_at)
+    with transaction.atomic():
+        summary, created = QuizAttemptSummary.objects.select_for_update().get_or_create(
+            user_id=attempt.user_id,
+            quiz_id=attempt.quiz_id,
+            defaults={
+                "attempts_count": 1,
+                "best_score": attempt.score,
+                "last_score": attempt.score,
+                "last_attempted_at": attempt.attempted_at,
+            },
+        )
+        if created:
+            _notify_best_score(attempt.user_id, attempt.quiz_id, attempt.score)
+            return summary
+
+        old_best = summary.best_score
+        summary.attempts_count += 1
+        summary.best_score = max(summary.best_score, attempt.score)
+        if attempt.attempted_at >= summary.last_attempted_at:
+            summary.last_score = attempt.score
+            summary.last_attempted_at = attempt.attempted_at
+        summary.save(update_fields=[
+            "attempts_count", "best_score", "last_score", "last_attempted_at"])
+        _notify_best_score(
+            attempt.user_id, attempt.quiz_id, summary.best_score - old_best)
+    return summary
+
+
+def _aggregate(model, user_ids, quiz_ids):
+    latest = model.objects.filter(
+        user_id=OuterRef("user_id"), quiz_id=OuterRef("quiz_id")
+    ).order_by("-attempted_at", "-id")
+    rows = (
+        model.objects
+        .filter(user_id__in=user_ids, quiz_id__in=quiz_ids)
+        .values("user_id", "quiz_id")
+        .annotate(
+            attempts_count=Count("id"),
+            best_score=Max("score"),
+            last_attempted_at=Max("attempted_at"),
+            last_score=Subquery(latest.values("score")[:1]),
+        )
+        .order_by()
+    )
+    return {(row["user_id"], row["quiz_id"]): row for row in rows}
+
+
+def rebuild_summaries(pairs):
+    """
+    Recompute summaries for the given (user_id, quiz_id) pairs from both the
+    live and the archived attempt tables. Returns the number of rows written.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    user_ids = {user_id for user_id, _ in pairs}
+    quiz_ids = {quiz_id for _, quiz_id in pairs}
+    live = _aggregate(QuizAttempt, user_ids, quiz_ids)
+    archived = _aggregate(ArchivedQuizAttempt, user_ids, quiz_ids)
+    old_best = {
+        (row["user_id"], row["quiz_id"]): row["best_score"]
+        for row in QuizAttemptSummary.objects
+        .filter(user_id__in=user_ids, quiz_id__in=quiz_ids)
+        .values("user_id", "quiz_id", "best_score")
+    }
+
+    summaries = []
+    for pair in pairs:
+        rows = [row for row in (live.get(pair), archived.get(pair)) if row]
+        if not rows:
+            continue
+        last = max(rows, key=lambda row: row["last_attempted_at"])
+        summaries.append(QuizAttemptSummary(
+            user_id=pair[0],
+            quiz_id=pair[1],
+            attempts_count=sum(row["attempts_count"] for row in rows),
+            best_score=max(row["best_score"] for row in rows),
+            last_score=last["last_score"],
+            last_attempted_at=last["last_attempted_at"],
+        ))
+
+    with transaction.atomic():
+        stale = [pair for pair in pairs if pair not in live and pair not in archived]
+        for user_id, quiz_id in stale:
+            QuizAttemptSummary.objects.filter(user_id=user_id, quiz_id=quiz_id).delete()
+        QuizAttemptSummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=["user", "quiz"],
+            update_fields=["attempts_count", "best_score",
+                           "last_score", "last_attempted_at"],
+        )
+        for summary in summaries:
+            pair = (summary.user_id, summary.quiz_id)
+            _notify_best_score(*pair, summary.best_score - old_best.get(pair, 0))
+        for pair in stale:
+            _notify_best_score(*pair, -old_best.get(pair, 0))
+    return len(summaries)
@@ -1,11 +1,37 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.http import Http404
 from django.test import TestCase
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
+from core.testing import QueryPlanTestMixin, create_course, create_student
 from learning.models import Lesson, Unit, Course, Grade
-from .models import Quiz, Question, Answer, QuizAttempt
+from progress.models import LeaderboardEntry
+from .models import (
+    Quiz,
+    Question,
+    Answer,
+    QuizAttempt,
+    UserAnswer,
+    ArchivedQuizAttempt,
+    QuizAttemptSummary,
+    QuizSubmission,
+    QuestionDraw,
+    QuestionMastery,
+    QuizRescore,
+)
+from .admin import rescore_attempts
+from .submissions import process_submissions
+from .archive import archive_attempts
+from .rescoring import process_rescores, rescore_quiz
+from .sampling import draw_questions
+from .delivery import get_delivery_payload
 
 
 User = get_user_model()
@@ -198,3 +224,457 @@ class QuizViewsTests(APITestCase):
         self.assertEqual(len(response.data), 1)
         self.assertIn("attempts", response.data[0])
         self.assertEqual(response.data[0]["attempts"], [])
+
+
+class QuizArchiveTests(APITestCase):
+    def setUp(self):
+        self.user = create_student()
+        self.client.force_authenticate(user=self.user)
+
+        _, (self.lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Quiz 1", time_limit=30, max_score=10, min_score=5,
+            lesson=self.lesson
+        )
+        self.question = Question.objects.create(text="Q1", points=10, quiz=self.quiz)
+        self.correct = Answer.objects.create(
+            text="A1", question=self.question, is_correct=True)
+        self.wrong = Answer.objects.create(
+            text="A2", question=self.question, is_correct=False)
+
+    def submit(self, answer):
+        url = reverse('submit-quiz', kwargs={'quiz_id': self.quiz.id})
+        payload = {"answers": [
+            {"question_id": self.question.id, "selected_answer_id": answer.id}]}
+        return self.client.post(url, payload, format='json')
+
+    def age_attempt(self, attempt_id, days):
+        QuizAttempt.objects.filter(id=attempt_id).update(
+            attempted_at=timezone.now() - timedelta(days=days))
+
+    def test_submit_updates_summary(self):
+        self.submit(self.correct)
+        self.submit(self.wrong)
+        summary = QuizAttemptSummary.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(summary.attempts_count, 2)
+        self.assertEqual(summary.best_score, 10)
+        self.assertEqual(summary.last_score, 0)
+
+    def test_archive_moves_old_attempts_in_batches(self):
+        old_best = self.submit(self.correct).data["id"]
+        old_other = self.submit(self.wrong).data["id"]
+        recent = self.submit(self.wrong).data["id"]
+        self.age_attempt(old_best, 400)
+        self.age_attempt(old_other, 399)
+
+        archived = archive_attempts(days=365, batch_size=1)
+
+        self.assertEqual(archived, 2)
+        self.assertEqual(list(QuizAttempt.objects.values_list("id", flat=True)), [recent])
+        self.assertEqual(UserAnswer.objects.count(), 1)
+        self.assertEqual(ArchivedQuizAttempt.objects.count(), 2)
+
+        # Best score came from an archived attempt and must survive
+        summary = QuizAttemptSummary.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(summary.attempts_count, 3)
+        self.assertEqual(summary.best_score, 10)
+        self.assertEqual(summary.last_score, 0)
+
+        url = reverse('lesson-quizzes-attempts-list',
+                      kwargs={'lesson_id': self.lesson.id})
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]["best_score"], 10)
+        self.assertEqual(len(response.data[0]["attempts"]), 1)
+
+    def test_archived_attempt_detail(self):
+        attempt_id = self.submit(self.correct).data["id"]
+        self.age_attempt(attempt_id, 400)
+        archive_attempts(days=365)
+
+        url = reverse('attempt-details', kwargs={'attempt_id': attempt_id})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["id"], attempt_id)
+        self.assertEqual(response.data["score"], 10)
+        self.assertEqual(response.data["quiz"], str(self.quiz))
+        self.assertEqual(len(response.data["user_answers"]), 1)
+        self.assertEqual(response.data["user_answers"][0]["question"], "Q1")
+        self.assertTrue(response.data["user_answers"][0]["is_correct"])
+
+
+class QuizRescoreTests(TestCase):
+    def setUp(self):
+        self.user = create_student()
+        _, (lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Quiz 1", time_limit=30, max_score=15, min_score=5, lesson=lesson)
+
+        self.q1 = Question.objects.create(text="Q1", points=10, quiz=self.quiz)
+        self.q1_right = Answer.objects.create(text="A1", question=self.q1, is_correct=True)
+        self.q1_wrong = Answer.objects.create(text="A2", question=self.q1, is_correct=False)
+        self.q2 = Question.objects.create(text="Q2", points=5, quiz=self.quiz)
+        self.q2_right = Answer.objects.create(text="A3", question=self.q2, is_correct=True)
+
+    def make_attempt(self, q1_answer):
+        correct = q1_answer.is_correct
+        attempt = QuizAttempt.objects.create(
+            user=self.user, quiz=self.quiz, score=(10 if correct else 0) + 5)
+        UserAnswer.objects.create(attempt=attempt, question=self.q1,
+                                  selected_answer=q1_answer, is_correct=correct)
+        UserAnswer.objects.create(attempt=attempt, question=self.q2,
+                                  selected_answer=self.q2_right, is_correct=True)
+        return attempt
+
+    def test_rescore_after_answer_key_and_points_change(self):
+        right = self.make_attempt(self.q1_right)
+        wrong = self.make_attempt(self.q1_wrong)
+
+        # The key was wrong: A2 is the right answer, and Q2 is worth more
+        Answer.objects.filter(pk=self.q1_right.pk).update(is_correct=False)
+        Answer.objects.filter(pk=self.q1_wrong.pk).update(is_correct=True)
+        Question.objects.filter(pk=self.q2.pk).update(points=8)
+
+        reported = []
+        total = rescore_quiz(self.quiz.id, batch_size=1,
+                             progress=lambda done, total: reported.append((done, total)))
+
+        self.assertEqual(total, 2)
+        self.assertEqual(reported, [(1, 2), (2, 2)])
+        right.refresh_from_db()
+        wrong.refresh_from_db()
+        self.assertEqual(right.score, 8)
+        self.assertEqual(wrong.score, 18)
+        self.assertFalse(right.user_answers.get(question=self.q1).is_correct)
+        self.assertTrue(wrong.user_answers.get(question=self.q1).is_correct)
+
+        summary = QuizAttemptSummary.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(summary.best_score, 18)
+        self.assertEqual(summary.attempts_count, 2)
+
+    def test_admin_action_queues_and_refreshes_aggregates(self):
+        self.make_attempt(self.q1_right)
+        self.make_attempt(self.q1_wrong)
+        Answer.objects.filter(pk=self.q1_right.pk).update(is_correct=False)
+        Answer.objects.filter(pk=self.q1_wrong.pk).update(is_correct=True)
+
+        modeladmin = mock.Mock()
+        rescore_attempts(modeladmin, None, Quiz.objects.filter(pk=self.quiz.pk))
+        rescore_attempts(modeladmin, None, Question.objects.filter(quiz=self.quiz))
+        # queued once, nothing re-scored inside the request
+        self.assertEqual(QuizRescore.objects.get().status, QuizRescore.PENDING)
+        self.assertFalse(QuizAttemptSummary.objects.exists())
+
+        self.assertEqual(process_rescores(), 1)
+        rescore = QuizRescore.objects.get()
+        self.assertEqual((rescore.status, rescore.attempts_rescored), (QuizRescore.DONE, 2))
+        self.assertEqual(process_rescores(), 0)
+
+        mastery = QuestionMastery.objects.get(user=self.user, question=self.q1)
+        self.assertEqual((mastery.times_seen, mastery.times_correct), (2, 1))
+        entry = LeaderboardEntry.objects.get(
+            user=self.user, scope=LeaderboardEntry.COURSE, window=LeaderboardEntry.ALL_TIME)
+        self.assertEqual(entry.quiz_points, 15)
+
+
+class ExamModeTests(APITestCase):
+    def setUp(self):
+        self.user = create_student()
+        self.client.force_authenticate(user=self.user)
+        _, (lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Exam", time_limit=30, max_score=10, min_score=5,
+            lesson=lesson, exam_mode=True)
+        self.question = Question.objects.create(text="Q1", points=10, quiz=self.quiz)
+        self.correct = Answer.objects.create(
+            text="A1", question=self.question, is_correct=True)
+
+    def submit(self, answer_id):
+        url = reverse('submit-quiz', kwargs={'quiz_id': self.quiz.id})
+        payload = {"answers": [
+            {"question_id": self.question.id, "selected_answer_id": answer_id}]}
+        return self.client.post(url, payload, format='json')
+
+    def test_submission_is_queued_then_scored(self):
+        response = self.submit(self.correct.id)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data["status"], QuizSubmission.PENDING)
+        self.assertIsNone(response.data["results"])
+        self.assertEqual(QuizAttempt.objects.count(), 0)
+
+        self.assertEqual(process_submissions(), 1)
+        self.assertEqual(process_submissions(), 0)
+
+        url = reverse('submission-details',
+                      kwargs={'submission_id': response.data["id"]})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["status"], QuizSubmission.DONE)
+        self.assertEqual(response.data["results"]["score"], 10)
+        self.assertEqual(len(response.data["results"]["user_answers"]), 1)
+
+        summary = QuizAttemptSummary.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual(summary.best_score, 10)
+        mastery = QuestionMastery.objects.get(user=self.user, question=self.question)
+        self.assertEqual((mastery.times_seen, mastery.times_correct, mastery.box), (1, 1, 1))
+
+    def test_results_survive_archiving(self):
+        submission_id = self.submit(self.correct.id).data["id"]
+        process_submissions()
+        attempt_id = QuizSubmission.objects.get(id=submission_id).attempt_id
+        QuizAttempt.objects.update(attempted_at=timezone.now() - timedelta(days=400))
+        self.assertEqual(archive_attempts(days=365), 1)
+
+        submission = QuizSubmission.objects.get(id=submission_id)
+        self.assertIsNone(submission.attempt_id)
+        self.assertEqual(submission.archived_attempt_id, attempt_id)
+        url = reverse('submission-details', kwargs={'submission_id': submission_id})
+        results = self.client.get(url).data["results"]
+        self.assertEqual((results["id"], results["score"]), (attempt_id, 10))
+        self.assertTrue(results["user_answers"][0]["is_correct"])
+
+    def test_invalid_submission_fails_without_blocking_batch(self):
+        bad = self.submit(self.correct.id + 100).data["id"]
+        good = self.submit(self.correct.id).data["id"]
+
+        self.assertEqual(process_submissions(), 2)
+
+        bad = QuizSubmission.objects.get(id=bad)
+        self.assertEqual(bad.status, QuizSubmission.FAILED)
+        self.assertIsNone(bad.attempt)
+        self.assertTrue(bad.error)
+        self.assertEqual(QuizSubmission.objects.get(id=good).attempt.score, 10)
+
+
+class QuizDeliveryTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_student()
+        self.client.force_authenticate(user=self.user)
+        _, (self.lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Quiz 1", time_limit=30, max_score=10, min_score=5, lesson=self.lesson)
+        for i in range(5):
+            question = Question.objects.create(text=f"Q{i}", points=2, quiz=self.quiz)
+            Answer.objects.create(text="right", question=question, is_correct=True)
+            Answer.objects.create(text="wrong", question=question)
+        self.url = reverse('quiz-details', kwargs={'quiz_id': self.quiz.id})
+
+    def test_payload_built_in_fixed_queries_then_cached(self):
+        # quiz version, quiz + lesson chain, questions, answers
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data["questions"]), 5)
+        answer = response.data["questions"][0]["answers"][0]
+        self.assertNotIn("is_correct", answer)
+
+        with self.assertNumQueries(1):
+            cached = self.client.get(self.url)
+        self.assertEqual(cached.data, response.data)
+
+    def test_quiz_deleted_while_loading_is_a_404(self):
+        quiz = Quiz.objects.only("id", "content_version").get(pk=self.quiz.pk)
+        Quiz.objects.filter(pk=quiz.pk).delete()
+        with self.assertRaises(Http404):
+            get_delivery_payload(quiz)
+
+    def test_payload_invalidated_on_content_change(self):
+        self.client.get(self.url)
+
+        answer = Answer.objects.filter(question__quiz=self.quiz).first()
+        answer.text = "changed"
+        answer.save()
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["questions"][0]["answers"][0]["text"], "changed")
+
+        Question.objects.filter(quiz=self.quiz).last().delete()
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.data["questions"]), 4)
+
+        self.quiz.title = "Renamed"
+        self.quiz.save()
+        url = reverse('lesson-quizzes', kwargs={'lesson_id': self.lesson.id})
+        response = self.client.get(url)
+        self.assertEqual(response.data[0]["title"], "Renamed")
+
+
+class QuestionSamplingTests(APITestCase):
+    def setUp(self):
+        self.user = create_student()
+        self.client.force_authenticate(user=self.user)
+        _, (lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Bank", time_limit=30, max_score=10, min_score=5,
+            lesson=lesson, sample_size=4)
+        self.correct = {}
+        for i in range(12):
+            question = Question.objects.create(
+                text=f"Q{i}", points=1 if i < 9 else 5, quiz=self.quiz)
+            self.correct[question.id] = Answer.objects.create(
+                text="right", question=question, is_correct=True).id
+
+    def test_draw_is_seeded_and_stratified(self):
+        self.assertEqual(draw_questions(self.quiz, 42), draw_questions(self.quiz, 42))
+
+        self.quiz.stratify_by_points = True
+        drawn = draw_questions(self.quiz, 7)
+        self.assertEqual(len(drawn), 4)
+        points = sorted(Question.objects.filter(id__in=drawn).values_list("points", flat=True))
+        self.assertEqual(points, [1, 1, 1, 5])
+
+    def test_start_and_submit_drawn_questions(self):
+        response = self.client.post(reverse('start-quiz', kwargs={'quiz_id': self.quiz.id}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        drawn = [question["id"] for question in response.data["quiz"]["questions"]]
+        self.assertEqual(len(drawn), 4)
+
+        url = reverse('submit-quiz', kwargs={'quiz_id': self.quiz.id})
+        answers = [{"question_id": q, "selected_answer_id": self.correct[q]} for q in drawn]
+
+        # a question outside the draw is rejected
+        other = next(q for q in self.correct if q not in drawn)
+        bad = answers + [{"question_id": other, "selected_answer_id": self.correct[other]}]
+        response = self.client.post(
+            url, {"answers": bad, "draw_id": response.data["draw_id"]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # missing draw is rejected for sampled quizzes
+        response = self.client.post(url, {"answers": answers}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        draw_id = QuestionDraw.objects.get().id
+        response = self.client.post(
+            url, {"answers": answers, "draw_id": draw_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(QuizAttempt.objects.get().draw_id, draw_id)
+
+        # a draw can only be submitted once
+        response = self.client.post(
+            url, {"answers": answers, "draw_id": draw_id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_concurrent_submit_of_a_draw_conflicts(self):
+        response = self.client.post(reverse('start-quiz', kwargs={'quiz_id': self.quiz.id}))
+        draw = QuestionDraw.objects.get(id=response.data["draw_id"])
+        url = reverse('submit-quiz', kwargs={'quiz_id': self.quiz.id})
+        answers = [{"question_id": q, "selected_answer_id": self.correct[q]}
+                   for q in draw.question_ids]
+        self.client.post(url, {"answers": answers, "draw_id": draw.id}, format='json')
+
+        # the second request validated the draw before the first one committed
+        with mock.patch("quizzes.views.validate_draw", return_value=draw):
+            response = self.client.post(
+                url, {"answers": answers, "draw_id": draw.id}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(QuizAttempt.objects.count(), 1)
+
+
+class QuestionMasteryTests(APITestCase):
+    def setUp(self):
+        self.user = create_student()
+        self.client.force_authenticate(user=self.user)
+        _, (lesson,) = create_course()
+        self.quiz = Quiz.objects.create(
+            title="Quiz", time_limit=30, max_score=20, min_score=5, lesson=lesson)
+        self.questions = []
+        for number in (1, 2):
+            question = Question.objects.create(text=f"Q{number}", points=10, quiz=self.quiz)
+            question.right = Answer.objects.create(text="Right", question=question, is_correct=True)
+            question.wrong = Answer.objects.create(text="Wrong", question=question)
+            self.questions.append(question)
+
+    def submit(self, *correct):
+        url = reverse('submit-quiz', kwargs={'quiz_id': self.quiz.id})
+        payload = {"answers": [
+            {"question_id": question.id,
+             "selected_answer_id": (question.right if is_correct else question.wrong).id}
+            for question, is_correct in zip(self.questions, correct)
+        ]}
+        self.assertEqual(self.client.post(url, payload, format='json').status_code,
+                         status.HTTP_200_OK)
+
+    def mastery(self):
+        return {
+            row.question_id: (row.times_seen, row.times_correct, row.box)
+            for row in QuestionMastery.objects.filter(user=self.user)
+        }
+
+    def test_submissions_update_mastery(self):
+        q1, q2 = self.questions
+        self.submit(True, False)
+        self.assertEqual(self.mastery(), {q1.id: (1, 1, 1), q2.id: (1, 0, 0)})
+        row = QuestionMastery.objects.get(question=q1)
+        self.assertEqual(row.due_at - row.last_seen_at, timedelta(days=1))
+
+        self.submit(True, True)
+        self.submit(True, False)
+        # a miss sends a question back to the first box
+        self.assertEqual(self.mastery(), {q1.id: (3, 3, 3), q2.id: (3, 1, 0)})
+
+    def test_review_queue_returns_due_questions(self):
+        self.submit(True, False)
+        response = self.client.get(reverse('question-review'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["question"]["id"] for item in response.data],
+                         [self.questions[1].id])
+        self.assertEqual(response.data[0]["quiz_id"], self.quiz.id)
+        # the answer key is not delivered
+        self.assertNotIn("is_correct", response.data[0]["question"]["answers"][0])
+
+        QuestionMastery.objects.update(due_at=timezone.now() - timedelta(minutes=1))
+        response = self.client.get(reverse('question-review'), {"limit": 1})
+        self.assertEqual(len(response.data), 1)
+
+
+class QuizQueryPlanTests(QueryPlanTestMixin, APITestCase):
+    """Hot quiz endpoints must not fall back to full scans on seeded data."""
+
+    def setUp(self):
+        cache.clear()
+        _, (self.lesson,) = create_course()
+        quizzes = [
+            Quiz.objects.create(title=f"Quiz {i}", time_limit=10, max_score=10,
+                                min_score=5, lesson=self.lesson)
+            for i in range(3)
+        ]
+        for quiz in quizzes:
+            question = Question.objects.create(quiz=quiz, text="Q", points=10)
+            Answer.objects.create(question=question, text="A", is_correct=True)
+
+        users = [create_student(f"user{i}") for i in range(4)]
+        now = timezone.now()
+        QuizAttempt.objects.bulk_create([
+            QuizAttempt(user=user, quiz=quiz, score=i, attempted_at=now - timedelta(days=i))
+            for user in users for quiz in quizzes for i in range(3)
+        ])
+        questions = list(Question.objects.all())
+        QuestionMastery.objects.bulk_create([
+            QuestionMastery(user=user, question=question, times_seen=1, last_seen_at=now,
+                            due_at=now - timedelta(hours=i))
+            for user in users for i, question in enumerate(questions)
+        ])
+        self.user = users[0]
+        self.attempt = QuizAttempt.objects.filter(user=self.user).first()
+        self.client.force_authenticate(user=self.user)
+
+    def test_hot_endpoints_use_indexes(self):
+        urls = [
+            reverse("quiz-details", args=[self.attempt.quiz_id]),
+            reverse("lesson-quizzes", args=[self.lesson.id]),
+            reverse("attempt-details", args=[self.attempt.id]),
+            reverse("lesson-quizzes-attempts-list", args=[self.lesson.id]),
+        ]
+        for url in urls:
+            with self.subTest(url=url), self.assertNoFullScans():
+                self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+    def test_review_queue_reads_due_index_in_order(self):
+        with self.assertNoFullScans(allow_sorts=False):
+            response = self.client.get(reverse("question-review"))
+        self.assertEqual(len(response.data), 3)
+
+        # a user's latest attempts, overall and per quiz, come in index order
+        with self.assertNoFullScans(allow_sorts=False):
+            self.client.get(reverse("attempts-list"))
+        with self.assertNoFullScans(allow_sorts=False):
+            list(QuizAttempt.objects.filter(quiz_id=self.attempt.quiz_id, user=self.user)
+                 .order_by("-attempted_at"))
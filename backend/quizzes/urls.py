@@ -3,10 +3,13 @@ from .views import (
     QuizListView,
     QuizDetailView,
     LessonQuizzesView,
+    StartQuizView,
     SubmitQuiz,
+    QuizSubmissionDetailView,
     UserQuizAttemptsListView,
     UserQuizAttemptDetailView,
     LessonQuizzesAttemptsView,
+    ReviewQueueView,
 )
 
 
@@ -14,7 +17,11 @@ urlpatterns = [
     path('', QuizListView.as_view(), name='quiz-list'),
     path('<int:quiz_id>/', QuizDetailView.as_view(), name='quiz-details'),
     path('lessons/<int:lesson_id>/', LessonQuizzesView.as_view(), name='lesson-quizzes'),
+    path('<int:quiz_id>/start/', StartQuizView.as_view(), name='start-quiz'),
     path('submit/<int:quiz_id>/', SubmitQuiz.as_view(), name='submit-quiz'),
+    path('submissions/<int:submission_id>/',
+         QuizSubmissionDetailView.as_view(), name='submission-details'),
+    path('review/', ReviewQueueView.as_view(), name='question-review'),
     path('attempts/', UserQuizAttemptsListView.as_view(), name='attempts-list'),
     path('attempts/<int:attempt_id>/',
          UserQuizAttemptDetailView.as_view(), name='attempt-details'),
@@ -5,16 +5,38 @@ from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from django.db import IntegrityError, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
 
 from learning.models import Lesson
-from .models import Quiz, Question, Answer, QuizAttempt, UserAnswer
+from .models import (
+    Quiz,
+    QuizAttempt,
+    UserAnswer,
+    ArchivedQuizAttempt,
+    QuizAttemptSummary,
+    QuizSubmission,
+    QuestionMastery,
+)
 from .serializers import (
     QuizSerializer,
     SubmitQuizSerializer,
     QuizResultsSerializer,
     QuizAttemptSerializer,
+    ArchivedQuizAttemptSerializer,
     LessonQuizWithAttemptsSerializer,
+    QuizSubmissionSerializer,
+    QuizDeliverySerializer,
+    QuizDrawSerializer,
+    ReviewQuestionSerializer,
 )
+from .delivery import get_delivery_payload, get_delivery_payloads, get_draw_payload
+from .sampling import start_draw, validate_draw
+from .mastery import record_answers
+from .scoring import load_answer_keys, score_answers
+from .submissions import enqueue_submission
+from .summaries import record_attempt
 
 
 class QuizListView(APIView):
@@ -26,7 +48,8 @@ class QuizListView(APIView):
         responses={200: QuizSerializer(many=True)}
     )
     def get(self, request):
-        quizzes = Quiz.objects.all()
+        quizzes = Quiz.objects.select_related("lesson__unit__course__grade") \
+            .prefetch_related("questions__answers")
         serializer = QuizSerializer(quizzes, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -42,12 +65,12 @@ class QuizDetailView(APIView):
                               description="ID of the quiz",
                               type=openapi.TYPE_INTEGER)
         ],
-        responses={200: QuizSerializer()}
+        responses={200: QuizDeliverySerializer()}
     )
     def get(self, request, quiz_id):
-        quiz = get_object_or_404(Quiz, id=quiz_id)
-        serializer = QuizSerializer(quiz)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        quiz = get_object_or_404(
+            Quiz.objects.only("id", "content_version"), id=quiz_id)
+        return Response(get_delivery_payload(quiz), status=status.HTTP_200_OK)
 
 
 class LessonQuizzesView(APIView):
@@ -61,13 +84,38 @@ class LessonQuizzesView(APIView):
                               description="ID of the lesson",
                               type=openapi.TYPE_INTEGER)
         ],
-        responses={200: QuizSerializer(many=True)}
+        responses={200: QuizDeliverySerializer(many=True)}
     )
     def get(self, request, lesson_id):
         lesson = get_object_or_404(Lesson, id=lesson_id)
-        quizzes = Quiz.objects.filter(lesson_id=lesson_id)
-        serializer = QuizSerializer(quizzes, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        quizzes = Quiz.objects.filter(lesson_id=lesson_id) \
+            .only("id", "content_version").order_by("id")
+        return Response(get_delivery_payloads(quizzes), status=status.HTTP_200_OK)
+
+
+class StartQuizView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="start_quiz",
+        operation_description="Start an attempt: draws the questions to answer (a random \
+            sample for quizzes with a sample size) and records the draw for submission.",
+        manual_parameters=[
+            openapi.Parameter('quiz_id', openapi.IN_PATH,
+                              description="ID of the quiz",
+                              type=openapi.TYPE_INTEGER)
+        ],
+        responses={201: QuizDrawSerializer()},
+    )
+    def post(self, request, quiz_id):
+        quiz = get_object_or_404(
+            Quiz.objects.select_related("lesson__unit__course__grade"), id=quiz_id)
+        draw = start_draw(request.user, quiz)
+        data = {
+            "draw_id": draw.id,
+            "quiz": get_draw_payload(quiz, draw.question_ids),
+        }
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class SubmitQuiz(APIView):
@@ -75,9 +123,12 @@ class SubmitQuiz(APIView):
 
     @swagger_auto_schema(
         operation_id="submit_quiz",
-        operation_description="Submit answers for a quiz and calculate the score.",
+        operation_description="Submit answers for a quiz and calculate the score. \
+            Exam-mode quizzes return 202 with a submission to poll instead.",
         request_body=SubmitQuizSerializer,
-        responses={200: QuizResultsSerializer()},
+        responses={200: QuizResultsSerializer(),
+                   202: QuizSubmissionSerializer(),
+                   409: "Quiz draw already submitted"},
     )
     def post(self, request, quiz_id):
         quiz = get_object_or_404(Quiz, id=quiz_id)
@@ -85,43 +136,45 @@ class SubmitQuiz(APIView):
         serializer.is_valid(raise_exception=True)
 
         answers_data = serializer.validated_data['answers']
+        draw = validate_draw(request.user, quiz,
+                             serializer.validated_data.get('draw_id'), answers_data)
 
-        score = 0
-        user_answers = []
+        # exam mode: acknowledge now, score in batches in the worker
+        if quiz.exam_mode:
+            submission = enqueue_submission(request.user, quiz, answers_data, draw)
+            return Response(QuizSubmissionSerializer(submission).data,
+                            status=status.HTTP_202_ACCEPTED)
 
         # calculate score first
-        for ans in answers_data:
-            question = get_object_or_404(
-                Question, id=ans['question_id'], quiz=quiz)
-            selected_answer = get_object_or_404(
-                Answer, id=ans['selected_answer_id'], question=question)
-
-            if selected_answer.question.id != question.id:
-                return Response({"detail": "Selected answer does not belong to the question."},
-                                status=status.HTTP_400_BAD_REQUEST)
-
-            is_correct = selected_answer.is_correct
-            if is_correct:
-                score += question.points
-
-            user_answers.append({
-                "question": question,
-                "selected_answer": selected_answer,
-                "is_correct": is_correct,
-            })
-
-        # now create the attempt with final score
-        attempt = QuizAttempt.objects.create(
-            user=request.user, quiz=quiz, score=score)
-
-        # bulk create UserAnswer entries
-        UserAnswer.objects.bulk_create([
-            UserAnswer(
-                attempt=attempt,
-                question=ua["question"],
-                selected_answer=ua["selected_answer"],
-                is_correct=ua["is_correct"]
-            )
+        answer_key = load_answer_keys([quiz.id])[quiz.id]
+        score, user_answers = score_answers(answer_key, answers_data)
+
+        try:
+            with transaction.atomic():
+                # now create the attempt with final score
+                attempt = QuizAttempt.objects.create(
+                    user=request.user, quiz=quiz, score=score, draw=draw)
+
+                # bulk create UserAnswer entries
+                UserAnswer.objects.bulk_create([
+                    UserAnswer(
+                        attempt=attempt,
+                        question_id=ua["question_id"],
+                        selected_answer_id=ua["selected_answer_id"],
+                        is_correct=ua["is_correct"]
+                    )
+                    for ua in user_answers
+                ])
+        except IntegrityError:
+            # a concurrent submission of the same draw passed validate_draw
+            # too and created its attempt first
+            if draw is None:
+                raise
+            return Response({"detail": "This quiz draw was already submitted."},
+                            status=status.HTTP_409_CONFLICT)
+        record_attempt(attempt)
+        record_answers([
+            (request.user.id, ua["question_id"], ua["is_correct"], attempt.attempted_at)
             for ua in user_answers
         ])
 
@@ -129,6 +182,28 @@ class SubmitQuiz(APIView):
         return Response(results_serializer.data, status=status.HTTP_200_OK)
 
 
+class QuizSubmissionDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="quiz_submission_detail",
+        operation_description="Poll an exam-mode submission. `results` is filled in once \
+            the submission has been scored.",
+        manual_parameters=[
+            openapi.Parameter('submission_id', openapi.IN_PATH,
+                              description="ID of the submission",
+                              type=openapi.TYPE_INTEGER)
+        ],
+        responses={200: QuizSubmissionSerializer()},
+    )
+    def get(self, request, submission_id):
+        submission = get_object_or_404(
+            QuizSubmission.objects.select_related("attempt", "archived_attempt"),
+            id=submission_id, user=request.user)
+        serializer = QuizSubmissionSerializer(submission)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class UserQuizAttemptsListView(APIView):
     permission_classes = [IsAuthenticated]
 
@@ -160,7 +235,8 @@ class UserQuizAttemptDetailView(APIView):
 
     @swagger_auto_schema(
         operation_id="user_quiz_attempt_detail",
-        operation_description="Retrieve details of a specific quiz attempt.",
+        operation_description="Retrieve details of a specific quiz attempt. \
+            Archived attempts are served from the archive table.",
         manual_parameters=[
             openapi.Parameter('attempt_id', openapi.IN_PATH, description="ID of the quiz attempt",
                               type=openapi.TYPE_INTEGER)
@@ -168,8 +244,16 @@ class UserQuizAttemptDetailView(APIView):
         responses={200: QuizAttemptSerializer()},
     )
     def get(self, request, attempt_id):
-        attempt = get_object_or_404(QuizAttempt, id=attempt_id, user=request.user)
-        serializer = QuizAttemptSerializer(attempt)
+        attempt = QuizAttempt.objects.filter(
+            id=attempt_id, user=request.user).first()
+        if attempt is not None:
+            serializer = QuizAttemptSerializer(attempt)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        # Fall back to the cold archive for old attempts
+        archived = get_object_or_404(
+            ArchivedQuizAttempt, id=attempt_id, user=request.user)
+        serializer = ArchivedQuizAttemptSerializer(archived)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
@@ -191,6 +275,52 @@ class LessonQuizzesAttemptsView(APIView):
     )
     def get(self, request, lesson_id):
         lesson = get_object_or_404(Lesson, id=lesson_id)
-        quizzes = Quiz.objects.filter(lesson=lesson).prefetch_related("attempts")
+        quizzes = Quiz.objects.filter(lesson=lesson).prefetch_related(
+            Prefetch(
+                "attempts",
+                queryset=QuizAttempt.objects.filter(user=request.user).order_by("-attempted_at"),
+                to_attr="user_attempts",
+            ),
+            Prefetch(
+                "attempt_summaries",
+                queryset=QuizAttemptSummary.objects.filter(user=request.user),
+                to_attr="user_summaries",
+            ),
+        )
         serializer = LessonQuizWithAttemptsSerializer(quizzes, many=True, context={'request': request})
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class ReviewQueueView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="question_review_queue",
+        operation_description="The authenticated user's questions that are due for review, \
+            most overdue first. Questions come due again on a spaced-repetition schedule \
+            after each time they are answered.",
+        manual_parameters=[
+            openapi.Parameter(
+                "limit",
+                openapi.IN_QUERY,
+                description="Number of questions to return (default: 10, max: 50)",
+                type=openapi.TYPE_INTEGER,
+            )
+        ],
+        responses={200: ReviewQuestionSerializer(many=True)},
+    )
+    def get(self, request):
+        try:
+            limit = min(max(int(request.query_params.get("limit", 10)), 1), 50)
+        except ValueError:
+            return Response({"detail": "limit must be an integer."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        # range scan of question_mastery_due_idx; answer history is not read
+        due = QuestionMastery.objects \
+            .filter(user=request.user, due_at__lte=timezone.now()) \
+            .select_related('question') \
+            .prefetch_related('question__answers') \
+            .order_by('due_at')[:limit]
+        serializer = ReviewQuestionSerializer(due, many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import ClassGroup, User
 
 
 class UserAdmin(BaseUserAdmin):
@@ -42,3 +42,12 @@ class UserAdmin(BaseUserAdmin):
     )
 
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(ClassGroup)
+class ClassGroupAdmin(admin.ModelAdmin):
+    list_display = ("name", "teacher", "grade", "created_at")
+    list_filter = ("grade",)
+    search_fields = ("name", "teacher__email")
+    autocomplete_fields = ("teacher",)
+    filter_horizontal = ("students",)
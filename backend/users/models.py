@@ -70,3 +70,22 @@ class User(AbstractBaseUser, PermissionsMixin):
 
     def __str__(self):
         return self.email
+
+
+class ClassGroup(models.Model):
+    """
+    A teacher's class: the students of a grade whose progress the teacher
+    follows. Being the teacher of a class is what makes a user a teacher.
+    """
+    name = models.CharField(max_length=200)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    # relations (FKs)
+    teacher = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="taught_classes")
+    grade = models.ForeignKey(
+        "learning.Grade", on_delete=models.CASCADE, related_name="classes")
+    students = models.ManyToManyField(User, related_name="classes", blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.teacher})"
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 
+from .models import ClassGroup
+
 User = get_user_model()
 
 
@@ -37,3 +39,11 @@ class UserSerializer(serializers.ModelSerializer):
 
         instance.save(update_fields=["username", "birth_date", "grade"])
         return instance
+
+
+class ClassGroupSerializer(serializers.ModelSerializer):
+    student_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = ClassGroup
+        fields = ["id", "name", "grade_id", "student_count", "created_at"]
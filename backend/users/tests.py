@@ -4,6 +4,9 @@ from django.test import TestCase
 from unittest.mock import patch
 from django.contrib.auth import get_user_model
 
+from core.testing import create_student
+from learning.models import Grade
+from users.models import ClassGroup
 from users.serializers import UserSerializer
 
 
@@ -51,7 +54,6 @@ class UserSerializerTest(APITestCase):
 
     def test_serializer_update_username_birthdate_grade(self):
         # Create a grade for testing
-        from learning.models import Grade
         grade = Grade.objects.create(name="Grade 1")
 
         user = User.objects.create_user(
@@ -95,7 +97,6 @@ class UserAPITest(APITestCase):
     def test_profile_update_all_fields(self):
         self.client.force_authenticate(user=self.superuser)
 
-        from learning.models import Grade
         grade = Grade.objects.create(name="Grade 2")
 
         url = reverse("profile")
@@ -135,3 +136,24 @@ class UserAPITest(APITestCase):
         user.refresh_from_db()
         # Ensure email is unchanged
         self.assertEqual(user.email, "admin@example.com")
+
+
+# --------------------------
+# Class Tests
+# --------------------------
+class TeacherClassesTest(APITestCase):
+    def test_lists_only_own_classes(self):
+        grade = Grade.objects.create(name="Grade 1")
+        teacher = User.objects.create_user(
+            email="teacher@test.com", username="teacher", password="password123")
+        other = User.objects.create_user(
+            email="other@test.com", username="other", password="password123")
+        students = [create_student(f"s{i}") for i in range(2)]
+        ClassGroup.objects.create(name="5A", teacher=teacher, grade=grade).students.set(students)
+        ClassGroup.objects.create(name="5B", teacher=other, grade=grade)
+
+        self.client.force_authenticate(user=teacher)
+        response = self.client.get(reverse("teacher-classes"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(row["name"], row["student_count"]) for row in response.data],
+                         [("5A", 2)])
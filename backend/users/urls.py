@@ -1,7 +1,8 @@
 # users/urls.py
 from django.urls import path
-from .views import ProfileView
+from .views import ProfileView, TeacherClassesView
 
 urlpatterns = [
     path('profile/', ProfileView.as_view(), name='profile'),
+    path('classes/', TeacherClassesView.as_view(), name='teacher-classes'),
 ]
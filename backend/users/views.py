@@ -5,9 +5,11 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import status
 from django.contrib.auth import get_user_model
+from django.db.models import Count
 from drf_yasg.utils import swagger_auto_schema
 
-from .serializers import UserSerializer
+from .models import ClassGroup
+from .serializers import ClassGroupSerializer, UserSerializer
 
 User = get_user_model()
 
@@ -64,3 +66,18 @@ class ProfileView(APIView):
                 )
 
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+class TeacherClassesView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_id="list_teacher_classes",
+        operation_description="List the classes the current user teaches",
+        responses={200: ClassGroupSerializer(many=True)},
+    )
+    def get(self, request):
+        classes = ClassGroup.objects.filter(teacher=request.user) \
+            .annotate(student_count=Count("students")).order_by("name")
+        serializer = ClassGroupSerializer(classes, many=True)
+        return Response(serializer.data)